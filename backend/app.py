@@ -1,10 +1,22 @@
 import os
+import json
+import math
+import time
 import traceback
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
-from services.matcher import UniversityMatcher
-from services.chatbot import get_chat_response
+from services.matcher import UniversityMatcher, NORMALIZATION_MODES, encode_cursor, decode_cursor
+from services.chatbot import get_chat_response, stream_chat_response
+from services.chat_cache import chat_cache
+from services.program_index import get_program_index
+from services.result_cache import ranking_cache
+from services.database import get_catalogue_document, get_catalogue_snapshot
+from services.report import REPORT_TOP_K, render_report, iter_file_chunks
+from services.jobs import job_queue, job_status
+from services.retrieval import get_retriever
+from services.metrics import METRICS_ENABLED, REQUEST_SECONDS, register_collector, render_metrics, stage_timer
+from services.profiling import profiled, rolling_profile, token_ok
 
 # Load environment variables from .env file
 load_dotenv()
@@ -15,11 +27,218 @@ app = Flask(__name__)
 cors_origins = os.getenv("CORS_ORIGINS", "http://localhost:8080,http://localhost:3000").split(",")
 CORS(app, origins=cors_origins)
 
+REQUIRED_PROFILE_FIELDS = ['grade_level', 'average', 'wants_coop', 'extra_curriculars',
+                           'major_interests', 'courses_taken']
+
+
+def _missing_profile_fields(student_profile):
+    return [field for field in REQUIRED_PROFILE_FIELDS if field not in student_profile]
+
+
+def _finite_float(value):
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"{value!r} is not finite")
+    return number
+
+
+def _coerce_profile_numbers(student_profile):
+    """
+    Coerces `average` and `grade_level` in place the way the matcher reads
+    them, skipping whichever is absent. Returns {field: reason} for values
+    that can't be used.
+    """
+    invalid = {}
+    if 'average' in student_profile:
+        try:
+            student_profile['average'] = _finite_float(student_profile['average'])
+        except (TypeError, ValueError):
+            invalid['average'] = "must be a number"
+    if 'grade_level' in student_profile:
+        try:
+            student_profile['grade_level'] = int(student_profile['grade_level'])
+        except (TypeError, ValueError):
+            invalid['grade_level'] = "must be an integer"
+    return invalid
+
+
+def _invalid_courses(courses, allow_code=False):
+    """
+    Reason `courses` can't be read as a course list, or None. Entries are
+    codes, [code, grade] pairs or {"course_code"/"code", "grade"} objects,
+    and every code must be a string. allow_code also accepts a single code
+    (what-if deltas' "add_courses": "SCH4U").
+    """
+    if allow_code and isinstance(courses, str):
+        return None
+    if not isinstance(courses, list):
+        return "must be a list"
+    for entry in courses:
+        if isinstance(entry, (list, tuple)):
+            code = entry[0] if entry else None
+        elif isinstance(entry, dict):
+            code = entry.get("course_code") or entry.get("code") or entry.get("name")
+        else:
+            code = entry
+        if not isinstance(code, str):
+            return "course codes must be strings"
+    return None
+
+
+def _delta_error(delta):
+    """
+    Checks (and coerces) the values of one what-if delta. Returns None when
+    it can be priced, otherwise the JSON error body. Unknown fields are left
+    to UniversityMatcher.what_if.
+    """
+    if not isinstance(delta, dict):
+        return {"error": "Each delta must be an object"}
+    bad_values = _coerce_profile_numbers(delta)
+    if 'average_delta' in delta:
+        try:
+            delta['average_delta'] = _finite_float(delta['average_delta'])
+        except (TypeError, ValueError):
+            bad_values['average_delta'] = "must be a number"
+    for field in ('add_courses', 'remove_courses'):
+        if field in delta:
+            reason = _invalid_courses(delta[field], allow_code=True)
+            if reason:
+                bad_values[field] = reason
+    if bad_values:
+        return {"error": "Invalid field values", "invalid": bad_values}
+    return None
+
+
+def _profile_error(student_profile):
+    """
+    Checks one profile (and coerces its numbers) before it is scored.
+    Returns None when it can be ranked, otherwise the JSON error body.
+    """
+    if not isinstance(student_profile, dict):
+        return {"error": "Missing required fields", "missing": REQUIRED_PROFILE_FIELDS}
+    missing = _missing_profile_fields(student_profile)
+    if missing:
+        return {"error": "Missing required fields", "missing": missing}
+    bad_values = _coerce_profile_numbers(student_profile)
+    courses_reason = _invalid_courses(student_profile['courses_taken'])
+    if courses_reason:
+        bad_values['courses_taken'] = courses_reason
+    if bad_values:
+        return {"error": "Invalid field values", "invalid": bad_values}
+    return None
+
+
+def _parse_top_k(payload):
+    """
+    Reads `top_k` (or its alias `limit`) from the query string or JSON body.
+    Returns None for "all programs"; raises ValueError on bad values.
+    """
+    value = request.args.get("top_k") or request.args.get("limit")
+    if value is None:
+        value = payload.get("top_k", payload.get("limit"))
+    if value is None:
+        return None
+    top_k = int(value)
+    if top_k <= 0:
+        raise ValueError("top_k must be a positive integer")
+    return top_k
+
+
+def _parse_normalization(payload):
+    """Optional `normalization` mode from the query string or JSON body (None = server default)."""
+    mode = request.args.get("normalization") or payload.get("normalization")
+    if mode is not None and mode not in NORMALIZATION_MODES:
+        raise ValueError(f"normalization must be one of {', '.join(NORMALIZATION_MODES)}")
+    return mode
+
+
+def _parse_flag(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes", "on")
+
+
+def _parse_eligibility(payload):
+    """
+    Optional eligibility pre-filter settings from the query string or JSON body,
+    as keyword arguments for UniversityMatcher.get_ranked_programs.
+    """
+    options = {}
+    for name in ("eligible_only", "include_reach"):
+        value = request.args.get(name, payload.get(name))
+        if value is not None:
+            options[name] = _parse_flag(value)
+    margin = request.args.get("reach_margin", payload.get("reach_margin"))
+    if margin is not None:
+        options["reach_margin"] = float(margin)
+        if options["reach_margin"] < 0:
+            raise ValueError("reach_margin must be >= 0")
+    return options
+
+
+# Scored once at startup so numpy, the index and the population stats are warm
+WARMUP_PROFILE = {
+    "grade_level": 12, "average": 85, "wants_coop": True, "extra_curriculars": [],
+    "major_interests": ["programming"], "courses_taken": [["MHF4U", 85]]
+}
+
+
+def warmup():
+    """
+    Loads everything the first request would otherwise pay for: the catalogue
+    snapshot (Mongo connect included), the program index, the snapshot
+    population stats and the chatbot's retrieval index.
+    Returns the snapshot that was warmed.
+    """
+    start = time.perf_counter()
+    snapshot = get_catalogue_snapshot()
+    index = get_program_index()
+    UniversityMatcher(WARMUP_PROFILE, "snapshot").get_ranked_programs(top_k=1)
+    get_retriever()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    print(f"Warmed up catalogue {snapshot.version} ({len(index)} programs) in {elapsed_ms:.0f} ms")
+    return snapshot
+
+
+if METRICS_ENABLED:
+    @app.before_request
+    def _start_request_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request_latency(response):
+        # Streaming endpoints are timed until their response starts
+        start = g.pop("request_start", None)
+        if start is not None and request.url_rule is not None:
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                endpoint=request.url_rule.rule, method=request.method, status=response.status_code
+            )
+        return response
+
+    def _cache_metrics():
+        ranking = ranking_cache.stats()
+        chat = chat_cache.stats()
+        return [
+            ("admittree_ranking_cache_hits_total", "counter", "Ranking result cache hits.", ranking["hits"]),
+            ("admittree_ranking_cache_misses_total", "counter", "Ranking result cache misses.", ranking["misses"]),
+            ("admittree_ranking_cache_evictions_total", "counter", "Ranking result cache evictions.", ranking["evictions"]),
+            ("admittree_ranking_cache_entries", "gauge", "Rankings currently cached.", ranking["size"]),
+            ("admittree_chat_cache_exact_hits_total", "counter", "Chat answers reused for the same question.", chat["exact_hits"]),
+            ("admittree_chat_cache_similar_hits_total", "counter", "Chat answers reused for a similar question.", chat["similar_hits"]),
+            ("admittree_chat_cache_misses_total", "counter", "Chat questions not in the answer cache.", chat["misses"]),
+            ("admittree_chat_cache_entries", "gauge", "Chat answers currently cached.", chat["size"]),
+        ]
+
+    register_collector(_cache_metrics)
+
+
 @app.route("/")
 def home():
     return "<p>Hello from Flask via uv!</p>"
 
 @app.route("/api/recommend", methods=["POST"])
+@profiled("recommend")
 def recommend():
     """
     POST endpoint to get ranked university program recommendations.
@@ -31,17 +250,22 @@ def recommend():
         "wants_coop": bool,
         "extra_curriculars": [("name", level), ...],
         "major_interests": ["interest1", "interest2", ...],
-        "courses_taken": [("course_code", grade), ...]
+        "courses_taken": [("course_code", grade), ...],
+        "top_k": int,      # optional (alias "limit"), also accepted as a query param
+        "cursor": str,     # optional, "next_cursor" from the previous page
+        "normalization": "request" | "snapshot" | "running",  # optional
+        "eligible_only": bool,   # optional, only rank programs within reach (see below)
+        "include_reach": bool,   # optional, default true: allow min_avg up to reach_margin above the average
+        "reach_margin": float    # optional, default ELIGIBILITY_REACH_MARGIN
     }
+    With eligible_only, "total_programs" counts the eligible programs only.
     """
     try:
         # Get JSON payload
         student_profile = request.get_json()
         
         # Validate required fields
-        required_fields = ['grade_level', 'average', 'wants_coop', 'extra_curriculars', 
-                          'major_interests', 'courses_taken']
-        missing_fields = [field for field in required_fields if field not in student_profile]
+        missing_fields = _missing_profile_fields(student_profile)
         
         if missing_fields:
             return jsonify({
@@ -49,15 +273,43 @@ def recommend():
                 "missing": missing_fields
             }), 400
         
+        # Pagination: only the requested page is selected and sorted
+        try:
+            top_k = _parse_top_k(student_profile)
+            cursor = request.args.get("cursor") or student_profile.get("cursor")
+            cursor_version, offset = decode_cursor(cursor) if cursor else (None, 0)
+            normalization = _parse_normalization(student_profile)
+            eligibility = _parse_eligibility(student_profile)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
         # Instantiate matcher and get rankings
-        matcher = UniversityMatcher(student_profile)
-        rankings = matcher.get_ranked_programs()
-        
-        return jsonify({
+        matcher = UniversityMatcher(student_profile, normalization)
+        rankings = matcher.get_ranked_programs(top_k=top_k, offset=offset, **eligibility)
+
+        if cursor and cursor_version != matcher.catalogue_version:
+            return jsonify({
+                "error": "Cursor expired: the program catalogue changed, restart from the first page"
+            }), 409
+        # Cursors only ever point inside the ranking
+        if cursor and offset >= matcher.total_programs:
+            return jsonify({"error": f"Invalid cursor: {cursor!r}"}), 400
+
+        response = {
             "success": True,
             "rankings": rankings,
-            "total_programs": len(rankings)
-        }), 200
+            "total_programs": matcher.total_programs
+        }
+        if top_k is not None:
+            next_offset = offset + len(rankings)
+            response["next_cursor"] = (
+                encode_cursor(matcher.catalogue_version, next_offset)
+                if next_offset < matcher.total_programs else None
+            )
+
+        with stage_timer("serialize"):
+            body = jsonify(response)
+        return body, 200
         
     except Exception as e:
         traceback.print_exc()
@@ -67,6 +319,197 @@ def recommend():
             "trace": traceback.format_exc()
         }), 500
     
+@app.route("/api/recommend/batch", methods=["POST"])
+def recommend_batch():
+    """
+    POST endpoint that ranks a whole class of students in one call.
+
+    Expected JSON payload:
+    {
+        "profiles": [<student profile as for /api/recommend>, ...],
+        "top_k": int,   # optional (alias "limit"), per-student ranking length
+        "normalization": "request" | "snapshot" | "running"   # optional
+    }
+
+    Streams newline-delimited JSON, one line per student in input order:
+    {"index": 0, "success": true, "rankings": [...], "total_programs": int}
+    {"index": 1, "error": "Missing required fields", "missing": [...]}
+    {"index": 2, "error": "Invalid field values", "invalid": {"average": "must be a number"}}
+    """
+    payload = request.get_json(silent=True) or {}
+    profiles = payload.get("profiles")
+    if not isinstance(profiles, list):
+        return jsonify({"error": "Expected a 'profiles' list"}), 400
+    try:
+        top_k = _parse_top_k(payload)
+        normalization = _parse_normalization(payload)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Validate up front so bad rows don't abort the stream
+    invalid = {}
+    valid = []
+    for i, profile in enumerate(profiles):
+        error = _profile_error(profile)
+        if error:
+            invalid[i] = error
+        else:
+            valid.append(profile)
+
+    def generate():
+        total_programs = len(get_program_index())
+        try:
+            rankings_iter = UniversityMatcher.rank_many(valid, top_k=top_k, normalization=normalization)
+            for i in range(len(profiles)):
+                if i in invalid:
+                    yield json.dumps({"index": i, **invalid[i]}) + "\n"
+                    continue
+                yield json.dumps({
+                    "index": i,
+                    "success": True,
+                    "rankings": next(rankings_iter),
+                    "total_programs": total_programs
+                }) + "\n"
+        except Exception as e:
+            traceback.print_exc()
+            yield json.dumps({"error": "Internal server error", "message": str(e)}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+@app.route("/api/recommend/stream", methods=["POST"])
+def recommend_stream():
+    """
+    POST endpoint that streams scored programs as they are computed.
+    Takes the same student profile as /api/recommend. Scores are standardized
+    against population statistics ("snapshot" by default, or "running"), so
+    each line is final when emitted and comparable across requests.
+    Lines are newline-delimited JSON in catalogue order, not ranked.
+    """
+    student_profile = request.get_json(silent=True) or {}
+    missing_fields = _missing_profile_fields(student_profile)
+    if missing_fields:
+        return jsonify({"error": "Missing required fields", "missing": missing_fields}), 400
+
+    try:
+        normalization = _parse_normalization(student_profile) or "snapshot"
+        if normalization == "request":
+            raise ValueError("Streaming needs normalization 'snapshot' or 'running'")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    matcher = UniversityMatcher(student_profile, normalization)
+
+    def generate():
+        try:
+            for result in matcher.iter_scored_programs():
+                yield json.dumps(result) + "\n"
+        except Exception as e:
+            traceback.print_exc()
+            yield json.dumps({"error": "Internal server error", "message": str(e)}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+@app.route("/api/recommend/whatif", methods=["POST"])
+@profiled("whatif")
+def recommend_whatif():
+    """
+    POST endpoint that prices "what if" changes to a student profile.
+
+    Expected JSON payload:
+    {
+        "profile": <student profile as for /api/recommend>,
+        "deltas": [
+            {"label": "raise average", "average_delta": 3},
+            {"add_courses": ["SCH4U"]},
+            {"average": 90, "remove_courses": ["ICS4U"], "grade_level": 12}
+        ],
+        "top_k": int,   # optional (alias "limit"), default 10
+        "normalization": "request" | "snapshot" | "running"   # optional, default "snapshot"
+    }
+
+    Returns the base top_k and, per delta, its top_k plus "changes": the
+    base and new place of every program in either list. Scores default to
+    "snapshot" normalization so they are comparable across scenarios.
+    """
+    payload = request.get_json(silent=True) or {}
+    student_profile = payload.get("profile")
+    if not isinstance(student_profile, dict):
+        return jsonify({"error": "Expected a 'profile' object"}), 400
+    error = _profile_error(student_profile)
+    if error:
+        return jsonify(error), 400
+    deltas = payload.get("deltas")
+    if not isinstance(deltas, list) or not deltas:
+        return jsonify({"error": "Expected a non-empty 'deltas' list"}), 400
+    for i, delta in enumerate(deltas):
+        error = _delta_error(delta)
+        if error:
+            return jsonify({"delta": i, **error}), 400
+
+    try:
+        top_k = _parse_top_k(payload) or 10
+        normalization = _parse_normalization(payload) or "snapshot"
+        matcher = UniversityMatcher(student_profile, normalization)
+        result = matcher.what_if(deltas, top_k=top_k)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    with stage_timer("serialize"):
+        body = jsonify({"success": True, **result, "total_programs": matcher.total_programs})
+    return body, 200
+
+@app.route("/api/recommend/report", methods=["POST"])
+def recommend_report():
+    """
+    POST endpoint that returns a personalized PDF report of a student's top
+    matches (with steps to apply and career outcomes for each).
+
+    Expected JSON payload: a student profile as for /api/recommend (plus an
+    optional "name"), or a whole class:
+    {
+        "profiles": [<student profile>, ...],
+        "top_k": int    # optional, programs per student (default REPORT_TOP_K)
+    }
+    The PDF is streamed back in chunks.
+    """
+    payload = request.get_json(silent=True) or {}
+    profiles = payload.get("profiles") if "profiles" in payload else [payload]
+    if not isinstance(profiles, list) or not profiles:
+        return jsonify({"error": "Expected a student profile or a 'profiles' list"}), 400
+
+    # Checked before rendering starts: the PDF is streamed, so later errors can't be a 400
+    for i, profile in enumerate(profiles):
+        error = _profile_error(profile)
+        if error:
+            return jsonify({"index": i, **error}), 400
+
+    try:
+        top_k = _parse_top_k(payload) or REPORT_TOP_K
+        normalization = _parse_normalization(payload)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        snapshot = get_catalogue_snapshot()
+        names = [p.get("name") for p in profiles]
+        rankings = UniversityMatcher.rank_many(profiles, top_k=top_k, normalization=normalization)
+        students = list(zip(names, profiles, rankings))
+        pdf_file = render_report(students, get_catalogue_document(snapshot), snapshot.version)
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": "Internal server error", "message": str(e)}), 500
+
+    return Response(
+        iter_file_chunks(pdf_file),
+        mimetype="application/pdf",
+        headers={"Content-Disposition": 'attachment; filename="AdmitTree_Report.pdf"'},
+        direct_passthrough=True
+    )
+
+@app.route("/api/recommend/cache-stats", methods=["GET"])
+def recommend_cache_stats():
+    return jsonify(ranking_cache.stats())
+
 @app.route("/api/db-health", methods=["GET"])
 def db_health():
     from services.database import fetch_university_data
@@ -74,6 +517,7 @@ def db_health():
     return jsonify({"ok": True, "keys": list(doc.keys())[:10]})
 
 @app.route("/api/chat", methods=["POST"])
+@profiled("chat")
 def chat():
     try:
         # 1. Get the message from the Frontend
@@ -93,7 +537,132 @@ def chat():
         print(f"Chat Error: {e}")
         return jsonify({"reply": "Server error."}), 500
 
+@app.route("/api/chat/stream", methods=["POST"])
+def chat_stream():
+    """
+    Same request as /api/chat, but the reply is relayed as server-sent events
+    while the agent generates it:
+        data: {"delta": "partial text"}
+        ...
+        event: done
+        data: {}
+    """
+    data = request.get_json(silent=True) or {}
+    user_message = data.get("message", "")
+
+    if not user_message:
+        return jsonify({"reply": "I didn't hear anything!"}), 400
+
+    def generate():
+        try:
+            for chunk in stream_chat_response(user_message):
+                yield f"data: {json.dumps({'delta': chunk})}\n\n"
+        except Exception as e:
+            print(f"Chat Error: {e}")
+            yield f"data: {json.dumps({'delta': 'Server error.'})}\n\n"
+        yield "event: done\ndata: {}\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route("/api/chat/cache-stats", methods=["GET"])
+def chat_cache_stats():
+    return jsonify(chat_cache.stats())
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Hot-path latencies and counters in the Prometheus text format."""
+    if not METRICS_ENABLED:
+        return jsonify({"error": "Metrics are disabled (METRICS_ENABLED=false)"}), 404
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/api/profile/rolling", methods=["GET"])
+def profile_rolling():
+    """
+    Merged collapsed stacks of the requests sampled by PROFILE_SAMPLE_RATE
+    (optionally ?endpoint=recommend|chat). Needs the profiling admin token.
+    """
+    if not token_ok(request.headers.get("X-Profile-Token") or request.args.get("profile_token")):
+        return jsonify({"error": "Profiling needs a valid admin token"}), 403
+    count, text = rolling_profile(request.args.get("endpoint"))
+    return Response(text, mimetype="text/plain", headers={"X-Profile-Requests": str(count)})
+
+@app.route("/api/jobs", methods=["POST"])
+def submit_job():
+    """
+    POST endpoint that queues heavy work to run in the background.
+
+    Expected JSON payload:
+    {
+        "kind": "rank_batch" | "class_report" | "catalogue_pdf",
+        "profiles": [<student profile>, ...],   # rank_batch and class_report
+        "top_k": int,                           # optional
+        "normalization": str                    # optional
+    }
+    Returns 202 with the job; poll /api/jobs/<id> and fetch
+    /api/jobs/<id>/result once its status is "done".
+    """
+    payload = request.get_json(silent=True) or {}
+    kind = payload.get("kind")
+    params = {}
+
+    if kind in ("rank_batch", "class_report"):
+        profiles = payload.get("profiles")
+        if not isinstance(profiles, list) or not profiles:
+            return jsonify({"error": "Expected a 'profiles' list"}), 400
+        for i, profile in enumerate(profiles):
+            missing = _missing_profile_fields(profile) if isinstance(profile, dict) else REQUIRED_PROFILE_FIELDS
+            if missing:
+                return jsonify({"error": "Missing required fields", "index": i, "missing": missing}), 400
+        try:
+            params = {
+                "profiles": profiles,
+                "top_k": _parse_top_k(payload),
+                "normalization": _parse_normalization(payload),
+            }
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    try:
+        job = job_queue.submit(kind, params)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(job_status(job)), 202, {"Location": f"/api/jobs/{job['id']}"}
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job_status(job))
+
+@app.route("/api/jobs/<job_id>/result", methods=["GET"])
+def get_job_result(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    if job["status"] != "done":
+        return jsonify({"error": f"Job is {job['status']}", "job": job_status(job)}), 409
+
+    if job["result_path"]:
+        try:
+            pdf_file = open(job["result_path"], "rb")
+        except FileNotFoundError:
+            return jsonify({"error": "Job result has expired"}), 410
+        return Response(
+            iter_file_chunks(pdf_file),
+            mimetype="application/pdf",
+            headers={"Content-Disposition": f'attachment; filename="AdmitTree_{job["kind"]}.pdf"'},
+            direct_passthrough=True
+        )
+    return jsonify({"success": True, **job["result"]})
+
 if __name__ == "__main__":
+    # Development server; in production run `gunicorn -c gunicorn.conf.py`
     port = int(os.getenv("FLASK_PORT", 5001))
     host = os.getenv("API_HOST", "0.0.0.0")
     debug = os.getenv("FLASK_DEBUG", "True").lower() == "true"
@@ -0,0 +1 @@
+"""Benchmarks for the matcher and API (see run_benchmarks.py)."""
@@ -0,0 +1,324 @@
+"""
+Load test that replays a JSONL request log against the API.
+
+Each log line is one request:
+  {"path": "/api/recommend", "body": {...student profile...}, "query": {"top_k": 10}, "t": 0.42}
+  {"path": "/api/chat", "body": {"message": "..."}, "t": 0.57}
+"method" defaults to POST and "t" (seconds since the start of the log) is
+only needed for --arrival log. Lines without a "path" are skipped.
+
+Usage (from backend/):
+  python -m benchmarks.replay --generate 2000 > traffic.jsonl        # synthetic log
+  python -m benchmarks.replay traffic.jsonl --concurrency 8 --rate 200
+  python -m benchmarks.replay traffic.jsonl --target http://localhost:5001 --mock-agent-port 9100
+
+With the default --target test-client, requests go through the Flask test
+client in this process, against an in-memory synthetic catalogue (no
+MongoDB) and a mock chatbot agent (no DigitalOcean). Against a running
+server, start it with DO_AGENT_ENDPOINT pointing at --mock-agent-port.
+"""
+
+import argparse
+import json
+import math
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from benchmarks.run_benchmarks import install_catalogue, run_metadata, summarize
+from benchmarks.synthetic import META_KEYS, load_base, make_catalogue, make_profiles
+
+# Chat questions for --generate: catalogue lookups (answered locally) and
+# open-ended ones (sent to the agent)
+LOOKUP_QUESTIONS = [
+    "What average do I need for {program} at {university}?",
+    "What are the prerequisites for {program} at {university}?",
+    "What careers can {program} at {university} lead to?",
+    "When is the deadline to apply to {university}?",
+    "Does {university} have co-op?",
+]
+OPEN_QUESTIONS = [
+    "How do I choose between engineering disciplines?",
+    "Is it worth doing co-op?",
+    "How important are extracurriculars for engineering admissions?",
+    "What should I write about in my supplementary application?",
+    "How do I decide between two offers?",
+]
+
+
+# -----------------------------
+# Mock chatbot agent
+# -----------------------------
+class MockAgentHandler(BaseHTTPRequestHandler):
+    """OpenAI-compatible /chat/completions that answers after a fixed delay."""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        time.sleep(self.server.latency)
+
+        question = payload.get("messages", [{}])[-1].get("content", "")
+        reply = f"Mock answer to: {question[:60]}"
+        if payload.get("stream"):
+            chunks = [{"choices": [{"delta": {"content": word + " "}}]} for word in reply.split()]
+            body = "".join(f"data: {json.dumps(c)}\n\n" for c in chunks) + "data: [DONE]\n\n"
+            content_type = "text/event-stream"
+        else:
+            body = json.dumps({"choices": [{"message": {"content": reply}}]})
+            content_type = "application/json"
+
+        data = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def start_mock_agent(port=0, latency=0.3):
+    """Starts the mock agent in a daemon thread; returns its completions URL."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), MockAgentHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/api/v1/chat/completions"
+
+
+# -----------------------------
+# Logs
+# -----------------------------
+def read_log(path):
+    """Requests from a JSONL log; returns (requests, skipped line count)."""
+    requests_, skipped = [], 0
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                skipped += 1
+                continue
+            if not isinstance(entry, dict) or not str(entry.get("path", "")).startswith("/"):
+                skipped += 1
+                continue
+            requests_.append(entry)
+    return requests_, skipped
+
+
+def generate_log(count, catalogue, chat_share=0.2, rate=50.0, seed=0):
+    """Synthetic traffic: student profiles for /api/recommend plus chat questions, Poisson-timed."""
+    rng = random.Random(f"replay-{seed}")
+    profiles = make_profiles(catalogue, count, seed)
+    programs = [(uni, prog) for uni, data in catalogue.items() if uni not in META_KEYS and isinstance(data, dict)
+                for prog in (data.get("programs") or {})]
+
+    t = 0.0
+    log = []
+    for profile in profiles:
+        t += rng.expovariate(rate)
+        if rng.random() < chat_share:
+            if rng.random() < 0.6:
+                university, program = rng.choice(programs)
+                message = rng.choice(LOOKUP_QUESTIONS).format(university=university.split(" #")[0], program=program)
+            else:
+                message = rng.choice(OPEN_QUESTIONS)
+            log.append({"path": "/api/chat", "body": {"message": message}, "t": round(t, 4)})
+        else:
+            log.append({"path": "/api/recommend", "body": profile, "query": {"top_k": 10}, "t": round(t, 4)})
+    return log
+
+
+# -----------------------------
+# Clients
+# -----------------------------
+class TestClientTarget:
+    """Sends requests through the Flask test client (one per thread)."""
+
+    def __init__(self):
+        from app import app
+        self.app = app
+        self._local = threading.local()
+
+    def send(self, method, path, query, body):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, query_string=query, json=body)
+        response.get_data()   # Streams are read to the end
+        return response.status_code
+
+
+class HttpTarget:
+    """Sends requests to a running server (one keep-alive session per thread)."""
+
+    def __init__(self, base_url, timeout=60):
+        import requests
+        self.requests = requests
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def send(self, method, path, query, body):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = self.requests.Session()
+        response = session.request(method, self.base_url + path, params=query, json=body, timeout=self.timeout)
+        response.content   # Read the whole body
+        return response.status_code
+
+
+# -----------------------------
+# Replay
+# -----------------------------
+def arrival_offsets(requests_, arrival, rate, speed, seed):
+    """When (seconds after start) each request is sent; None means as soon as a worker is free."""
+    if arrival == "closed" or (arrival != "log" and rate <= 0):
+        return [None] * len(requests_)
+    if arrival == "log":
+        start = requests_[0].get("t", 0.0) if requests_ else 0.0
+        return [(r.get("t", start) - start) / speed for r in requests_]
+
+    rng = random.Random(f"arrivals-{seed}")
+    offsets, t = [], 0.0
+    for _ in requests_:
+        t += rng.expovariate(rate) if arrival == "poisson" else 1.0 / rate
+        offsets.append(t)
+    return offsets
+
+
+def replay(target, requests_, concurrency, offsets):
+    """
+    Sends every request (at its offset, if any) with up to `concurrency` in
+    flight. Returns per-request records (path, status, latency_ms, lag_ms).
+    Latency is measured from when the request was due, so time spent
+    waiting for a free worker counts, as it would for a real client.
+    """
+    records = [None] * len(requests_)
+    start = time.perf_counter()
+
+    def run(i):
+        entry = requests_[i]
+        due = start + offsets[i] if offsets[i] is not None else time.perf_counter()
+        sent = time.perf_counter()
+        status, error = None, None
+        try:
+            status = target.send(entry.get("method", "POST"), entry["path"], entry.get("query"), entry.get("body"))
+        except Exception as e:
+            error = type(e).__name__
+        done = time.perf_counter()
+        records[i] = {
+            "path": entry["path"], "status": status, "error": error,
+            "latency_ms": (done - due) * 1000, "lag_ms": max(0.0, sent - due) * 1000,
+        }
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for i, offset in enumerate(offsets):
+            if offset is not None:
+                delay = start + offset - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            pool.submit(run, i)
+
+    return records, time.perf_counter() - start
+
+
+def report(records, elapsed):
+    """Latency percentiles, throughput and error rate, overall and per path."""
+    def section(rows):
+        latencies = [r["latency_ms"] for r in rows]
+        errors = [r for r in rows if r["error"] is not None or r["status"] >= 400]
+        return {
+            "requests": len(rows),
+            "throughput_rps": round(len(rows) / elapsed, 2) if elapsed else None,
+            "error_rate": round(len(errors) / len(rows), 4) if rows else 0.0,
+            "statuses": dict(Counter(str(r["status"] if r["error"] is None else r["error"]) for r in rows)),
+            "latency": summarize(latencies) if latencies else None,
+            "max_send_lag_ms": round(max(r["lag_ms"] for r in rows), 3) if rows else None,
+        }
+
+    by_path = defaultdict(list)
+    for r in records:
+        by_path[r["path"]].append(r)
+    return {
+        "elapsed_seconds": round(elapsed, 3),
+        "overall": section(records),
+        "endpoints": {path: section(rows) for path, rows in sorted(by_path.items())},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a JSONL request log against the API.")
+    parser.add_argument("log", nargs="?", help="JSONL request log")
+    parser.add_argument("--generate", type=int, metavar="N", help="print a synthetic N-request log and exit")
+    parser.add_argument("--chat-share", type=float, default=0.2, help="share of chat requests in --generate")
+    parser.add_argument("--target", default="test-client", help="'test-client' or a server URL")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--arrival", default="poisson", choices=["poisson", "uniform", "log", "closed"],
+                        help="request timing: generated at --rate, the log's own 't', or back-to-back")
+    parser.add_argument("--rate", type=float, default=100.0, help="requests per second (poisson/uniform)")
+    parser.add_argument("--speed", type=float, default=1.0, help="time compression for --arrival log")
+    parser.add_argument("--limit", type=int, help="only replay the first N requests")
+    parser.add_argument("--scale", type=int, default=1, help="in-memory catalogue size (x pdfmaker.data)")
+    parser.add_argument("--agent-latency", type=float, default=0.3, help="mock agent delay in seconds")
+    parser.add_argument("--mock-agent-port", type=int, default=0, help="port for the mock agent")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+
+    catalogue = make_catalogue(load_base("pdfmaker"), args.scale, args.seed)
+
+    if args.generate:
+        for entry in generate_log(args.generate, catalogue, args.chat_share, max(args.rate, 1.0), args.seed):
+            print(json.dumps(entry))
+        return
+    if not args.log:
+        parser.error("a log file is required (or --generate N)")
+
+    requests_, skipped = read_log(args.log)
+    if args.limit:
+        requests_ = requests_[:args.limit]
+    if not requests_:
+        raise SystemExit(f"No replayable requests in {args.log}")
+
+    agent_url = start_mock_agent(args.mock_agent_port, args.agent_latency)
+    if args.target == "test-client":
+        from services import chatbot, database
+        database.CATALOGUE_REFRESH_SECONDS = math.inf
+        install_catalogue(catalogue)
+        chatbot.DO_AGENT_ENDPOINT = agent_url
+        chatbot.DO_AGENT_KEY = "replay"
+        target = TestClientTarget()
+    else:
+        print(f"Mock agent listening at {agent_url}", file=sys.stderr)
+        target = HttpTarget(args.target)
+
+    offsets = arrival_offsets(requests_, args.arrival, args.rate, args.speed, args.seed)
+    print(f"Replaying {len(requests_)} requests ({skipped} skipped) against {args.target}...", file=sys.stderr)
+    records, elapsed = replay(target, requests_, args.concurrency, offsets)
+
+    meta = run_metadata({
+        "log": str(Path(args.log).resolve()), "target": args.target, "requests": len(requests_),
+        "skipped_lines": skipped, "concurrency": args.concurrency, "arrival": args.arrival,
+        "rate": args.rate, "scale": args.scale, "agent_latency": args.agent_latency, "seed": args.seed,
+    })
+    output = json.dumps({"meta": meta, **report(records, elapsed)}, indent=2)
+    if args.out:
+        Path(args.out).write_text(output + "\n")
+        print(f"Report written to {args.out}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+Benchmarks for the matcher and the recommendation endpoints, on synthetic
+catalogues 1x/10x/100x/1000x the size of pdfmaker.data (or the mock DB).
+
+Usage (from backend/):
+  python -m benchmarks.run_benchmarks                          # all scales, JSON to stdout
+  python -m benchmarks.run_benchmarks --scales 1 10 --out before.json
+  python -m benchmarks.run_benchmarks --out after.json --compare before.json
+
+MongoDB is never contacted: each synthetic catalogue is installed directly
+as the in-process catalogue snapshot. Catalogues and profiles come from a
+seed, so runs with the same arguments are comparable.
+"""
+
+import argparse
+import copy
+import gc
+import json
+import math
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.synthetic import load_base, make_catalogue, make_profiles
+from services import database
+from services.database import CatalogueSnapshot
+from services.matcher import UniversityMatcher
+from services.metrics import METRICS_ENABLED
+from services.program_index import get_program_index
+from services.result_cache import ranking_cache
+
+BACKEND_DIR = Path(__file__).parent.parent
+DEFAULT_SCALES = [1, 10, 100, 1000]
+
+
+def summarize(samples_ms):
+    """Latency summary (milliseconds) of a list of samples."""
+    values = np.array(samples_ms, dtype=np.float64)
+    return {
+        "n": int(values.size),
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "max_ms": round(float(values.max()), 3),
+    }
+
+
+def install_catalogue(catalogue, version=None):
+    """Makes `catalogue` the process's snapshot (instead of loading it from Mongo)."""
+    version = version or str(catalogue["_id"])
+    database.install_catalogue_snapshot(CatalogueSnapshot(version, catalogue, time.time()))
+    ranking_cache.clear()
+
+
+def fresh(profiles):
+    # The matcher normalizes profiles in place, so every run gets its own copy
+    return copy.deepcopy(profiles)
+
+
+def timed_calls(func, inputs, warmup=0):
+    """Calls func on each input, returning per-call milliseconds (after `warmup` untimed calls)."""
+    for item in inputs[:warmup]:
+        func(item)
+    samples = []
+    for item in inputs[warmup:]:
+        start = time.perf_counter()
+        func(item)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+# -----------------------------
+# Benchmarks
+# -----------------------------
+def bench_cold_start(catalogue, profile, skip_snapshot_stats=False):
+    """First-request costs after a new catalogue version is installed."""
+    install_catalogue(catalogue)
+    gc.collect()
+
+    start = time.perf_counter()
+    index = get_program_index()
+    index_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    UniversityMatcher(fresh(profile), "request").get_ranked_programs(top_k=10)
+    first_request_ms = (time.perf_counter() - start) * 1000
+
+    result = {
+        "programs": len(index),
+        "interest_terms": len(index.interest_vocab),
+        "course_codes": len(index.course_vocab),
+        "index_build_ms": round(index_ms, 3),
+        "first_request_ms": round(first_request_ms, 3),
+    }
+    if not skip_snapshot_stats:
+        # "snapshot" normalization scores a reference cohort on first use
+        start = time.perf_counter()
+        UniversityMatcher(fresh(profile), "snapshot").get_ranked_programs(top_k=10)
+        result["snapshot_stats_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    return result
+
+
+def bench_matcher(profiles, top_k, warmup):
+    """Per-request latency of UniversityMatcher.get_ranked_programs (result cache cleared)."""
+    ranking_cache.clear()
+    top = timed_calls(lambda p: UniversityMatcher(p).get_ranked_programs(top_k=top_k), fresh(profiles), warmup)
+    ranking_cache.clear()
+    full = timed_calls(lambda p: UniversityMatcher(p).get_ranked_programs(), fresh(profiles), warmup)
+    ranking_cache.clear()
+    return {"top_k": top_k, "top_k_latency": summarize(top), "full_ranking_latency": summarize(full)}
+
+
+def bench_batch(profiles, top_k):
+    """Throughput of UniversityMatcher.rank_many over every profile."""
+    ranking_cache.clear()
+    batch = fresh(profiles)
+    start = time.perf_counter()
+    count = sum(1 for _ in UniversityMatcher.rank_many(batch, top_k=top_k))
+    elapsed = time.perf_counter() - start
+    ranking_cache.clear()
+    return {"profiles": count, "seconds": round(elapsed, 4), "profiles_per_second": round(count / elapsed, 1)}
+
+
+def bench_endpoints(client, single, batch, top_k, warmup):
+    """
+    /api/recommend latency over `single` and /api/recommend/batch throughput
+    over `batch`, through the Flask test client.
+    """
+    ranking_cache.clear()
+
+    def recommend(profile):
+        response = client.post(f"/api/recommend?top_k={top_k}", json=profile)
+        assert response.status_code == 200, response.get_data(as_text=True)[:200]
+
+    latency = timed_calls(recommend, fresh(single), warmup)
+
+    ranking_cache.clear()
+    start = time.perf_counter()
+    response = client.post(f"/api/recommend/batch?top_k={top_k}", json={"profiles": fresh(batch)})
+    lines = response.get_data().count(b"\n")
+    elapsed = time.perf_counter() - start
+    ranking_cache.clear()
+
+    return {
+        "recommend_latency": summarize(latency),
+        "batch": {"profiles": lines, "seconds": round(elapsed, 4), "profiles_per_second": round(lines / elapsed, 1)},
+    }
+
+
+def bench_memory(catalogue, profiles, top_k):
+    """Peak Python-allocated memory for an index build plus a batch ranking."""
+    gc.collect()
+    tracemalloc.start()
+    install_catalogue(catalogue, version=f"{catalogue['_id']}-memory")
+    get_program_index()
+    _, index_peak = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    for _ in UniversityMatcher.rank_many(fresh(profiles), top_k=top_k):
+        pass
+    _, batch_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    ranking_cache.clear()
+    return {
+        "index_build_peak_mb": round(index_peak / 2**20, 2),
+        "batch_peak_mb": round(batch_peak / 2**20, 2),
+    }
+
+
+def bench_app_import():
+    """Seconds to import app.py in a fresh interpreter (no catalogue load)."""
+    code = "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True)
+    if out.returncode != 0:
+        return None
+    return round(float(out.stdout.strip().splitlines()[-1]) * 1000, 1)
+
+
+# -----------------------------
+# Reporting
+# -----------------------------
+def run_metadata(settings):
+    """Environment details plus the run's settings, so results can be compared."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "metrics_enabled": METRICS_ENABLED,
+        **settings,
+    }
+
+
+def compare(current, previous):
+    """Prints p50 latency and throughput ratios (current / previous) per scale."""
+    before = {r["scale"]: r for r in previous.get("results", [])}
+    print(f"{'scale':>6} {'matcher p50':>12} {'full p50':>10} {'batch/s':>9} {'api p50':>9}")
+    for result in current["results"]:
+        old = before.get(result["scale"])
+        if old is None:
+            continue
+
+        def ratio(path):
+            a, b = result, old
+            for key in path:
+                a, b = a[key], b[key]
+            return f"{a / b:.2f}x" if b else "n/a"
+
+        print(f"{result['scale']:>6} "
+              f"{ratio(['matcher', 'top_k_latency', 'p50_ms']):>12} "
+              f"{ratio(['matcher', 'full_ranking_latency', 'p50_ms']):>10} "
+              f"{ratio(['batch', 'profiles_per_second']):>9} "
+              f"{ratio(['endpoints', 'recommend_latency', 'p50_ms']):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the matcher and API on synthetic catalogues.")
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES)
+    parser.add_argument("--base", default="pdfmaker", choices=["pdfmaker", "mock"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--requests", type=int, default=100, help="timed single requests per scale")
+    parser.add_argument("--warmup", type=int, default=5, help="untimed requests before timing")
+    parser.add_argument("--batch-size", type=int, default=500, help="profiles in the batch benchmarks")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--skip-snapshot-stats", action="store_true",
+                        help="don't time the reference-cohort stats (slow on big catalogues)")
+    parser.add_argument("--out", help="write the JSON results here (default: stdout)")
+    parser.add_argument("--compare", help="previous results JSON to compare against")
+    args = parser.parse_args()
+
+    # The benchmark owns the snapshot; never go looking for a newer one
+    database.CATALOGUE_REFRESH_SECONDS = math.inf
+    from app import app
+    client = app.test_client()
+
+    base = load_base(args.base)
+    settings = {"base": args.base, "seed": args.seed, "requests": args.requests,
+                "batch_size": args.batch_size, "top_k": args.top_k}
+    report = {"meta": run_metadata(settings), "app_import_ms": bench_app_import(), "results": []}
+
+    for scale in args.scales:
+        catalogue = make_catalogue(base, scale, args.seed)
+        profiles = make_profiles(catalogue, max(args.requests + args.warmup, args.batch_size), args.seed)
+        single = profiles[:args.requests + args.warmup]
+        batch = profiles[:args.batch_size]
+        print(f"Benchmarking {scale}x ({sum(1 for k in catalogue if k not in ('_id', 'apply_deadline'))} universities)...",
+              file=sys.stderr)
+
+        result = {"scale": scale}
+        result["cold_start"] = bench_cold_start(catalogue, profiles[0], args.skip_snapshot_stats)
+        result["matcher"] = bench_matcher(single, args.top_k, args.warmup)
+        result["batch"] = bench_batch(batch, args.top_k)
+        result["endpoints"] = bench_endpoints(client, single, batch, args.top_k, args.warmup)
+        result["memory"] = bench_memory(catalogue, batch, args.top_k)
+        report["results"].append(result)
+
+    report["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(output + "\n")
+        print(f"Results written to {args.out}", file=sys.stderr)
+    else:
+        print(output)
+
+    if args.compare:
+        compare(report, json.loads(Path(args.compare).read_text()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Synthetic catalogues and student profiles for the benchmarks.
+Everything is generated from a seed, so the same arguments always give the
+same catalogue and the same profiles.
+"""
+
+import copy
+import math
+import random
+
+META_KEYS = {"_id", "apply_deadline"}
+
+
+def load_base(name):
+    """The catalogue the synthetic ones are scaled from: "pdfmaker" or "mock"."""
+    if name == "pdfmaker":
+        from pdfmaker import data
+        return data
+    if name == "mock":
+        from data.mock_universities import UNIVERSITY_DB
+        return UNIVERSITY_DB
+    raise ValueError(f"Unknown base catalogue '{name}'")
+
+
+def _interests(details):
+    return list(details.get("interests") or details.get("interest_fields") or [])
+
+
+def make_catalogue(base, scale, seed=0):
+    """
+    A catalogue with `scale` times the base's universities (and programs).
+    Copies keep the base's shape (steps, outcomes, course lists) with
+    jittered averages and reshuffled interests. The interest vocabulary grows
+    with log2(scale), as a real catalogue's would, rather than linearly.
+    """
+    rng = random.Random(f"catalogue-{seed}-{scale}")
+    universities = [(name, uni) for name, uni in base.items() if name not in META_KEYS and isinstance(uni, dict)]
+
+    vocab = sorted({t for _, uni in universities for p in (uni.get("programs") or {}).values() for t in _interests(p)})
+    extra_terms = int(len(vocab) * math.log2(scale)) if scale > 1 else 0
+    vocab += [f"topic-{n}" for n in range(extra_terms)]
+
+    catalogue = {"_id": f"synthetic-{scale}x-{seed}"}
+    if "apply_deadline" in base:
+        catalogue["apply_deadline"] = base["apply_deadline"]
+
+    for copy_n in range(scale):
+        for name, uni in universities:
+            uni_copy = {k: copy.deepcopy(v) for k, v in uni.items() if k != "programs"}
+            programs = {}
+            for prog_name, details in (uni.get("programs") or {}).items():
+                prog = copy.deepcopy(details)
+                avg = list(details.get("recommended_average") or [80, 85])
+                low, high = avg[0], avg[-1]
+                shift = rng.uniform(-4, 4) if copy_n else 0.0
+                prog["recommended_average"] = [round(min(99.0, low + shift), 1), round(min(100.0, high + shift), 1)]
+                terms = _interests(details)
+                if copy_n:
+                    keep = rng.sample(terms, k=max(1, len(terms) // 2)) if terms else []
+                    terms = keep + rng.sample(vocab, k=min(len(vocab), max(1, len(terms) - len(keep))))
+                prog["interests"] = terms
+                prog.pop("interest_fields", None)
+                programs[prog_name] = prog
+            uni_copy["programs"] = programs
+            catalogue[name if copy_n == 0 else f"{name} #{copy_n}"] = uni_copy
+
+    return catalogue
+
+
+def make_profiles(catalogue, count, seed=0):
+    """
+    `count` student profiles in the /api/recommend shape, drawing interests
+    and course codes from the catalogue itself so they actually match.
+    """
+    rng = random.Random(f"profiles-{seed}")
+    programs = [p for name, uni in catalogue.items() if name not in META_KEYS and isinstance(uni, dict)
+                for p in (uni.get("programs") or {}).values()]
+    terms = sorted({t for p in programs for t in _interests(p)})
+    codes = sorted({str(c).split(" ")[0].upper() for p in programs for c in p.get("required_courses", [])
+                    if len(str(c).split(" ")[0]) == 5})
+
+    profiles = []
+    for _ in range(count):
+        profiles.append({
+            "grade_level": rng.choice([11, 12]),
+            "average": round(rng.uniform(60, 100), 1),
+            "wants_coop": rng.random() < 0.5,
+            "extra_curriculars": [[f"club-{rng.randint(1, 50)}", rng.randint(1, 5)] for _ in range(rng.randint(0, 4))],
+            "major_interests": rng.sample(terms, k=min(len(terms), rng.randint(0, 4))),
+            "courses_taken": [[code, rng.randint(60, 100)] for code in rng.sample(codes, k=min(len(codes), rng.randint(0, 6)))],
+        })
+    return profiles
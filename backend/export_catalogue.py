@@ -0,0 +1,68 @@
+"""
+Export the university mega-document to a local snapshot file, so the backend
+can run with CATALOGUE_SOURCE=file (no MongoDB round trips, no startup ping).
+
+Usage:
+  python export_catalogue.py                          # from MongoDB
+  python export_catalogue.py --from pdfmaker          # from pdfmaker.data
+  python export_catalogue.py --from json unidata.json # from a mongoexport-style JSON file
+  python export_catalogue.py --out /path/to/catalogue.snapshot
+"""
+
+import argparse
+import os
+import time
+from pathlib import Path
+from bson import json_util
+
+from services.catalogue_file import save_catalogue_file, load_catalogue_file
+
+DEFAULT_OUT = os.getenv(
+    "CATALOGUE_FILE", str(Path(__file__).parent / "data" / "catalogue.snapshot")
+)
+
+
+def load_source(source, json_path=None):
+    if source == "mongo":
+        from services.database import fetch_university_data, close_connection
+        try:
+            return fetch_university_data()
+        finally:
+            close_connection()
+
+    if source == "pdfmaker":
+        from pdfmaker import data
+        return data
+
+    if source == "json":
+        if not json_path:
+            raise SystemExit("--from json needs a path, e.g. --from json unidata.json")
+        with open(json_path) as f:
+            # json_util understands {"$oid": ...} and friends from mongoexport
+            return json_util.loads(f.read())
+
+    raise SystemExit(f"Unknown source '{source}'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the catalogue to a local snapshot file.")
+    parser.add_argument("--from", dest="source", default="mongo", choices=["mongo", "pdfmaker", "json"])
+    parser.add_argument("json_path", nargs="?", help="input file for --from json")
+    parser.add_argument("--out", default=DEFAULT_OUT, help=f"output file (default: {DEFAULT_OUT})")
+    args = parser.parse_args()
+
+    doc = load_source(args.source, args.json_path)
+    header = save_catalogue_file(doc, args.out, source=args.source)
+
+    # Read it back so a broken export fails here, not at server startup
+    start = time.perf_counter()
+    version, _ = load_catalogue_file(args.out)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    size_kb = os.path.getsize(args.out) / 1024
+    print(f"Catalogue exported: {args.out} ({size_kb:.1f} KB, version {version}, loads in {load_ms:.1f} ms)")
+    return header
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Production server config.
+
+Usage (from backend/):
+  gunicorn -c gunicorn.conf.py
+
+The app, catalogue snapshot and scoring index are loaded once in the master
+(preload_app) and shared copy-on-write by the workers; see services/serving.py.
+"""
+
+import os
+
+wsgi_app = "app:app"
+bind = f"{os.getenv('API_HOST', '0.0.0.0')}:{os.getenv('FLASK_PORT', '5001')}"
+
+# Scoring is CPU-bound numpy work, so one process per core; threads cover
+# requests that wait on MongoDB or the chatbot agent
+workers = int(os.getenv("WEB_WORKERS", str(os.cpu_count() or 2)))
+threads = int(os.getenv("WEB_THREADS", "4"))
+worker_class = "gthread"
+
+# Background jobs (services/jobs.py). Status and result requests can land on
+# any worker, so with more than one the job table must be the shared SQLite
+# store. Each worker that runs jobs starts its own pool of JOB_WORKERS
+# processes, so the default splits the cores between workers rather than
+# giving every worker a pool the size of the machine.
+if workers > 1:
+    os.environ.setdefault("JOB_STORE", "sqlite")
+    if os.environ["JOB_STORE"].lower() != "sqlite":
+        raise RuntimeError(
+            f"JOB_STORE={os.environ['JOB_STORE']} is per process; use JOB_STORE=sqlite with WEB_WORKERS={workers}"
+        )
+    os.environ.setdefault("JOB_WORKERS", str(max(1, (os.cpu_count() or 2) // workers)))
+
+preload_app = True
+timeout = int(os.getenv("WEB_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("WEB_KEEPALIVE", "5"))
+
+accesslog = os.getenv("WEB_ACCESS_LOG", "-")
+errorlog = "-"
+
+
+def when_ready(server):
+    # Runs in the master after the app is preloaded, before any worker forks
+    from services.serving import start_master
+    start_master(server)
@@ -1,6 +1,15 @@
+import argparse
+import hashlib
+import io
 import json
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from pathlib import Path
+from pypdf import PdfWriter
 from reportlab.lib.pagesizes import LETTER
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
 
@@ -449,111 +458,277 @@ data = {
   }
 }
 
-# 2. Setup PDF
-pdf_filename = "University_Engineering_Programs.pdf"
-doc = SimpleDocTemplate(pdf_filename, pagesize=LETTER)
-styles = getSampleStyleSheet()
-story = []
-
-# Custom Styles
-title_style = ParagraphStyle(
-    'Title', parent=styles['Heading1'], alignment=1, fontSize=18, spaceAfter=20
-)
-uni_header_style = ParagraphStyle(
-    'UniHeader', parent=styles['Heading2'], fontSize=16, spaceBefore=15, spaceAfter=10, textColor=colors.darkblue
-)
-prog_header_style = ParagraphStyle(
-    'ProgHeader', parent=styles['Heading3'], fontSize=14, spaceBefore=10, spaceAfter=5, textColor=colors.black
-)
-normal_style = styles['Normal']
-bullet_style = ParagraphStyle(
-    'Bullet', parent=normal_style, leftIndent=20, bulletIndent=10, spaceAfter=2
-)
-step_header_style = ParagraphStyle(
-    'StepHeader', parent=styles['Heading4'], fontSize=12, spaceBefore=5, spaceAfter=5, textColor=colors.darkgreen
-)
+# 2. Styles
+# Bump when styles or layout change, so cached sections get re-rendered
+LAYOUT_VERSION = "1"
+DEFAULT_PDF = "University_Engineering_Programs.pdf"
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", str(Path(__file__).parent / ".pdf_cache"))
+
+
+@lru_cache(maxsize=1)
+def get_styles():
+    """Paragraph styles shared by every section (built once per process)."""
+    styles = getSampleStyleSheet()
+    normal_style = styles['Normal']
+    return {
+        "title": ParagraphStyle(
+            'Title', parent=styles['Heading1'], alignment=1, fontSize=18, spaceAfter=20
+        ),
+        "uni_header": ParagraphStyle(
+            'UniHeader', parent=styles['Heading2'], fontSize=16, spaceBefore=15, spaceAfter=10, textColor=colors.darkblue
+        ),
+        "prog_header": ParagraphStyle(
+            'ProgHeader', parent=styles['Heading3'], fontSize=14, spaceBefore=10, spaceAfter=5, textColor=colors.black
+        ),
+        "normal": normal_style,
+        "bullet": ParagraphStyle(
+            'Bullet', parent=normal_style, leftIndent=20, bulletIndent=10, spaceAfter=2
+        ),
+        "step_header": ParagraphStyle(
+            'StepHeader', parent=styles['Heading4'], fontSize=12, spaceBefore=5, spaceAfter=5, textColor=colors.darkgreen
+        ),
+    }
+
 
 # 3. Build Content
-story.append(Paragraph("Ontario University Engineering Programs Data", title_style))
-story.append(Paragraph("This document contains key processes, averages, requirements, and career outcomes.", normal_style))
-story.append(Spacer(1, 20))
-
-for uni_name, uni_data in data.items():
-    if uni_name == "_id" or uni_name == "apply_deadline":
-        continue
-        
+def title_story():
+    styles = get_styles()
+    return [
+        Paragraph("Ontario University Engineering Programs Data", styles["title"]),
+        Paragraph("This document contains key processes, averages, requirements, and career outcomes.", styles["normal"]),
+        Spacer(1, 20),
+    ]
+
+
+def program_story(prog_name, prog_details):
+    """Flowables for one program: averages, requirements, interests, outcomes, notes."""
+    styles = get_styles()
+    normal_style, bullet_style = styles["normal"], styles["bullet"]
+    story = [Paragraph(prog_name, styles["prog_header"])]
+
+    # Averages
+    avg = prog_details.get("recommended_average", "N/A")
+    if isinstance(avg, list):
+        avg_str = f"{avg[0]}% - {avg[1]}%" if len(avg) > 1 else f"{avg[0]}%"
+    else:
+        avg_str = str(avg)
+    story.append(Paragraph(f"<b>Recommended Average:</b> {avg_str}", normal_style))
+
+    # Required Courses
+    reqs = prog_details.get("required_courses", [])
+    if reqs:
+        story.append(Paragraph("<b>Required Courses:</b>", normal_style))
+        for req in reqs:
+            story.append(Paragraph(f"• {req}", bullet_style))
+
+    # Key Interests
+    interests = prog_details.get("interests", [])
+    if interests:
+        story.append(Paragraph("<b>Key Areas of Study:</b>", normal_style))
+        for interest in interests:
+            story.append(Paragraph(f"• {interest}", bullet_style))
+
+    # --- NEW: CAREER OUTCOMES ---
+    outcomes = prog_details.get("outcomes", [])
+    if outcomes:
+        story.append(Paragraph("<b>Top 3 Career Outcomes:</b>", normal_style))
+        for outcome in outcomes:
+            story.append(Paragraph(f"• {outcome}", bullet_style))
+    # ----------------------------
+
+    # Notes
+    notes = prog_details.get("notes")
+    if notes:
+        story.append(Paragraph(f"<b>Notes:</b> {notes}", normal_style))
+
+    story.append(Spacer(1, 10))
+    return story
+
+
+def university_header_story(uni_name, uni_data, apply_deadline=None):
+    """University header, global info (deadline, co-op, rating) and steps to apply."""
+    styles = get_styles()
+    normal_style = styles["normal"]
+
     # University Header
-    story.append(Paragraph(uni_name, uni_header_style))
-    
+    story = [Paragraph(uni_name, styles["uni_header"])]
+
     # Global Uni Info (Co-op, Rating)
     global_info = []
-    if "apply_deadline" in data:
-        global_info.append(f"<b>Application Deadline:</b> {data['apply_deadline']}")
-        
+    if apply_deadline is not None:
+        global_info.append(f"<b>Application Deadline:</b> {apply_deadline}")
+
     if "co-op" in uni_data:
         coop_status = ", ".join(uni_data['co-op'])
         global_info.append(f"<b>Co-op Available:</b> {coop_status}")
-    
+
     if "ec_quality" in uni_data:
-         global_info.append(f"<b>Extracurricular Quality Rating:</b> {uni_data['ec_quality']}/5")
+        global_info.append(f"<b>Extracurricular Quality Rating:</b> {uni_data['ec_quality']}/5")
 
     for info in global_info:
         story.append(Paragraph(info, normal_style))
-    
+
     # --- Steps to Apply ---
     if "steps" in uni_data:
         story.append(Spacer(1, 5))
-        story.append(Paragraph("Steps to Apply:", step_header_style))
+        story.append(Paragraph("Steps to Apply:", styles["step_header"]))
         for step in uni_data["steps"]:
-             story.append(Paragraph(step, bullet_style))
+            story.append(Paragraph(step, styles["bullet"]))
     # ----------------------
 
     story.append(Spacer(1, 10))
-    
-    # Programs
-    programs = uni_data.get("programs", {})
-    for prog_name, prog_details in programs.items():
-        story.append(Paragraph(prog_name, prog_header_style))
-        
-        # Averages
-        avg = prog_details.get("recommended_average", "N/A")
-        if isinstance(avg, list):
-            avg_str = f"{avg[0]}% - {avg[1]}%" if len(avg) > 1 else f"{avg[0]}%"
-        else:
-            avg_str = str(avg)
-        story.append(Paragraph(f"<b>Recommended Average:</b> {avg_str}", normal_style))
-        
-        # Required Courses
-        reqs = prog_details.get("required_courses", [])
-        if reqs:
-            story.append(Paragraph("<b>Required Courses:</b>", normal_style))
-            for req in reqs:
-                story.append(Paragraph(f"• {req}", bullet_style))
-        
-        # Key Interests
-        interests = prog_details.get("interests", [])
-        if interests:
-            story.append(Paragraph("<b>Key Areas of Study:</b>", normal_style))
-            for interest in interests:
-                story.append(Paragraph(f"• {interest}", bullet_style))
-
-        # --- NEW: CAREER OUTCOMES ---
-        outcomes = prog_details.get("outcomes", [])
-        if outcomes:
-            story.append(Paragraph("<b>Top 3 Career Outcomes:</b>", normal_style))
-            for outcome in outcomes:
-                story.append(Paragraph(f"• {outcome}", bullet_style))
-        # ----------------------------
-        
-        # Notes
-        notes = prog_details.get("notes")
-        if notes:
-             story.append(Paragraph(f"<b>Notes:</b> {notes}", normal_style))
-             
-        story.append(Spacer(1, 10))
-        
-    story.append(PageBreak())
-
-# 4. Generate
-doc.build(story)
-print(f"PDF generated: {pdf_filename}")
\ No newline at end of file
+    return story
+
+
+def university_story(uni_name, uni_data, apply_deadline=None):
+    story = university_header_story(uni_name, uni_data, apply_deadline)
+    for prog_name, prog_details in uni_data.get("programs", {}).items():
+        story.extend(program_story(prog_name, prog_details))
+    return story
+
+
+def render_story(story):
+    """Renders flowables to PDF bytes."""
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer, pagesize=LETTER).build(story)
+    return buffer.getvalue()
+
+
+def render_section(section):
+    """
+    Renders one university section (its own pages) to PDF bytes.
+    Module-level so it can run in a worker process.
+    """
+    uni_name, uni_data, apply_deadline, with_title = section
+    story = title_story() if with_title else []
+    story.extend(university_story(uni_name, uni_data, apply_deadline))
+    return render_story(story)
+
+
+def section_key(section):
+    """Content hash of everything that affects a section's pages."""
+    raw = json.dumps([LAYOUT_VERSION, *section], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _read_cached(cached_file):
+    """A cached section's bytes, or None (missing, or pruned by another build meanwhile)."""
+    try:
+        return cached_file.read_bytes()
+    except FileNotFoundError:
+        return None
+
+
+def _write_cached(cached_file, pdf_bytes):
+    """
+    Atomically stores a section: the cache is shared by job workers and
+    server processes, so readers must never see a half-written file.
+    """
+    tmp_path = cached_file.with_name(f"{cached_file.name}.{uuid.uuid4().hex}.tmp")
+    tmp_path.write_bytes(pdf_bytes)
+    os.replace(tmp_path, cached_file)
+
+
+def _prune_cache(cache, keys):
+    """Drops cached sections no longer part of the catalogue (older versions)."""
+    for cached_file in cache.glob("*.pdf"):
+        if cached_file.stem not in keys:
+            cached_file.unlink(missing_ok=True)
+
+
+def catalogue_sections(catalogue):
+    """One (uni_name, uni_data, apply_deadline, with_title) tuple per university, in order."""
+    apply_deadline = catalogue.get("apply_deadline")
+    sections = []
+    for uni_name, uni_data in catalogue.items():
+        if uni_name == "_id" or uni_name == "apply_deadline":
+            continue
+        sections.append((uni_name, uni_data, apply_deadline, not sections))
+    return sections
+
+
+def build_pdf(pdf_filename=DEFAULT_PDF, catalogue=None, cache_dir=PDF_CACHE_DIR, workers=None,
+              pool=None, on_progress=None):
+    """
+    Builds the catalogue PDF section by section.
+    Each university is rendered on its own (in parallel across processes) and
+    cached by a hash of its data, so changing one program only re-renders
+    that university; the final file is assembled by merging section pages.
+    `pool` renders on an existing executor instead of a new one, and
+    `on_progress(done, total)` is called as sections are ready (cached
+    sections count as done from the start).
+    Returns {"sections", "rendered", "cached"}.
+    """
+    catalogue = data if catalogue is None else catalogue
+    sections = catalogue_sections(catalogue)
+    keys = [section_key(section) for section in sections]
+
+    cache = Path(cache_dir) if cache_dir else None
+    if cache is not None:
+        cache.mkdir(parents=True, exist_ok=True)
+
+    pages = {}
+    todo = []
+    for key, section in zip(keys, sections):
+        cached = _read_cached(cache / f"{key}.pdf") if cache is not None else None
+        if cached is not None:
+            pages[key] = cached
+        elif key not in pages:
+            pages[key] = None
+            todo.append((key, section))
+
+    # 4. Render what changed
+    if on_progress:
+        on_progress(len(sections) - len(todo), len(sections))
+    if pool is not None:
+        futures = {pool.submit(render_section, section): key for key, section in todo}
+        for done, future in enumerate(as_completed(futures), start=1):
+            pages[futures[future]] = future.result()
+            if on_progress:
+                on_progress(len(sections) - len(todo) + done, len(sections))
+    elif len(todo) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rendered = pool.map(render_section, [section for _, section in todo])
+            for (key, _), pdf_bytes in zip(todo, rendered):
+                pages[key] = pdf_bytes
+    else:
+        for key, section in todo:
+            pages[key] = render_section(section)
+
+    if cache is not None:
+        for key, _ in todo:
+            _write_cached(cache / f"{key}.pdf", pages[key])
+        _prune_cache(cache, set(keys))
+
+    # 5. Generate
+    writer = PdfWriter()
+    for key in keys:
+        writer.append(io.BytesIO(pages[key]))
+    with open(pdf_filename, "wb") as f:
+        writer.write(f)
+
+    print(f"PDF generated: {pdf_filename} ({len(todo)} of {len(sections)} sections rendered)")
+    return {"sections": len(sections), "rendered": len(todo), "cached": len(sections) - len(todo)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the university programs PDF.")
+    parser.add_argument("--out", default=DEFAULT_PDF)
+    parser.add_argument("--from", dest="source", default="pdfmaker", choices=["pdfmaker", "mongo", "json"],
+                        help="where the catalogue comes from (default: the data in this file)")
+    parser.add_argument("json_path", nargs="?", help="input file for --from json")
+    parser.add_argument("--cache-dir", default=PDF_CACHE_DIR)
+    parser.add_argument("--no-cache", action="store_true", help="re-render every section")
+    parser.add_argument("--workers", type=int, default=None, help="render processes (default: CPU count)")
+    args = parser.parse_args()
+
+    catalogue = data
+    if args.source != "pdfmaker":
+        from export_catalogue import load_source
+        catalogue = load_source(args.source, args.json_path)
+
+    build_pdf(args.out, catalogue, None if args.no_cache else args.cache_dir, args.workers)
+
+
+if __name__ == "__main__":
+    main()
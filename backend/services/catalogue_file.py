@@ -0,0 +1,72 @@
+"""
+Local catalogue snapshot files - lets the backend run from a file on disk
+instead of MongoDB (CATALOGUE_SOURCE=file).
+
+File layout:
+  line 1: magic  b"ADMITTREE-CATALOGUE 1\n"
+  line 2: JSON header {"version", "exported_at", "source"}   (readable without decompressing)
+  rest:   zlib-compressed BSON of the mega-document
+"""
+
+import hashlib
+import json
+import os
+import time
+import zlib
+import bson
+
+MAGIC = b"ADMITTREE-CATALOGUE 1\n"
+
+
+def document_version(doc):
+    """
+    Version string for a mega-document: its Mongo _id when it has one,
+    otherwise a content hash (e.g. for pdfmaker.data).
+    """
+    if doc.get("_id") is not None:
+        return str(doc["_id"])
+    return hashlib.sha256(bson.encode(doc)).hexdigest()[:24]
+
+
+def save_catalogue_file(doc, path, source="unknown"):
+    """
+    Writes the mega-document to `path` (atomically, via a temp file).
+    Returns the header that was written.
+    """
+    header = {
+        "version": document_version(doc),
+        "exported_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "source": source,
+    }
+    payload = zlib.compress(bson.encode(doc), 9)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(json.dumps(header).encode() + b"\n")
+        f.write(payload)
+
+    os.replace(tmp_path, path)
+    return header
+
+
+def _read_header(f, path):
+    if f.readline() != MAGIC:
+        raise ValueError(f"{path} is not an AdmitTree catalogue snapshot")
+    return json.loads(f.readline())
+
+
+def read_catalogue_header(path):
+    """Reads just the header (version etc.) without decoding the catalogue."""
+    with open(path, "rb") as f:
+        return _read_header(f, path)
+
+
+def load_catalogue_file(path):
+    """
+    Returns (version, mega-document) from a snapshot file.
+    """
+    with open(path, "rb") as f:
+        header = _read_header(f, path)
+        doc = bson.decode(zlib.decompress(f.read()))
+    return header["version"], doc
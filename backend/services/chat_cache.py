@@ -0,0 +1,149 @@
+"""
+Answer cache in front of the chatbot agent.
+Students ask the same few dozen questions over and over, so answers are
+reused: first by exact match on the normalized message, then (optionally)
+by TF-IDF cosine similarity above a threshold.
+"""
+
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+CHAT_CACHE_SIZE = int(os.getenv("CHAT_CACHE_SIZE", "512"))               # 0 disables the cache
+CHAT_CACHE_TTL = float(os.getenv("CHAT_CACHE_TTL", "3600"))              # seconds
+CHAT_CACHE_SIMILARITY = float(os.getenv("CHAT_CACHE_SIMILARITY", "0.9"))  # 0 = exact matches only
+
+# Words that carry no meaning for matching questions
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "what", "whats", "when", "whens", "how", "hows",
+    "do", "does", "did", "i", "me", "my", "you", "your", "for", "of", "to", "in", "on",
+    "at", "and", "or", "can", "could", "would", "should", "please", "tell", "about", "it",
+    "its", "be", "there", "this", "that", "with",
+}
+
+
+def normalize_message(message):
+    """
+    Lowercases, drops possessives and punctuation and collapses whitespace:
+    "What's Waterloo's AIF deadline?" -> "what waterloo aif deadline"
+    """
+    text = message.lower().replace("’", "'")
+    text = re.sub(r"'s\b", "", text)
+    text = re.sub(r"[^a-z0-9+#/ ]+", " ", text)
+    return " ".join(text.split())
+
+
+def _terms(normalized):
+    return [t for t in normalized.split() if t not in STOPWORDS]
+
+
+class ChatAnswerCache:
+    """
+    LRU + TTL cache of agent answers keyed by normalized message, with a
+    TF-IDF similarity fallback over the cached questions.
+    """
+
+    def __init__(self, max_size=CHAT_CACHE_SIZE, ttl=CHAT_CACHE_TTL, similarity=CHAT_CACHE_SIMILARITY):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.similarity = similarity
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        # normalized message -> (stored_at, answer, term counts)
+        self._entries = OrderedDict()
+        # How many cached questions contain each term (for IDF)
+        self._doc_freq = Counter()
+        self._lock = threading.Lock()
+
+    def _drop(self, key):
+        # Caller holds the lock
+        _, _, terms = self._entries.pop(key)
+        for term in terms:
+            self._doc_freq[term] -= 1
+            if self._doc_freq[term] <= 0:
+                del self._doc_freq[term]
+
+    def _tfidf(self, terms):
+        n = len(self._entries) + 1
+        return {
+            term: count * (math.log(n / (1 + self._doc_freq.get(term, 0))) + 1)
+            for term, count in terms.items()
+        }
+
+    @staticmethod
+    def _cosine(a, b):
+        dot = sum(weight * b.get(term, 0.0) for term, weight in a.items())
+        if not dot:
+            return 0.0
+        norm_a = math.sqrt(sum(w * w for w in a.values()))
+        norm_b = math.sqrt(sum(w * w for w in b.values()))
+        return dot / (norm_a * norm_b)
+
+    def get(self, message):
+        """Returns a cached answer for this (or a very similar) question, or None."""
+        if self.max_size <= 0:
+            return None
+
+        key = normalize_message(message)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry[0] <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.exact_hits += 1
+                    return entry[1]
+                self._drop(key)
+
+            if self.similarity > 0:
+                query = Counter(_terms(key))
+                if query:
+                    query_vec = self._tfidf(query)
+                    best_key, best_score = None, 0.0
+                    for other_key, (stored_at, _, terms) in self._entries.items():
+                        if now - stored_at > self.ttl:
+                            continue
+                        score = self._cosine(query_vec, self._tfidf(terms))
+                        if score > best_score:
+                            best_key, best_score = other_key, score
+                    if best_key is not None and best_score >= self.similarity:
+                        self._entries.move_to_end(best_key)
+                        self.similar_hits += 1
+                        return self._entries[best_key][1]
+
+            self.misses += 1
+            return None
+
+    def put(self, message, answer):
+        if self.max_size <= 0:
+            return
+
+        key = normalize_message(message)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            terms = Counter(_terms(key))
+            self._entries[key] = (time.monotonic(), answer, terms)
+            self._doc_freq.update(terms.keys())
+            while len(self._entries) > self.max_size:
+                self._drop(next(iter(self._entries)))
+
+    def stats(self):
+        with self._lock:
+            lookups = self.exact_hits + self.similar_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "exact_hits": self.exact_hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.exact_hits + self.similar_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Shared by every request in the process
+chat_cache = ChatAnswerCache()
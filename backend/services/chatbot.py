@@ -1,6 +1,14 @@
+import json
 import os
+import random
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
+from services.chat_cache import chat_cache
+from services.retrieval import answer_locally, ground_message
+from services.metrics import AGENT_SECONDS, CHAT_REPLIES, STAGE_SECONDS, timed
 
 # Load secrets from .env
 load_dotenv()
@@ -8,58 +16,346 @@ load_dotenv()
 DO_AGENT_ENDPOINT = os.getenv("DO_AGENT_ENDPOINT")
 DO_AGENT_KEY = os.getenv("DO_AGENT_KEY")
 
+# Connection handling for the agent (seconds unless noted)
+CHAT_CONNECT_TIMEOUT = float(os.getenv("CHAT_CONNECT_TIMEOUT", "3.05"))
+CHAT_READ_TIMEOUT = float(os.getenv("CHAT_READ_TIMEOUT", "30"))
+CHAT_POOL_SIZE = int(os.getenv("CHAT_POOL_SIZE", "10"))             # keep-alive connections
+CHAT_MAX_CONCURRENCY = int(os.getenv("CHAT_MAX_CONCURRENCY", "8"))  # in-flight agent calls per process
+CHAT_QUEUE_TIMEOUT = float(os.getenv("CHAT_QUEUE_TIMEOUT", "5"))    # wait for a free slot
+CHAT_MAX_RETRIES = int(os.getenv("CHAT_MAX_RETRIES", "2"))
+CHAT_BACKOFF_BASE = float(os.getenv("CHAT_BACKOFF_BASE", "0.5"))
+CHAT_BREAKER_THRESHOLD = int(os.getenv("CHAT_BREAKER_THRESHOLD", "5"))  # consecutive failures
+CHAT_BREAKER_COOLDOWN = float(os.getenv("CHAT_BREAKER_COOLDOWN", "30"))
+
+# Upstream statuses worth retrying (rate limited / gateway hiccups)
+RETRY_STATUSES = {429, 502, 503, 504}
+
+CONNECTION_ERROR_REPLY = "Sorry, I'm having trouble connecting to the AI agent right now."
+BUSY_REPLY = "I'm answering a lot of questions right now, please try again in a moment."
+
+
+class CircuitBreaker:
+    """
+    Stops calling the agent after `threshold` consecutive failures.
+    After `cooldown` seconds one trial call is let through (half-open):
+    success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, threshold=CHAT_BREAKER_THRESHOLD, cooldown=CHAT_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+class AgentUnavailableError(Exception):
+    """The agent could not be reached, even after retries."""
+
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(CHAT_MAX_CONCURRENCY)
+breaker = CircuitBreaker()
+
+
+def get_session():
+    """
+    Shared keep-alive session for the agent, so chat messages reuse
+    TCP+TLS connections. Recreated after a fork (sockets can't be shared).
+    """
+    global _session, _session_pid
+
+    if _session is not None and _session_pid == os.getpid():
+        return _session
+
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=CHAT_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({
+                "Authorization": f"Bearer {DO_AGENT_KEY}",
+                "Content-Type": "application/json"
+            })
+            _session = session
+            _session_pid = os.getpid()
+        return _session
+
+
+def _build_payload(user_message, stream=False):
+    # OpenAI Compatible Format (the endpoint URL ends in /completions)
+    payload = {
+        "messages": [
+            {
+                "role": "user",
+                # Add context
+                "content": user_message + " (Answer in 2-3 short sentences maximum. Be extremely concise and conversational. Use only plain paragraphs. Do not use tables, lists, or bold formatting.)"
+            }
+        ]
+    }
+    if stream:
+        payload["stream"] = True
+    return payload
+
+
+def _post_with_retries(payload, **kwargs):
+    """
+    POSTs to the agent with connect/read timeouts, retrying connection
+    errors and RETRY_STATUSES with exponential backoff + jitter.
+    Returns the final requests.Response (any status).
+    """
+    session = get_session()
+    attempt = 0
+    start = time.perf_counter()
+    while True:
+        try:
+            response = session.post(
+                DO_AGENT_ENDPOINT,
+                json=payload,
+                timeout=(CHAT_CONNECT_TIMEOUT, CHAT_READ_TIMEOUT),
+                **kwargs
+            )
+            if response.status_code not in RETRY_STATUSES or attempt >= CHAT_MAX_RETRIES:
+                outcome = "ok" if response.status_code == 200 else "http_error"
+                AGENT_SECONDS.observe(time.perf_counter() - start, outcome=outcome)
+                return response
+            response.close()
+            reason = f"status {response.status_code}"
+        except requests.exceptions.ConnectionError as e:
+            # Includes connect timeouts; read timeouts are not retried
+            # (the agent already spent CHAT_READ_TIMEOUT on this message)
+            if attempt >= CHAT_MAX_RETRIES:
+                AGENT_SECONDS.observe(time.perf_counter() - start, outcome="connection_error")
+                raise AgentUnavailableError(str(e)) from e
+            reason = type(e).__name__
+
+        delay = CHAT_BACKOFF_BASE * (2 ** attempt) * (0.5 + random.random())
+        print(f"Agent call failed ({reason}), retrying in {delay:.2f}s...")
+        time.sleep(delay)
+        attempt += 1
+
+
+@timed(STAGE_SECONDS.labels(stage="chat"))
 def get_chat_response(user_message):
     """
-    Forwards the user's message to the DigitalOcean Agent.
+    Answers catalogue lookups locally; forwards everything else to the DigitalOcean Agent.
     """
+    # 0. Factual questions about the catalogue never leave the process
+    local = answer_locally(user_message)
+    if local is not None:
+        CHAT_REPLIES.inc(source="local")
+        return local
+
     # 1. Safety Check
     if not DO_AGENT_ENDPOINT or not DO_AGENT_KEY:
         print("Error: Missing DO_AGENT_ENDPOINT or DO_AGENT_KEY in .env")
+        CHAT_REPLIES.inc(source="unavailable")
         return "I'm having trouble accessing my brain (credentials missing)."
 
+    # 2. Repeated questions are answered from the cache
+    cached = chat_cache.get(user_message)
+    if cached is not None:
+        CHAT_REPLIES.inc(source="cache")
+        return cached
+
+    # 3. Bound how many workers can be waiting on the agent at once
+    if not _slots.acquire(timeout=CHAT_QUEUE_TIMEOUT):
+        CHAT_REPLIES.inc(source="busy")
+        return BUSY_REPLY
+
     try:
-        # 2. DEBUGGING: Print exactly what we are using (Check your terminal!)
-        print(f"DEBUG: Endpoint: {DO_AGENT_ENDPOINT}")
-        print(f"DEBUG: Key: '{DO_AGENT_KEY}'") # Quotes help you see invisible spaces!
-
-        # 3. Prepare the Headers
-        headers = {
-            "Authorization": f"Bearer {DO_AGENT_KEY}",
-            "Content-Type": "application/json"
-        }
-        
-        # 4. Prepare the Payload (OpenAI Compatible Format)
-        # We use this format because your URL ends in /completions
-        payload = {
-            "messages": [
-                {
-                    "role": "user", 
-                    # Add context 
-                    "content": user_message + " (Answer in 2-3 short sentences maximum. Be extremely concise and conversational. Use only plain paragraphs. Do not use tables, lists, or bold formatting.)"
-                }
-            ]
-        }
-
-        print(f"Sending message to Agent...")
+        # 4. Fail fast while the agent is known to be down
+        if not breaker.allow():
+            CHAT_REPLIES.inc(source="unavailable")
+            return CONNECTION_ERROR_REPLY
 
         # 5. Send to DigitalOcean
-        response = requests.post(DO_AGENT_ENDPOINT, json=payload, headers=headers)
-        
+        response = _post_with_retries(_build_payload(ground_message(user_message)))
+
         # 6. Handle Response
         if response.status_code == 200:
+            breaker.record_success()
             data = response.json()
-            
+
             # Try to grab the text from standard OpenAI format
             try:
-                return data["choices"][0]["message"]["content"]
-            except KeyError:
+                reply = data["choices"][0]["message"]["content"]
+            except (KeyError, IndexError, TypeError):
                 # Fallback if DigitalOcean uses a different format
-                return data.get("answer", "I received a response, but it was empty.")
-                
+                reply = data.get("answer")
+
+            if not reply:
+                CHAT_REPLIES.inc(source="error")
+                return "I received a response, but it was empty."
+            chat_cache.put(user_message, reply)
+            CHAT_REPLIES.inc(source="agent")
+            return reply
+
         else:
+            if response.status_code >= 500 or response.status_code in RETRY_STATUSES:
+                breaker.record_failure()
+            else:
+                # The agent is up, it just rejected this request
+                breaker.record_success()
             print(f"Agent Error {response.status_code}: {response.text}")
-            return "Sorry, I'm having trouble connecting to the AI agent right now."
+            CHAT_REPLIES.inc(source="error")
+            return CONNECTION_ERROR_REPLY
 
     except Exception as e:
+        breaker.record_failure()
         print(f"Connection Exception: {e}")
-        return "Sorry, I'm having trouble connecting to the AI agent right now."
\ No newline at end of file
+        CHAT_REPLIES.inc(source="error")
+        return CONNECTION_ERROR_REPLY
+
+    finally:
+        _slots.release()
+
+
+def _iter_stream_chunks(response):
+    """
+    Yields text deltas from an OpenAI-compatible `stream: true` response
+    (server-sent events: "data: {...}" lines, ending with "data: [DONE]").
+    If the agent answered with a plain JSON body instead, yields it whole.
+    """
+    if "text/event-stream" not in response.headers.get("Content-Type", ""):
+        data = response.json()
+        try:
+            reply = data["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError):
+            reply = data.get("answer")
+        if reply:
+            yield reply
+        return
+
+    # chunk_size=None hands over bytes as soon as they arrive instead of
+    # waiting to fill a buffer, so the first words reach the browser early
+    response.encoding = response.encoding or "utf-8"
+    for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+        if not line or not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return
+        try:
+            choice = json.loads(data)["choices"][0]
+        except (ValueError, KeyError, IndexError, TypeError):
+            continue
+        text = (choice.get("delta") or {}).get("content") or (choice.get("message") or {}).get("content")
+        if text:
+            yield text
+
+
+def stream_chat_response(user_message):
+    """
+    Streaming version of get_chat_response: yields the reply in chunks as the
+    agent generates them. Always yields at least one chunk (an apology if the
+    agent can't be reached), so callers can relay it straight to the browser.
+    """
+    local = answer_locally(user_message)
+    if local is not None:
+        CHAT_REPLIES.inc(source="local")
+        yield local
+        return
+
+    if not DO_AGENT_ENDPOINT or not DO_AGENT_KEY:
+        print("Error: Missing DO_AGENT_ENDPOINT or DO_AGENT_KEY in .env")
+        CHAT_REPLIES.inc(source="unavailable")
+        yield "I'm having trouble accessing my brain (credentials missing)."
+        return
+
+    cached = chat_cache.get(user_message)
+    if cached is not None:
+        CHAT_REPLIES.inc(source="cache")
+        yield cached
+        return
+
+    if not _slots.acquire(timeout=CHAT_QUEUE_TIMEOUT):
+        CHAT_REPLIES.inc(source="busy")
+        yield BUSY_REPLY
+        return
+
+    # The slot is held until the stream finishes (or the client goes away)
+    try:
+        if not breaker.allow():
+            CHAT_REPLIES.inc(source="unavailable")
+            yield CONNECTION_ERROR_REPLY
+            return
+
+        try:
+            response = _post_with_retries(_build_payload(ground_message(user_message), stream=True), stream=True)
+        except Exception as e:
+            breaker.record_failure()
+            print(f"Connection Exception: {e}")
+            CHAT_REPLIES.inc(source="error")
+            yield CONNECTION_ERROR_REPLY
+            return
+
+        with response:
+            if response.status_code != 200:
+                if response.status_code >= 500 or response.status_code in RETRY_STATUSES:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                print(f"Agent Error {response.status_code}: {response.text}")
+                CHAT_REPLIES.inc(source="error")
+                yield CONNECTION_ERROR_REPLY
+                return
+
+            breaker.record_success()
+            chunks = []
+            try:
+                for chunk in _iter_stream_chunks(response):
+                    chunks.append(chunk)
+                    yield chunk
+            except requests.exceptions.RequestException as e:
+                print(f"Stream interrupted: {e}")
+                CHAT_REPLIES.inc(source="error")
+                if not chunks:
+                    yield CONNECTION_ERROR_REPLY
+                return
+
+            if not chunks:
+                CHAT_REPLIES.inc(source="error")
+                yield "I received a response, but it was empty."
+                return
+            # Only complete answers are cached
+            chat_cache.put(user_message, "".join(chunks))
+            CHAT_REPLIES.inc(source="agent")
+
+    finally:
+        _slots.release()
@@ -4,11 +4,17 @@ Fetches the newest mega-document from the collection.
 """
 
 import os
+import threading
+import time
 from pathlib import Path
+from typing import NamedTuple
 from pymongo import MongoClient
 from dotenv import load_dotenv
 import certifi
 
+from services.catalogue_file import load_catalogue_file, read_catalogue_header
+from services.metrics import MONGO_ROUNDTRIPS, STAGE_SECONDS, timed
+
 from pymongo.errors import (
     ServerSelectionTimeoutError,
     ConfigurationError,
@@ -24,6 +30,22 @@ MONGODB_URI = os.getenv("MONGODB_URI")
 DATABASE_NAME = os.getenv("MONGODB_DB_NAME", "admit_tree_db")
 COLLECTION_NAME = os.getenv("MONGODB_COLLECTION", "programs")
 
+# How often (seconds) a warm cache checks Mongo for a newer mega-document
+CATALOGUE_REFRESH_SECONDS = float(os.getenv("CATALOGUE_REFRESH_SECONDS", "60"))
+
+# Where the catalogue snapshot comes from:
+#   "mongo" - MongoDB (default)
+#   "file"  - a local snapshot written by export_catalogue.py; no network at all
+CATALOGUE_SOURCE = os.getenv("CATALOGUE_SOURCE", "mongo")
+CATALOGUE_FILE = os.getenv("CATALOGUE_FILE", str(backend_dir / "data" / "catalogue.snapshot"))
+
+# How the snapshot is loaded from Mongo:
+#   "document" - the whole mega-document (steps, outcomes, ... included)
+#   "rows"     - only the scoring columns, flattened server-side (see fetch_program_rows);
+#                reports, PDFs and chat fetch the full document on first use
+CATALOGUE_FETCH = os.getenv("CATALOGUE_FETCH", "document")
+MONGODB_BATCH_SIZE = int(os.getenv("MONGODB_BATCH_SIZE", "500"))
+
 _client: MongoClient | None = None
 _database = None
 
@@ -54,6 +76,7 @@ def get_database():
         )
 
         # Fail fast if unreachable / DNS / IP not allowed / auth wrong
+        MONGO_ROUNDTRIPS.inc(operation="ping")
         _client.admin.command("ping")
 
         _database = _client[DATABASE_NAME]
@@ -89,9 +112,9 @@ def get_universities_collection():
     return db[COLLECTION_NAME]
 
 
-def fetch_university_data():
+def fetch_university_data(doc_id=None):
     """
-    Fetch the newest mega-document from MongoDB.
+    Fetch the newest mega-document from MongoDB (or the one with _id doc_id).
     Expected doc shape:
       {
         _id: ...,
@@ -102,7 +125,11 @@ def fetch_university_data():
     """
     collection = get_universities_collection()
 
-    doc = collection.find_one(sort=[("_id", -1)])
+    MONGO_ROUNDTRIPS.inc(operation="find_document")
+    if doc_id is None:
+        doc = collection.find_one(sort=[("_id", -1)])
+    else:
+        doc = collection.find_one({"_id": doc_id})
     if not doc:
         raise ValueError(
             f"No documents found in MongoDB collection '{COLLECTION_NAME}' "
@@ -112,6 +139,291 @@ def fetch_university_data():
     return doc
 
 
+def fetch_program_rows(batch_size=MONGODB_BATCH_SIZE):
+    """
+    Streams the newest mega-document as flat program rows, projected down to
+    the columns the matcher scores on (no steps/outcomes/notes on the wire).
+    Yields dicts like:
+      {version, university, ec_quality, co_op, program,
+       recommended_average, required_courses, interests, interest_fields}
+    Fields a program doesn't have are simply absent.
+    """
+    collection = get_universities_collection()
+
+    pipeline = [
+        # Step 1: Only the newest mega-document
+        {"$sort": {"_id": -1}},
+        {"$limit": 1},
+
+        # Step 2: Turn the document into key/value pairs and keep universities
+        {"$project": {"version": "$_id", "data": {"$objectToArray": "$$ROOT"}}},
+        {"$unwind": "$data"},
+        {"$match": {"data.v.programs": {"$exists": True}}},
+
+        # Step 3: One row per program
+        {"$project": {
+            "version": 1,
+            "university": "$data.k",
+            "ec_quality": "$data.v.ec_quality",
+            "co_op": "$data.v.co-op",
+            "program_entries": {"$objectToArray": "$data.v.programs"},
+        }},
+        {"$unwind": "$program_entries"},
+
+        # Step 4: Keep only the scoring columns
+        {"$project": {
+            "_id": 0,
+            "version": 1,
+            "university": 1,
+            "ec_quality": 1,
+            "co_op": 1,
+            "program": "$program_entries.k",
+            "recommended_average": "$program_entries.v.recommended_average",
+            "required_courses": "$program_entries.v.required_courses",
+            "interests": "$program_entries.v.interests",
+            "interest_fields": "$program_entries.v.interest_fields",
+        }},
+    ]
+
+    MONGO_ROUNDTRIPS.inc(operation="aggregate_rows")
+    yield from collection.aggregate(pipeline, batchSize=batch_size)
+
+
+def rows_to_document(rows):
+    """
+    Reassembles flat program rows into the mega-document shape
+    ({_id, "University": {ec_quality, "co-op", programs: {...}}}),
+    so everything downstream works the same whichever fetch mode was used.
+    """
+    doc = {}
+    for row in rows:
+        doc.setdefault("_id", row.get("version"))
+        uni = doc.setdefault(row["university"], {"programs": {}})
+        if "ec_quality" in row:
+            uni["ec_quality"] = row["ec_quality"]
+        if "co_op" in row:
+            uni["co-op"] = row["co_op"]
+        uni["programs"][row["program"]] = {
+            k: row[k]
+            for k in ("recommended_average", "required_courses", "interests", "interest_fields")
+            if k in row
+        }
+
+    if not doc:
+        raise ValueError(
+            f"No programs found in MongoDB collection '{COLLECTION_NAME}' "
+            f"in database '{DATABASE_NAME}'."
+        )
+    return doc
+
+
+def fetch_latest_version():
+    """
+    Cheap change-detection query: returns only the newest document's _id
+    (as a string) without pulling the whole mega-document.
+    """
+    collection = get_universities_collection()
+
+    MONGO_ROUNDTRIPS.inc(operation="find_version")
+    doc = collection.find_one(sort=[("_id", -1)], projection={"_id": 1})
+    if not doc:
+        raise ValueError(
+            f"No documents found in MongoDB collection '{COLLECTION_NAME}' "
+            f"in database '{DATABASE_NAME}'."
+        )
+
+    return str(doc["_id"])
+
+
+# -----------------------------
+# In-process snapshot cache
+# -----------------------------
+class CatalogueSnapshot(NamedTuple):
+    """
+    One immutable version of the mega-document.
+    `version` is the document's _id, so a newer upload means a new version.
+    Treat `data` as read-only: it is shared by every request in the process.
+    `partial` snapshots (CATALOGUE_FETCH=rows) only hold the scoring columns;
+    see get_catalogue_document.
+    """
+    version: str
+    data: dict
+    loaded_at: float
+    partial: bool = False
+
+
+_snapshot: CatalogueSnapshot | None = None
+_snapshot_lock = threading.Lock()
+_cold_load_lock = threading.Lock()
+_last_checked = 0.0
+_refresh_in_flight = False
+
+# Full mega-document behind the current partial snapshot: version -> doc
+_documents: dict[str, dict] = {}
+_documents_lock = threading.Lock()
+
+
+def _latest_version():
+    if CATALOGUE_SOURCE == "file":
+        return read_catalogue_header(CATALOGUE_FILE)["version"]
+    return fetch_latest_version()
+
+
+@timed(STAGE_SECONDS.labels(stage="catalogue_load"))
+def _load_snapshot():
+    if CATALOGUE_SOURCE == "file":
+        version, doc = load_catalogue_file(CATALOGUE_FILE)
+        return CatalogueSnapshot(version, doc, time.time())
+
+    if CATALOGUE_FETCH == "rows":
+        doc = rows_to_document(fetch_program_rows())
+        return CatalogueSnapshot(str(doc.get("_id")), doc, time.time(), partial=True)
+    doc = fetch_university_data()
+    return CatalogueSnapshot(str(doc.get("_id")), doc, time.time())
+
+
+def install_catalogue_snapshot(snapshot):
+    """
+    Makes `snapshot` the process's current catalogue, e.g. one handed over
+    by a parent process, or a test/benchmark catalogue, instead of loading it.
+    """
+    global _snapshot, _last_checked
+    with _snapshot_lock:
+        _snapshot = snapshot
+        _last_checked = time.time()
+
+
+def fetch_newer_snapshot(version):
+    """
+    Loads the source's catalogue if its version differs from `version`,
+    without installing it; None when nothing changed.
+    """
+    if _latest_version() == version:
+        return None
+    return _load_snapshot()
+
+
+def refresh_catalogue_snapshot(force=False):
+    """
+    Synchronously checks the source (Mongo, or the snapshot file's header)
+    for a newer version and swaps it in if found. Only loads the full
+    document when the version actually changed (or when force=True).
+    Returns the current snapshot.
+    """
+    global _last_checked
+
+    current = _snapshot
+    if current is not None and not force:
+        latest = _latest_version()
+        if latest == current.version:
+            with _snapshot_lock:
+                _last_checked = time.time()
+            return current
+        print(f"Catalogue changed: {current.version} -> {latest}, reloading...")
+
+    snapshot = _load_snapshot()
+    install_catalogue_snapshot(snapshot)
+    return snapshot
+
+
+def _background_refresh():
+    global _refresh_in_flight
+    try:
+        refresh_catalogue_snapshot()
+    except Exception as e:
+        # Keep serving the snapshot we have; the next check will retry
+        print(f"Catalogue refresh failed, serving cached snapshot: {e}")
+    finally:
+        with _snapshot_lock:
+            _refresh_in_flight = False
+
+
+def get_catalogue_snapshot():
+    """
+    Returns the cached CatalogueSnapshot.
+    - Cold: blocks once on the source (concurrent callers wait for the same load).
+    - Warm: returns immediately. If the snapshot is older than
+      CATALOGUE_REFRESH_SECONDS, a background thread checks for a newer _id;
+      requests never wait on that check.
+    """
+    global _last_checked, _refresh_in_flight
+
+    snapshot = _snapshot
+    if snapshot is None:
+        with _cold_load_lock:
+            if _snapshot is None:
+                install_catalogue_snapshot(_load_snapshot())
+            return _snapshot
+
+    if time.time() - _last_checked >= CATALOGUE_REFRESH_SECONDS:
+        with _snapshot_lock:
+            start = not _refresh_in_flight
+            if start:
+                _refresh_in_flight = True
+                # Push the next check out so only one refresh runs at a time
+                _last_checked = time.time()
+        if start:
+            threading.Thread(target=_background_refresh, daemon=True).start()
+
+    return snapshot
+
+
+def current_catalogue_snapshot():
+    """
+    The snapshot already in memory, or None before the first load.
+    Never contacts the source, so it is safe on latency-sensitive paths.
+    """
+    return _snapshot
+
+
+def get_catalogue_document(snapshot=None, fetch=True):
+    """
+    The complete mega-document (steps, outcomes, notes, ...) behind a
+    snapshot, for consumers that show more than the scoring columns:
+    reports, the catalogue PDF and chat answers. For partial snapshots it is
+    fetched by _id on first use and kept until the version changes; with
+    fetch=False, None is returned instead of fetching.
+    """
+    snapshot = snapshot or get_catalogue_snapshot()
+    if not snapshot.partial:
+        return snapshot.data
+
+    doc = _documents.get(snapshot.version)
+    if doc is None and not fetch:
+        return None
+    if doc is None:
+        # Fetched without holding the lock (a fork mid-fetch must not copy
+        # it held); concurrent first callers may each fetch once
+        doc = fetch_university_data(snapshot.data.get("_id"))
+        with _documents_lock:
+            _documents.clear()
+            _documents[snapshot.version] = doc
+    return doc
+
+
+def clear_catalogue_cache():
+    """
+    Drops the cached snapshot; the next get_catalogue_snapshot() reloads.
+    """
+    global _snapshot, _last_checked
+    with _snapshot_lock:
+        _snapshot = None
+        _last_checked = 0.0
+    with _documents_lock:
+        _documents.clear()
+
+
+def _forget_connection():
+    # A MongoClient copied by fork() must not be used (or closed) by the
+    # child; it opens its own on first use
+    global _client, _database
+    _client = None
+    _database = None
+
+
+os.register_at_fork(after_in_child=_forget_connection)
+
+
 def close_connection():
     """
     Close MongoDB connection.
@@ -0,0 +1,212 @@
+"""
+Soft matching of student interests against the catalogue's interest vocabulary.
+
+Students write "coding", "robots" or "AI" where programs list "programming",
+"robotics" and "artificial intelligence". Each student term is matched in
+three ways, all against precomputed per-snapshot tables:
+  1. canonical key: same words after light stemming, or in the same
+     SYNONYMS group -> full credit
+  2. similar vocabulary terms of those matches (character n-gram TF-IDF
+     cosine, precomputed as a sparse term x term matrix) -> credit = cosine
+  3. a term with no canonical match is compared by n-grams directly
+Everything is local, no network or model downloads.
+"""
+
+import math
+import os
+import re
+import numpy as np
+
+INTEREST_MATCHING_MODES = ("exact", "fuzzy")
+INTEREST_MATCHING = os.getenv("INTEREST_MATCHING", "exact").lower()  # fuzzy is opt-in, it changes scores
+INTEREST_SIMILARITY_MIN = float(os.getenv("INTEREST_SIMILARITY_MIN", "0.6"))  # lowest cosine that earns credit
+INTEREST_NEIGHBOURS = int(os.getenv("INTEREST_NEIGHBOURS", "5"))  # similar terms kept per term
+
+NGRAM_SIZE = 3
+MATCH_CACHE_SIZE = 4096
+
+# Words students use -> the catalogue's wording. Every term in a group
+# (including the first) shares one canonical key.
+SYNONYMS = {
+    "programming": ["coding", "code", "coder", "software development", "computer programming",
+                    "computer science", "cs"],
+    "artificial intelligence": ["ai", "a.i.", "machine intelligence"],
+    "machine learning": ["ml", "deep learning", "neural networks"],
+    "robotics": ["robots", "robot", "robotic"],
+    "electronics": ["electronic", "electrical", "electricity"],
+    "mechanics": ["mechanical"],
+    "math": ["maths", "mathematics"],
+    "statistics": ["stats", "data science", "data analysis"],
+    "cybersecurity": ["cyber security", "security", "infosec", "hacking"],
+    "web development": ["web dev", "websites", "web design"],
+    "mobile apps": ["apps", "app development", "ios", "android"],
+    "game design": ["games", "video games", "game development", "gamedev"],
+    "aerospace": ["aviation", "aircraft", "airplanes", "planes", "rockets", "space"],
+    "automotive design": ["cars", "automotive", "vehicles"],
+    "biology": ["bio", "life sciences"],
+    "chemistry": ["chem"],
+    "physics": ["phys"],
+    "medicine": ["medical", "healthcare", "health"],
+    "renewable energy": ["clean energy", "green energy", "solar", "wind power"],
+    "nuclear energy": ["nuclear"],
+    "sustainability": ["sustainable", "environment", "environmental"],
+    "infrastructure": ["civil", "civil engineering"],
+    "business management": ["business", "management"],
+    "problem solving": ["problem-solving"],
+}
+
+
+def _stem(word):
+    """Light suffix stripping so plurals / -ing forms share a key."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 5 and word.endswith("ing"):
+        return word[:-3]
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def term_key(term):
+    """Punctuation-free, stemmed form of a normalized interest term."""
+    return " ".join(_stem(w) for w in re.findall(r"[a-z0-9]+", term))
+
+
+SYNONYM_KEYS = {
+    term_key(alias): term_key(canonical)
+    for canonical, aliases in SYNONYMS.items()
+    for alias in [canonical, *aliases]
+}
+
+
+def canonical_key(term):
+    key = term_key(term)
+    return SYNONYM_KEYS.get(key, key)
+
+
+def _ngrams(term):
+    padded = f" {term} "
+    return [padded[i:i + NGRAM_SIZE] for i in range(max(1, len(padded) - NGRAM_SIZE + 1))]
+
+
+class InterestMatcher:
+    """
+    Match tables for one interest vocabulary (term -> id):
+      - key_terms: canonical key -> vocabulary ids
+      - idf / gram_postings: character n-gram -> idf, and -> (term ids, TF-IDF weights)
+      - similar_offsets / similar_ids / similar_weights: CSR rows of the
+        sparse term x term cosine matrix (top INTEREST_NEIGHBOURS per term,
+        cosine >= INTEREST_SIMILARITY_MIN, self excluded)
+    """
+
+    def __init__(self, vocab):
+        self.size = len(vocab)
+        self.key_terms = {}
+        for term, term_id in vocab.items():
+            self.key_terms.setdefault(canonical_key(term), []).append(term_id)
+
+        # 1. TF-IDF over character n-grams, one L2-normalized vector per term
+        term_grams = [None] * self.size
+        doc_freq = {}
+        for term, term_id in vocab.items():
+            counts = {}
+            for gram in _ngrams(term):
+                counts[gram] = counts.get(gram, 0) + 1
+            term_grams[term_id] = counts
+            for gram in counts:
+                doc_freq[gram] = doc_freq.get(gram, 0) + 1
+        self.idf = {gram: self._idf(df) for gram, df in doc_freq.items()}
+
+        postings = {}
+        for term_id, counts in enumerate(term_grams):
+            for gram, weight in self._tfidf(counts).items():
+                postings.setdefault(gram, ([], []))
+                postings[gram][0].append(term_id)
+                postings[gram][1].append(weight)
+        self.gram_postings = {
+            gram: (np.array(ids, dtype=np.int32), np.array(weights))
+            for gram, (ids, weights) in postings.items()
+        }
+
+        # 2. Sparse similarity matrix, one row per term
+        offsets, ids, weights = [0], [], []
+        for term_id, counts in enumerate(term_grams):
+            row_ids, row_weights = self._similar(self._tfidf(counts), exclude=term_id)
+            ids.extend(row_ids)
+            weights.extend(row_weights)
+            offsets.append(len(ids))
+        self.similar_offsets = np.array(offsets, dtype=np.int64)
+        self.similar_ids = np.array(ids, dtype=np.int32)
+        self.similar_weights = np.array(weights, dtype=np.float64)
+        self._cache = {}
+
+    def _idf(self, doc_freq):
+        return math.log((1 + self.size) / (1 + doc_freq)) + 1
+
+    def _tfidf(self, counts):
+        # n-grams no vocabulary term has get the largest idf
+        vector = {gram: count * self.idf.get(gram, self._idf(0)) for gram, count in counts.items()}
+        norm = math.sqrt(sum(w * w for w in vector.values())) or 1.0
+        return {gram: w / norm for gram, w in vector.items()}
+
+    def _cosines(self, vector):
+        """(vocabulary,) cosine of a TF-IDF vector with every term: a sparse
+        matrix-vector product over the n-gram postings."""
+        scores = np.zeros(self.size)
+        for gram, weight in vector.items():
+            posting = self.gram_postings.get(gram)
+            if posting is not None:
+                scores[posting[0]] += posting[1] * weight
+        return scores
+
+    def _similar(self, vector, exclude=None):
+        """Top INTEREST_NEIGHBOURS (ids, cosines) of a vector, above INTEREST_SIMILARITY_MIN."""
+        scores = self._cosines(vector)
+        candidates = np.flatnonzero(scores >= INTEREST_SIMILARITY_MIN)
+        if exclude is not None:
+            candidates = candidates[candidates != exclude]
+        best = candidates[np.argsort(-scores[candidates], kind='stable')][:INTEREST_NEIGHBOURS]
+        return best.tolist(), np.minimum(scores[best], 1.0).tolist()
+
+    def match(self, term):
+        """
+        (vocabulary ids, credits) a normalized student term earns: 1.0 for
+        canonical matches, their precomputed neighbours' cosine otherwise,
+        and direct n-gram cosines when nothing matches canonically.
+        """
+        cached = self._cache.get(term)
+        if cached is not None:
+            return cached
+
+        direct = self.key_terms.get(canonical_key(term))
+        if direct:
+            credit = {}
+            for term_id in direct:
+                start, stop = self.similar_offsets[term_id], self.similar_offsets[term_id + 1]
+                for neighbour, cosine in zip(self.similar_ids[start:stop], self.similar_weights[start:stop]):
+                    credit[int(neighbour)] = max(credit.get(int(neighbour), 0.0), float(cosine))
+            credit.update((term_id, 1.0) for term_id in direct)
+            ids, weights = list(credit), list(credit.values())
+        else:
+            counts = {}
+            for gram in _ngrams(term):
+                counts[gram] = counts.get(gram, 0) + 1
+            ids, weights = self._similar(self._tfidf(counts))
+
+        result = (np.array(ids, dtype=np.int32), np.array(weights, dtype=np.float64))
+        if len(self._cache) >= MATCH_CACHE_SIZE:
+            self._cache.clear()
+        self._cache[term] = result
+        return result
+
+
+def build_interest_matcher(vocab):
+    """InterestMatcher for the vocabulary, or None when INTEREST_MATCHING is "exact"."""
+    if INTEREST_MATCHING not in INTEREST_MATCHING_MODES:
+        raise ValueError(
+            f"Unknown INTEREST_MATCHING '{INTEREST_MATCHING}', "
+            f"must be one of {', '.join(INTEREST_MATCHING_MODES)}"
+        )
+    if INTEREST_MATCHING == "fuzzy":
+        return InterestMatcher(vocab)
+    return None
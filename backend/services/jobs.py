@@ -0,0 +1,435 @@
+"""
+Background jobs for work too heavy for a request thread: whole-class
+rankings, class PDF reports and full catalogue PDF rebuilds.
+
+Jobs are recorded in a job table (in memory, or SQLite so any server
+process can answer status checks) and run with bounded concurrency on the
+process pool of the server process that accepted them. Each job is split
+into chunks; progress is the number of finished chunk items over the total.
+No external broker is needed.
+"""
+
+import io
+import json
+import math
+import multiprocessing
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from pypdf import PdfWriter
+
+from services import database
+from services.catalogue_file import load_catalogue_file, save_catalogue_file
+from services.database import (
+    CatalogueSnapshot, get_catalogue_document, get_catalogue_snapshot, install_catalogue_snapshot,
+)
+
+# Per server process: under gunicorn every web worker that runs jobs has its
+# own pool and its own JOB_MAX_RUNNING (gunicorn.conf.py sizes JOB_WORKERS)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))  # worker processes
+JOB_MAX_RUNNING = int(os.getenv("JOB_MAX_RUNNING", "2"))   # jobs dispatched at once, the rest queue
+JOB_CHUNK_SIZE = int(os.getenv("JOB_CHUNK_SIZE", "64"))    # profiles per worker task
+JOB_STORE = os.getenv("JOB_STORE", "memory").lower()       # "memory" (one process) or "sqlite"
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", str(Path(__file__).parent.parent / "data" / "jobs.sqlite3"))
+JOB_RESULT_DIR = os.getenv("JOB_RESULT_DIR", os.path.join(tempfile.gettempdir(), "admittree-jobs"))
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+
+JOB_KINDS = ("rank_batch", "class_report", "catalogue_pdf")
+JOB_STATUSES = ("queued", "running", "done", "failed")
+
+# owner_pid: the server process that accepted (and runs) the job
+JOB_FIELDS = ("id", "kind", "status", "done", "total", "created_at", "started_at",
+              "finished_at", "error", "result", "result_path", "owner_pid")
+
+
+def _new_job(kind):
+    return {
+        "id": uuid.uuid4().hex, "kind": kind, "status": "queued", "done": 0, "total": 0,
+        "created_at": time.time(), "started_at": None, "finished_at": None,
+        "error": None, "result": None, "result_path": None, "owner_pid": os.getpid(),
+    }
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# -----------------------------
+# Job table
+# -----------------------------
+class MemoryJobStore:
+    """Job table in this process's memory (single-process servers)."""
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self, job):
+        with self._lock:
+            self._jobs[job["id"]] = dict(job)
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def purge(self, finished_before):
+        """Deletes jobs finished before the given time; returns them."""
+        with self._lock:
+            old = [job for job in self._jobs.values()
+                   if job["finished_at"] is not None and job["finished_at"] < finished_before]
+            for job in old:
+                del self._jobs[job["id"]]
+            return old
+
+    def unfinished(self):
+        """Jobs still queued or running."""
+        with self._lock:
+            return [dict(job) for job in self._jobs.values() if job["status"] in ("queued", "running")]
+
+
+class SqliteJobStore:
+    """Job table in a local SQLite file, shared by every server process."""
+
+    def __init__(self, path=JOB_DB_PATH):
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT, status TEXT, done INTEGER, total INTEGER, "
+                "created_at REAL, started_at REAL, finished_at REAL, error TEXT, result TEXT, result_path TEXT, "
+                "owner_pid INTEGER)"
+            )
+            # Tables created before owner_pid existed
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "owner_pid" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN owner_pid INTEGER")
+
+    def _connect(self):
+        # A connection per call: sqlite3 connections can't be shared across threads
+        return sqlite3.connect(self.path, timeout=10)
+
+    @staticmethod
+    def _row(job):
+        row = dict(job)
+        row["result"] = json.dumps(row["result"]) if row["result"] is not None else None
+        return row
+
+    def create(self, job):
+        with self._connect() as conn:
+            conn.execute(
+                f"INSERT INTO jobs ({', '.join(JOB_FIELDS)}) VALUES ({', '.join('?' * len(JOB_FIELDS))})",
+                [self._row(job)[field] for field in JOB_FIELDS]
+            )
+
+    def update(self, job_id, **fields):
+        if "result" in fields and fields["result"] is not None:
+            fields["result"] = json.dumps(fields["result"])
+        with self._connect() as conn:
+            conn.execute(
+                f"UPDATE jobs SET {', '.join(f'{name} = ?' for name in fields)} WHERE id = ?",
+                [*fields.values(), job_id]
+            )
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute(f"SELECT {', '.join(JOB_FIELDS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(JOB_FIELDS, row))
+        if job["result"] is not None:
+            job["result"] = json.loads(job["result"])
+        return job
+
+    def purge(self, finished_before):
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(JOB_FIELDS)} FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (finished_before,)
+            ).fetchall()
+            conn.execute("DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (finished_before,))
+        return [dict(zip(JOB_FIELDS, row)) for row in rows]
+
+    def unfinished(self):
+        """Jobs still queued or running (results not decoded)."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(JOB_FIELDS)} FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchall()
+        return [dict(zip(JOB_FIELDS, row)) for row in rows]
+
+
+# -----------------------------
+# Worker-process tasks
+# -----------------------------
+# Catalogue installed in this worker process: (file path, document)
+_worker_catalogue = None
+
+
+def _use_catalogue(version, path):
+    """
+    Installs the job's catalogue snapshot in this worker and returns its
+    document. Tasks only carry the path of a file the parent wrote once per
+    job, and a worker decodes it once, not once per chunk. Workers never go
+    to MongoDB themselves.
+    """
+    global _worker_catalogue
+    if _worker_catalogue is None or _worker_catalogue[0] != path:
+        database.CATALOGUE_REFRESH_SECONDS = math.inf
+        _, data = load_catalogue_file(path)
+        install_catalogue_snapshot(CatalogueSnapshot(version, data, time.time()))
+        _worker_catalogue = (path, data)
+    return _worker_catalogue[1]
+
+
+def rank_chunk(version, path, profiles, top_k=None, normalization=None):
+    """Rankings for a chunk of profiles (runs in a worker process)."""
+    from services.matcher import UniversityMatcher
+
+    _use_catalogue(version, path)
+    return list(UniversityMatcher.rank_many(profiles, top_k=top_k, normalization=normalization))
+
+
+def report_chunk(version, path, profiles, top_k=None, normalization=None):
+    """PDF bytes of the report pages for a chunk of profiles (runs in a worker process)."""
+    from services.matcher import UniversityMatcher
+    from services.report import render_report
+
+    data = _use_catalogue(version, path)
+    rankings = UniversityMatcher.rank_many(profiles, top_k=top_k, normalization=normalization)
+    students = [(p.get("name"), p, r) for p, r in zip(profiles, rankings)]
+    with render_report(students, data, version) as pdf_file:
+        return pdf_file.read()
+
+
+# -----------------------------
+# Queue
+# -----------------------------
+class JobQueue:
+    """
+    Accepts jobs, records them in the job table and runs them: at most
+    JOB_MAX_RUNNING jobs at a time are split into chunks for a pool of
+    JOB_WORKERS processes; further jobs wait as "queued".
+    """
+
+    def __init__(self, store, workers=JOB_WORKERS, max_running=JOB_MAX_RUNNING,
+                 chunk_size=JOB_CHUNK_SIZE, result_dir=JOB_RESULT_DIR):
+        self.store = store
+        self.workers = workers
+        self.max_running = max_running
+        self.chunk_size = chunk_size
+        self.result_dir = Path(result_dir)
+        self._pool = None
+        self._dispatcher = None
+        self._pid = None
+        self._lock = threading.Lock()
+        # Catalogue files handed to workers: path -> running jobs using it
+        self._catalogue_files = {}
+        self._files_lock = threading.Lock()
+        self.reap()
+
+    def _executors(self):
+        # Created on first use, and again after a fork (pools don't survive one)
+        with self._lock:
+            if self._pid != os.getpid():
+                # The server is multi-threaded, so workers are spawned rather
+                # than forked (a fork could copy a lock some thread is holding)
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+                self._dispatcher = ThreadPoolExecutor(max_workers=self.max_running, thread_name_prefix="job")
+                self._pid = os.getpid()
+            return self._pool, self._dispatcher
+
+    def submit(self, kind, params):
+        """Records a new job and queues it. Returns the job record."""
+        if kind not in JOB_KINDS:
+            raise ValueError(f"kind must be one of {', '.join(JOB_KINDS)}")
+        self.purge()
+
+        # Jobs run against the catalogue as it is now, even if they wait in the queue
+        snapshot = get_catalogue_snapshot()
+        job = _new_job(kind)
+        self.store.create(job)
+        _, dispatcher = self._executors()
+        dispatcher.submit(self._run, job["id"], kind, params, snapshot)
+        return job
+
+    def get(self, job_id):
+        job = self.store.get(job_id)
+        return self._reap(job) if job is not None else None
+
+    def reap(self):
+        """
+        Fails queued/running jobs whose server process is gone, e.g. a
+        gunicorn worker recycled mid-job: their threads died with it, so
+        nothing else would ever finish them.
+        """
+        for job in self.store.unfinished():
+            self._reap(job)
+
+    def _reap(self, job):
+        if job["status"] not in ("queued", "running"):
+            return job
+        # Rows from before owner_pid was recorded have no owner left either
+        if job["owner_pid"] is not None and _process_alive(job["owner_pid"]):
+            return job
+        fields = {"status": "failed", "finished_at": time.time(),
+                  "error": "The server process running this job stopped; submit it again"}
+        self.store.update(job["id"], **fields)
+        return {**job, **fields}
+
+    def purge(self):
+        """Drops jobs (and their result files) older than JOB_RETENTION_SECONDS."""
+        self.reap()
+        for job in self.store.purge(time.time() - JOB_RETENTION_SECONDS):
+            if job["result_path"]:
+                Path(job["result_path"]).unlink(missing_ok=True)
+
+    def _progress(self, job_id, done, total):
+        self.store.update(job_id, done=done, total=total)
+
+    def _run(self, job_id, kind, params, snapshot):
+        self.store.update(job_id, status="running", started_at=time.time())
+        try:
+            pool, _ = self._executors()
+            result, result_path = getattr(self, f"_run_{kind}")(job_id, pool, params, snapshot)
+            self.store.update(job_id, status="done", finished_at=time.time(),
+                              result=result, result_path=result_path)
+        except Exception as e:
+            traceback.print_exc()
+            if isinstance(e, BrokenProcessPool):
+                # A worker died (e.g. killed for memory); start a fresh pool for the next job
+                with self._lock:
+                    self._pool.shutdown(wait=False, cancel_futures=True)
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                    )
+            self.store.update(job_id, status="failed", finished_at=time.time(), error=str(e))
+
+    def _catalogue_file(self, snapshot, full_document):
+        """
+        Writes the catalogue workers need to a file (once, however many
+        chunks the job has) and registers one more job using it.
+        """
+        name = re.sub(r"[^\w.-]", "_", snapshot.version)
+        path = self.result_dir / f"catalogue-{os.getpid()}-{name}-{'full' if full_document else 'scoring'}.snapshot"
+        with self._files_lock:
+            if path not in self._catalogue_files:
+                self.result_dir.mkdir(parents=True, exist_ok=True)
+                data = get_catalogue_document(snapshot) if full_document else snapshot.data
+                save_catalogue_file(data, path, source="jobs")
+                self._catalogue_files[path] = 0
+            self._catalogue_files[path] += 1
+        return path
+
+    def _release_catalogue_file(self, path):
+        with self._files_lock:
+            self._catalogue_files[path] -= 1
+            if not self._catalogue_files[path]:
+                del self._catalogue_files[path]
+                path.unlink(missing_ok=True)
+
+    def _run_chunks(self, job_id, pool, snapshot, task, profiles, top_k, normalization, full_document=False):
+        """
+        Runs `task` over the profiles in chunks of chunk_size on the pool,
+        reporting progress per finished chunk. Returns results in chunk order.
+        full_document: give workers the whole catalogue, not just what scoring needs.
+        """
+        chunks = [profiles[i:i + self.chunk_size] for i in range(0, len(profiles), self.chunk_size)]
+        self._progress(job_id, 0, len(profiles))
+
+        path = self._catalogue_file(snapshot, full_document)
+        try:
+            futures = {
+                pool.submit(task, snapshot.version, str(path), chunk, top_k, normalization): n
+                for n, chunk in enumerate(chunks)
+            }
+            results = [None] * len(chunks)
+            done = 0
+            for future in as_completed(futures):
+                n = futures[future]
+                results[n] = future.result()
+                done += len(chunks[n])
+                self._progress(job_id, done, len(profiles))
+        finally:
+            self._release_catalogue_file(path)
+        return snapshot.version, results
+
+    def _run_rank_batch(self, job_id, pool, params, snapshot):
+        version, results = self._run_chunks(job_id, pool, snapshot, rank_chunk, params["profiles"],
+                                            params.get("top_k"), params.get("normalization"))
+        rankings = [rankings for chunk in results for rankings in chunk]
+        return {"catalogue_version": version, "rankings": rankings}, None
+
+    def _run_class_report(self, job_id, pool, params, snapshot):
+        from services.report import REPORT_TOP_K
+
+        version, results = self._run_chunks(job_id, pool, snapshot, report_chunk, params["profiles"],
+                                            params.get("top_k") or REPORT_TOP_K, params.get("normalization"),
+                                            full_document=True)
+        writer = PdfWriter()
+        for pdf_bytes in results:
+            writer.append(io.BytesIO(pdf_bytes))
+        result_path = self._result_file(job_id)
+        with open(result_path, "wb") as f:
+            writer.write(f)
+        return {"catalogue_version": version, "students": len(params["profiles"])}, str(result_path)
+
+    def _run_catalogue_pdf(self, job_id, pool, params, snapshot):
+        from pdfmaker import build_pdf
+
+        result_path = self._result_file(job_id)
+        summary = build_pdf(result_path, get_catalogue_document(snapshot), pool=pool,
+                            on_progress=lambda done, total: self._progress(job_id, done, total))
+        return {"catalogue_version": snapshot.version, **summary}, str(result_path)
+
+    def _result_file(self, job_id):
+        self.result_dir.mkdir(parents=True, exist_ok=True)
+        return self.result_dir / f"{job_id}.pdf"
+
+
+def _make_store():
+    if JOB_STORE == "sqlite":
+        return SqliteJobStore(JOB_DB_PATH)
+    if JOB_STORE != "memory":
+        print(f"Unknown JOB_STORE '{JOB_STORE}', using memory")
+    return MemoryJobStore()
+
+
+# Shared by every request in the process
+job_queue = JobQueue(_make_store())
+
+
+def job_status(job):
+    """Public view of a job record (no internal paths or results)."""
+    return {
+        "id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "progress": {"done": job["done"], "total": job["total"]},
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "error": job["error"],
+    }
@@ -2,7 +2,14 @@
 University Scoring Engine - Matches students to programs based on multiple criteria.
 """
 
-from services.database import fetch_university_data
+import base64
+import json
+import os
+from services.database import get_catalogue_snapshot
+from services.program_index import get_program_index, normalize_term
+from services.result_cache import ranking_cache, profile_cache_key
+from services.score_stats import get_population_stats
+from services.metrics import STAGE_SECONDS, stage_timer, timed
 import numpy as np
 
 
@@ -14,7 +21,7 @@ def get_university_db():
     This function normalizes it to:
         { "University Name": {ec_quality, "co-op", programs, ...}, ... }
     """
-    raw = fetch_university_data()
+    raw = get_catalogue_snapshot().data
 
     if not raw:
         raise RuntimeError("University database is empty or not found in MongoDB.")
@@ -24,7 +31,11 @@ def get_university_db():
 
     # Remove metadata keys that are not universities
     meta_keys = {"_id", "apply_deadline"}
-    UNIVERSITY_DB = {k: v for k, v in raw.items() if k not in meta_keys}
+    # (shallow copies: the cached snapshot is shared and must not be mutated)
+    UNIVERSITY_DB = {
+        k: dict(v) if isinstance(v, dict) else v
+        for k, v in raw.items() if k not in meta_keys
+    }
 
     # Normalize fields a bit (helps avoid bugs)
     for uni_name, uni_data in UNIVERSITY_DB.items():
@@ -90,17 +101,116 @@ def get_program_interests():
     return program_interests_map
 
 
+
+# Profiles scored per matrix pass in rank_many (bounds memory for big classes)
+BATCH_CHUNK_SIZE = 256
+# Programs scored per step when streaming with iter_scored_programs
+PROGRAM_CHUNK_SIZE = 512
+# Raw scores (profiles x programs) per pass when seeding population stats
+REFERENCE_CHUNK_CELLS = int(os.getenv("REFERENCE_CHUNK_CELLS", str(2**20)))
+
+# How raw scores become 0-100 scores:
+#   "request"  - Z-score against this student's own scores (original behaviour)
+#   "snapshot" - Z-score against fixed stats of a reference cohort, per catalogue snapshot
+#   "running"  - like "snapshot", then kept current with Welford updates from real requests
+NORMALIZATION_MODES = ("request", "snapshot", "running")
+SCORE_NORMALIZATION = os.getenv("SCORE_NORMALIZATION", "request")
+
+# Eligibility pre-filter: only score programs the student can plausibly get into
+ELIGIBILITY_PREFILTER = os.getenv("ELIGIBILITY_PREFILTER", "0").lower() in ("1", "true", "yes")
+ELIGIBILITY_REACH_MARGIN = float(os.getenv("ELIGIBILITY_REACH_MARGIN", "5"))  # average points below min_avg
+ELIGIBILITY_MAX_MISSING = int(os.getenv("ELIGIBILITY_MAX_MISSING", "2"))      # missing requirements (grade 12)
+
+# What-if scenarios: fields a delta may set, and how many one request may price
+WHATIF_DELTA_FIELDS = {"label", "average", "average_delta", "grade_level", "add_courses", "remove_courses"}
+WHATIF_MAX_SCENARIOS = int(os.getenv("WHATIF_MAX_SCENARIOS", "20"))
+
+
+def encode_cursor(version, offset):
+    """Opaque pagination cursor: which snapshot the ranking came from + where the next page starts."""
+    raw = json.dumps({"v": version, "o": offset}).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Returns (version, offset).
+    Raises ValueError if the cursor is malformed or its offset is negative.
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        version, offset = str(data["v"]), int(data["o"])
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+    if offset < 0:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return version, offset
+
+
+def top_k_indices(scores, k):
+    """
+    Indices of the k best scores, best first, in exactly the order a stable
+    descending sort would give (ties keep catalogue order).
+    Uses argpartition so only the selected k are sorted.
+    """
+    n = len(scores)
+    if k >= n:
+        return np.argsort(-scores, kind='stable')
+    if k <= 0:
+        return np.array([], dtype=np.intp)
+
+    # Everything strictly above the k-th best score is in; fill the rest
+    # with the earliest programs tied at that score.
+    kth = np.argpartition(-scores, k - 1)[k - 1]
+    threshold = scores[kth]
+    above = np.flatnonzero(scores > threshold)
+    ties = np.flatnonzero(scores == threshold)[:k - len(above)]
+    candidates = np.sort(np.concatenate([above, ties]))
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+
+def rank_positions(scores, ids):
+    """
+    1-based places of programs `ids` in the ranking of `scores` (the stable
+    descending order top_k_indices gives). Needs a plain sort of the
+    scores, not the much slower stable argsort of a full ranking.
+    """
+    ids = np.asarray(ids, dtype=np.intp)
+    if not len(ids):
+        return np.array([], dtype=np.int64)
+    ranked = np.sort(scores)
+    higher = len(scores) - np.searchsorted(ranked, scores[ids], side='right')
+    # Ties keep catalogue order
+    tied_before = [np.count_nonzero(scores[:i] == scores[i]) for i in ids]
+    return higher + np.array(tied_before, dtype=np.int64) + 1
+
+
+def _delta_course_codes(courses):
+    """Course codes of a delta's add_courses / remove_courses ("SCH4U" or ["SCH4U", 90])."""
+    if isinstance(courses, str):
+        courses = [courses]
+    return {str(c[0] if isinstance(c, (list, tuple)) else c).upper().strip() for c in courses}
+
+
 class UniversityMatcher:
-    def __init__(self, user_profile):
+    def __init__(self, user_profile, normalization=None):
         self.user = user_profile
 
         # ✅ Normalize JSON shapes (tuples don't exist in JSON)
-        self.user["courses_taken"] = self._normalize_courses(self.user.get("courses_taken", []))
-        self.user["extra_curriculars"] = self._normalize_ecs(self.user.get("extra_curriculars", []))
-        self.user["major_interests"] = self._normalize_interests(self.user.get("major_interests", []))
+        with stage_timer("normalize_profile"):
+            self.user["courses_taken"] = self._normalize_courses(self.user.get("courses_taken", []))
+            self.user["extra_curriculars"] = self._normalize_ecs(self.user.get("extra_curriculars", []))
+            self.user["major_interests"] = self._normalize_interests(self.user.get("major_interests", []))
+
+        self.user_avg = float(user_profile.get('average', 0))
+        self.grade = int(user_profile.get('grade_level', 12))
 
-        self.grade = user_profile["grade_level"]
-        self.weights = self._get_dynamic_weights()
+        self.normalization = normalization or SCORE_NORMALIZATION
+        if self.normalization not in NORMALIZATION_MODES:
+            raise ValueError(
+                f"Unknown normalization '{self.normalization}', "
+                f"expected one of {', '.join(NORMALIZATION_MODES)}"
+            )
 
     # -----------------------------
     # Normalizers (fix common 500s)
@@ -154,91 +264,417 @@ class UniversityMatcher:
             return [str(x).strip().lower() for x in interests if str(x).strip()]
         return [str(interests).strip().lower()]
 
-    # -----------------------------
-    # Weighting
-    # -----------------------------
-    def _get_dynamic_weights(self):
-        """
-        Adjusts priorities based on how close the student is to graduating.
-        """
-        if self.grade <= 10:
-            return {"interest": 0.60, "academic": 0.30, "ec": 0.03}
-        else:
-            return {"interest": 0.1, "academic": 0.8, "ec": 0.1}
+    def cache_key(self, *params):
+        """Canonical hash of the normalized profile (+ ranking params) for the result cache."""
+        canonical = dict(self.user, average=self.user_avg, grade_level=self.grade)
+        return profile_cache_key(canonical, self.normalization, *params)
+
+    def _cacheable(self):
+        # "running" scores drift with traffic, so they can't be replayed
+        return self.normalization != "running"
 
     # -----------------------------
-    # Scoring Components
+    # Per-student feature rows
     # -----------------------------
-    import numpy as np
-from services.database import fetch_university_data
+    def _interest_terms(self, index):
+        """Returns (index.match_interests of the user's interests, number of distinct user interests)."""
+        user_ints = sorted({normalize_term(i) for i in self.user.get('major_interests', [])})
+        return index.match_interests(user_ints), len(user_ints)
 
-class UniversityMatcher:
-    def __init__(self, user_profile):
-        self.user = user_profile
-        self.user_avg = float(user_profile.get('average', 0))
-        self.grade = int(user_profile.get('grade_level', 12))
+    def _course_codes(self):
+        """Set of (uppercased) codes of the courses the student has taken."""
+        return {c[0].upper().strip() for c in self.user.get('courses_taken', [])}
 
-    def _calculate_academic_score(self, min_avg, max_avg, required_courses):
-        """Uses sigmoid logic with competitive bias for the raw academic base."""
+    # -----------------------------
+    # Scoring (students x programs)
+    # -----------------------------
+    @staticmethod
+    def _average_terms(index, user_avg):
+        """
+        The average-dependent parts of the academic score: (sigmoid base
+        grade score, competitive bias). user_avg: (students, 1) column.
+        """
         # Sigmoid midpoint centered at the min_avg
-        z = 0.8 * (self.user_avg - min_avg)
+        z = 0.8 * (user_avg - index.min_avg)
         base_grade_score = 1 / (1 + np.exp(-z))
 
         # Competitive Bias
-        bias = 1.0 + ((max_avg - 85) / 100) if self.user_avg >= 92 and max_avg >= 90 else 1.0
-        
-        # Course Match
-        user_courses = [c[0].upper().strip() for c in self.user.get('courses_taken', [])]
-        req_courses = [str(c).split(' ')[0].upper().strip() for c in required_courses]
-        penalty = 1.0
-        if self.grade == 12 and req_courses:
-            missing = [r for r in req_courses if r not in user_courses]
-            penalty = max(0.1, 1.0 - (len(missing) * 0.15))
+        bias = np.where(
+            (user_avg >= 92) & (index.max_avg >= 90),
+            1.0 + ((index.max_avg - 85) / 100),
+            1.0,
+        )
+        return base_grade_score, bias
 
+    @staticmethod
+    def _course_penalty(index, grade, taken):
+        """
+        The course-dependent part of the academic score.
+        grade: (students, 1) column; taken: the students' encoded courses
+        (index.requirements.encode).
+        """
+        # Course Match: required entries the student hasn't satisfied, computed
+        # once per requirement group and gathered out to the programs
+        missing = index.requirements.missing(taken)
+        penalty = np.where(
+            grade == 12,
+            np.maximum(0.1, 1.0 - (missing * 0.15)),
+            1.0,
+        )
+        return penalty[:, index.requirement_groups]
+
+    @classmethod
+    def _calculate_academic_scores(cls, index, user_avg, grade, taken):
+        """
+        Uses sigmoid logic with competitive bias for the raw academic base.
+        user_avg, grade: (students, 1) columns; taken: the students' encoded courses.
+        Returns a (students, programs) matrix.
+        """
+        base_grade_score, bias = cls._average_terms(index, user_avg)
+        penalty = cls._course_penalty(index, grade, taken)
         return (base_grade_score * penalty) * bias
 
-    def get_ranked_programs(self):
-        db = fetch_university_data()
-        raw_results = []
+    @staticmethod
+    def _calculate_interest_scores(index, wanted, counts):
+        """
+        Fraction of each student's interests each program lists (with fuzzy
+        matching, partial credit for similar terms).
+        wanted: per student, index.match_interests output; counts: (students,) distinct interests.
+        """
+        overlap = index.interest_overlap(wanted)
+        counts = counts[:, None]
+        return np.divide(overlap, counts, out=np.zeros_like(overlap), where=counts > 0)
+
+    @classmethod
+    @timed(STAGE_SECONDS.labels(stage="score"))
+    def _raw_score_matrix(cls, index, matchers):
+        user_avg = np.array([[m.user_avg] for m in matchers])
+        grade = np.array([[m.grade] for m in matchers])
+        interest_terms = [m._interest_terms(index) for m in matchers]
+        wanted = [ids for ids, _ in interest_terms]
+        counts = np.array([n for _, n in interest_terms])
+        taken = index.requirements.encode([m._course_codes() for m in matchers])
+
+        s_int = cls._calculate_interest_scores(index, wanted, counts)
+        s_acad = cls._calculate_academic_scores(index, user_avg, grade, taken)
+        return (s_int * 0.5) + (s_acad * 0.5)
+
+    @staticmethod
+    def _map_z_scores(z_scores):
+        # Map Z-Score to 0-100 range.
+        # A Z-score of 2 (2 standard deviations above mean) becomes ~98%
+        return np.round(1 / (1 + np.exp(-z_scores)) * 100, 1)
+
+    @classmethod
+    @timed(STAGE_SECONDS.labels(stage="zscore"))
+    def _standardize(cls, raw_scores, stats=None):
+        """
+        Z-Score Standardization, mapped to 0-100.
+        Without stats each row is standardized against itself; with a
+        (mean, std) pair every score is standardized against that population.
+        """
+        if stats is not None:
+            mean_val, std_dev = stats
+            if std_dev <= 0:
+                return cls._map_z_scores(np.zeros(raw_scores.shape))
+            return cls._map_z_scores((raw_scores - mean_val) / std_dev)
+
+        if raw_scores.shape[1] <= 1:
+            return np.full(raw_scores.shape, 100.0)
+
+        mean_val = raw_scores.mean(axis=1, keepdims=True)
+        std_dev = raw_scores.std(axis=1, keepdims=True)
+
+        # Calculate Z = (x - mean) / std_dev
+        safe_std = np.where(std_dev > 0, std_dev, 1.0)
+        z_scores = np.where(std_dev > 0, (raw_scores - mean_val) / safe_std, 0.0)
+
+        return cls._map_z_scores(z_scores)
+
+    # -----------------------------
+    # Population statistics
+    # -----------------------------
+    @classmethod
+    def _reference_raw_scores(cls, index):
+        """
+        Raw scores of a fixed reference cohort against every program, yielded
+        a few profiles at a time (about REFERENCE_CHUNK_CELLS scores per
+        chunk) so the whole cohort x catalogue matrix never exists at once.
+        The cohort: averages 60-100, grades 11/12, with/without the required
+        courses, and no interest or one of a spread of catalogue interests.
+        Deterministic for a given snapshot.
+        """
+        terms = sorted(index.interest_vocab)
+        step = max(1, len(terms) // 8)
+        interest_options = [[]] + [[t] for t in terms[::step][:8]]
+        course_options = [[], [[code, 90] for code in index.course_vocab]]
+
+        profiles = [
+            {"average": avg, "grade_level": grade, "courses_taken": courses, "major_interests": interests}
+            for avg in np.arange(60.0, 100.01, 2.5)
+            for grade in (11, 12)
+            for courses in course_options
+            for interests in interest_options
+        ]
+        chunk_size = max(1, REFERENCE_CHUNK_CELLS // max(1, len(index)))
+        for start in range(0, len(profiles), chunk_size):
+            matchers = [cls(p, normalization="request") for p in profiles[start:start + chunk_size]]
+            yield cls._raw_score_matrix(index, matchers)
+
+    def _normalization_stats(self, index):
+        """(mean, std) to standardize against, or None for per-request Z-scores."""
+        if self.normalization == "request":
+            return None
+        stats = get_population_stats(index.version, lambda: self._reference_raw_scores(index))
+        if self.normalization == "snapshot":
+            return stats.seed_stats
+        return stats.snapshot()
+
+    def _record_raw_scores(self, index, raw_scores):
+        """Feeds real request scores into the running population stats."""
+        if self.normalization == "running":
+            get_population_stats(index.version, lambda: self._reference_raw_scores(index)).update(raw_scores)
+
+    @staticmethod
+    @timed(STAGE_SECONDS.labels(stage="rank"))
+    def _format_rankings(index, raw_scores, scores, top_k=None, offset=0, order=None):
+        # Only the programs up to the end of the requested page get sorted
+        # (unless the caller already has the order)
+        if order is None:
+            end = len(scores) if top_k is None else offset + top_k
+            order = top_k_indices(scores, end)[offset:]
+        return [
+            {
+                "university": index.university_name(i),
+                "program": index.program_names[i],
+                "raw_score": float(raw_scores[i]),
+                "score": float(scores[i]),
+            }
+            for i in order
+        ]
+
+    # -----------------------------
+    # Eligibility pre-filter
+    # -----------------------------
+    def eligible_programs(self, index, include_reach=True, reach_margin=None):
+        """
+        Ids (catalogue order) of the programs worth scoring for this student:
+        min_avg no higher than their average (plus reach_margin, default
+        ELIGIBILITY_REACH_MARGIN, when include_reach) and, for grade 12
+        students, at most ELIGIBILITY_MAX_MISSING course requirements missing.
+        """
+        margin = 0.0
+        if include_reach:
+            margin = ELIGIBILITY_REACH_MARGIN if reach_margin is None else float(reach_margin)
+
+        # 1. Average: binary search on the sorted min_avg column
+        ids = index.min_avg_at_most(self.user_avg + margin)
+
+        # 2. Courses: one check per requirement group, looked up per candidate
+        if self.grade == 12 and len(ids):
+            taken = index.requirements.encode([self._course_codes()])
+            ok_groups = index.requirements.missing(taken)[0] <= ELIGIBILITY_MAX_MISSING
+            ids = ids[ok_groups[index.requirement_groups[ids]]]
+        return ids
+
+    # -----------------------------
+    # Public API
+    # -----------------------------
+    def get_ranked_programs(self, top_k=None, offset=0, eligible_only=None, include_reach=True, reach_margin=None):
+        """
+        Returns programs best-first. With top_k, only that many results
+        (starting `offset` places down the ranking) are selected and sorted.
+        With eligible_only (default ELIGIBILITY_PREFILTER), only the programs
+        from eligible_programs() are scored and ranked; under "request"
+        normalization their scores are then relative to that candidate set.
+        After the call, self.catalogue_version / self.total_programs describe
+        the snapshot and number of programs the ranking came from (used for
+        pagination cursors).
+        """
+        index = get_program_index()
+        self.catalogue_version = index.version
+
+        params = (top_k, offset)
+        scope = index
+        if eligible_only is None:
+            eligible_only = ELIGIBILITY_PREFILTER
+        if eligible_only:
+            scope = index.take(self.eligible_programs(index, include_reach, reach_margin))
+            params += ("eligible", include_reach, reach_margin)
+        self.total_programs = len(scope)
+
+        key = self.cache_key(*params) if self._cacheable() else None
+        if key is not None:
+            cached = ranking_cache.get(index.version, key)
+            if cached is not None:
+                return [dict(r) for r in cached]
 
         # Step 1: Calculate Raw Scores
-        for uni_name, uni_data in db.items():
-            if uni_name in ["_id", "apply_deadline"]: continue
-            programs = uni_data.get('programs', {})
-            for prog_name, details in programs.items():
-                # Interest Match
-                user_ints = set(i.lower() for i in self.user.get('major_interests', []))
-                prog_ints = set(i.lower() for i in details.get('interests', []))
-                s_int = len(user_ints.intersection(prog_ints)) / len(user_ints) if user_ints else 0
-                
-                # Academic Score
-                avg_range = details.get('recommended_average', [80, 85])
-                s_acad = self._calculate_academic_score(avg_range[0], avg_range[1], details.get('required_courses', []))
-                
-                # Raw weighted total
-                raw_score = (s_int * 0.5) + (s_acad * 0.5)
-                
-                raw_results.append({
-                    "university": uni_name,
-                    "program": prog_name,
-                    "raw_score": raw_score
-                })
+        raw_scores = self._raw_score_matrix(scope, [self])
 
         # Step 2: Z-Score Standardization
-        scores = [r['raw_score'] for r in raw_results]
-        if len(scores) > 1:
-            mean_val = np.mean(scores)
-            std_dev = np.std(scores)
-            
-            for res in raw_results:
-                # Calculate Z = (x - mean) / std_dev
-                z_score = (res['raw_score'] - mean_val) / std_dev if std_dev > 0 else 0
-                
-                # Map Z-Score to 0-100 range. 
-                # A Z-score of 2 (2 standard deviations above mean) becomes ~98%
-                final_mapped_score = 1 / (1 + np.exp(-z_score)) * 100
-                res['score'] = round(final_mapped_score, 1)
-        else:
-            for res in raw_results: res['score'] = 100.0
-
-        return sorted(raw_results, key=lambda x: x['score'], reverse=True)
\ No newline at end of file
+        scores = self._standardize(raw_scores, self._normalization_stats(index))
+        self._record_raw_scores(index, raw_scores)
+
+        rankings = self._format_rankings(scope, raw_scores[0], scores[0], top_k, offset)
+        if key is not None:
+            ranking_cache.put(index.version, key, [dict(r) for r in rankings])
+        return rankings
+
+    def iter_scored_programs(self, chunk_size=PROGRAM_CHUNK_SIZE):
+        """
+        Yields scored programs in catalogue order (not ranked) as soon as each
+        chunk of programs is scored. Needs a population normalization mode,
+        since per-request Z-scores can't be known until every program is scored.
+        """
+        if self.normalization == "request":
+            raise ValueError("Streaming scores needs normalization 'snapshot' or 'running'")
+
+        index = get_program_index()
+        stats = self._normalization_stats(index)
+        for start in range(0, len(index), chunk_size):
+            part = index.slice(start, start + chunk_size)
+            raw_scores = self._raw_score_matrix(part, [self])
+            scores = self._standardize(raw_scores, stats)
+            self._record_raw_scores(index, raw_scores)
+            for i in range(len(part)):
+                yield {
+                    "university": part.university_name(i),
+                    "program": part.program_names[i],
+                    "raw_score": float(raw_scores[0, i]),
+                    "score": float(scores[0, i]),
+                }
+
+    def _scenario(self, delta):
+        """
+        (average, grade, course codes) of this profile with one what-if delta applied.
+        Raises ValueError on unknown fields or bad values.
+        """
+        if not isinstance(delta, dict):
+            raise ValueError("Each delta must be an object")
+        unknown = set(delta) - WHATIF_DELTA_FIELDS
+        if unknown:
+            raise ValueError(f"Unknown delta fields: {', '.join(sorted(unknown))}")
+        try:
+            average = float(delta.get("average", self.user_avg)) + float(delta.get("average_delta", 0))
+            grade = int(delta.get("grade_level", self.grade))
+            codes = (self._course_codes() | _delta_course_codes(delta.get("add_courses", []))) \
+                - _delta_course_codes(delta.get("remove_courses", []))
+        except (TypeError, ValueError, IndexError) as e:
+            raise ValueError(f"Invalid delta {delta!r}: {e}") from e
+        return average, grade, frozenset(codes)
+
+    @timed(STAGE_SECONDS.labels(stage="whatif"))
+    def what_if(self, deltas, top_k=10):
+        """
+        Prices a list of what-if deltas against this profile, e.g.
+        {"average_delta": 3} or {"add_courses": ["SCH4U"]}. Returns
+        {"base": [...top_k], "scenarios": [{"delta", "rankings", "changes"}, ...]}
+        where "changes" gives the old and new place of every program in
+        either top_k. Only the raw score components a delta touches are
+        recomputed: the interest term is scored once, and the average and
+        course terms once per distinct average / course set.
+        What-if scores are never fed into the running population stats.
+        """
+        if len(deltas) > WHATIF_MAX_SCENARIOS:
+            raise ValueError(f"At most {WHATIF_MAX_SCENARIOS} deltas per request")
+        scenarios = [self._scenario(d) for d in deltas]
+
+        index = get_program_index()
+        self.catalogue_version = index.version
+        self.total_programs = len(index)
+        stats = self._normalization_stats(index)
+
+        # Step 1: Per-program components of the base profile, reused by every scenario
+        wanted, count = self._interest_terms(index)
+        s_int = self._calculate_interest_scores(index, [wanted], np.array([count])) * 0.5
+        average_terms = {}
+        penalties = {}
+
+        def score(average, grade, codes):
+            if average not in average_terms:
+                average_terms[average] = self._average_terms(index, np.array([[average]]))
+            if (grade, codes) not in penalties:
+                taken = index.requirements.encode([codes])
+                penalties[(grade, codes)] = self._course_penalty(index, np.array([[grade]]), taken)
+            base_grade_score, bias = average_terms[average]
+            s_acad = (base_grade_score * penalties[(grade, codes)]) * bias
+            raw_scores = s_int + (s_acad * 0.5)
+            return raw_scores[0], self._standardize(raw_scores, stats)[0]
+
+        # Step 2: Base ranking
+        base_raw, base_scores = score(self.user_avg, self.grade, frozenset(self._course_codes()))
+        base_top = top_k_indices(base_scores, top_k)
+
+        # Step 3: Each scenario's top_k
+        scenario_scores = [score(*scenario) for scenario in scenarios]
+        tops = [top_k_indices(scores, top_k) for _, scores in scenario_scores]
+
+        # Step 4: Old and new places of every program in either top_k; places
+        # inside a top_k list are known, the rest are counted
+        def places(top, scores, ids):
+            known = {int(i): n + 1 for n, i in enumerate(top)}
+            unknown = [i for i in ids if i not in known]
+            known.update(zip(unknown, rank_positions(scores, unknown).tolist()))
+            return known
+
+        changed = [np.union1d(base_top, top).tolist() for top in tops]
+        base_places = places(base_top, base_scores, sorted(set().union(*changed)))
+
+        results = []
+        for delta, (raw_scores, scores), top, ids in zip(deltas, scenario_scores, tops, changed):
+            new_places = places(top, scores, ids)
+            changes = [
+                {
+                    "university": index.university_name(i),
+                    "program": index.program_names[i],
+                    "base_rank": base_places[i],
+                    "rank": new_places[i],
+                    "rank_change": base_places[i] - new_places[i],
+                    "base_score": float(base_scores[i]),
+                    "score": float(scores[i]),
+                }
+                for i in ids
+            ]
+            changes.sort(key=lambda c: c["rank"])
+            results.append({
+                "delta": delta,
+                "rankings": self._format_rankings(index, raw_scores, scores, order=top),
+                "changes": changes,
+            })
+
+        return {
+            "base": self._format_rankings(index, base_raw, base_scores, order=base_top),
+            "scenarios": results,
+        }
+
+    @classmethod
+    def rank_many(cls, profiles, top_k=None, normalization=None):
+        """
+        Scores many student profiles against every program, sharing the program
+        index and doing the work as (students x programs) matrix operations.
+        Yields one ranking list per profile, in input order, as each chunk of
+        BATCH_CHUNK_SIZE profiles finishes. top_k limits each ranking.
+        Profiles already in the result cache are not re-scored.
+        """
+        index = get_program_index()
+        profiles = list(profiles)
+
+        for start in range(0, len(profiles), BATCH_CHUNK_SIZE):
+            matchers = [cls(p, normalization) for p in profiles[start:start + BATCH_CHUNK_SIZE]]
+            cacheable = matchers[0]._cacheable()
+            keys = [m.cache_key(top_k, 0) if cacheable else None for m in matchers]
+            results = [ranking_cache.get(index.version, k) if k else None for k in keys]
+
+            todo = [i for i, r in enumerate(results) if r is None]
+            if todo:
+                raw_scores = cls._raw_score_matrix(index, [matchers[i] for i in todo])
+                scores = cls._standardize(raw_scores, matchers[0]._normalization_stats(index))
+                matchers[0]._record_raw_scores(index, raw_scores)
+                for i, raw_row, score_row in zip(todo, raw_scores, scores):
+                    results[i] = cls._format_rankings(index, raw_row, score_row, top_k)
+                    if keys[i] is not None:
+                        ranking_cache.put(index.version, keys[i], [dict(r) for r in results[i]])
+
+            for rankings in results:
+                yield [dict(r) for r in rankings]
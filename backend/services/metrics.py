@@ -0,0 +1,241 @@
+"""
+Hot-path metrics in the Prometheus text format (served on /metrics).
+Counters and latency histograms live in this process's memory, so with
+several server workers each one reports its own numbers.
+With METRICS_ENABLED=false, timers and counters are no-ops.
+"""
+
+import bisect
+import math
+import os
+import threading
+import time
+from contextlib import nullcontext
+from functools import wraps
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Seconds: sub-millisecond scoring stages up to slow agent calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry = []
+_collectors = []
+_noop_timer = nullcontext()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class _Timer:
+    """Context manager that observes its elapsed time on a histogram."""
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class _CounterValue:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name, labels):
+        return [f"{name}{_format_labels(labels)} {_format_value(self.value)}"]
+
+
+class _HistogramValue:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # last slot is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        if not METRICS_ENABLED:
+            return
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[slot] += 1
+            self.sum += value
+
+    def time(self):
+        """`with histogram.time(): ...` records how long the block took."""
+        return _Timer(self) if METRICS_ENABLED else _noop_timer
+
+    def samples(self, name, labels):
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*self.buckets, math.inf), counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels([*labels, ('le', _format_value(bound))])} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+        lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _new_value(self):
+        raise NotImplementedError
+
+    def labels(self, **labels):
+        """The series for these label values (created on first use)."""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        value = self._values.get(key)
+        if value is None:
+            with self._lock:
+                value = self._values.setdefault(key, self._new_value())
+        return value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self._values.items()):
+            lines += value.samples(self.name, list(zip(self.labelnames, key)))
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_value(self):
+        return _CounterValue()
+
+    def inc(self, amount=1, **labels):
+        if METRICS_ENABLED:
+            self.labels(**labels).inc(amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help_text, labelnames)
+
+    def _new_value(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value, **labels):
+        if METRICS_ENABLED:
+            self.labels(**labels).observe(value)
+
+    def time(self, **labels):
+        return self.labels(**labels).time() if METRICS_ENABLED else _noop_timer
+
+
+def timed(histogram):
+    """
+    Decorator recording each call's duration on `histogram` (a Histogram
+    without labels, or one series from .labels()). Returns the function
+    unchanged when metrics are disabled.
+    """
+    def decorate(func):
+        if not METRICS_ENABLED:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def stage_timer(stage):
+    """`with stage_timer("score"): ...` records the block on the stage histogram."""
+    return STAGE_SECONDS.labels(stage=stage).time() if METRICS_ENABLED else _noop_timer
+
+
+def register_collector(collect):
+    """
+    Adds a callable read at scrape time, for numbers kept elsewhere (cache
+    stats, ...). It returns [(name, kind, help, value), ...].
+    """
+    _collectors.append(collect)
+
+
+def render_metrics():
+    """Every registered metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines += metric.render()
+    for collect in _collectors:
+        try:
+            samples = collect()
+        except Exception as e:
+            print(f"Metrics collector failed: {e}")
+            continue
+        for name, kind, help_text, value in samples:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {_format_value(value)}"]
+    return "\n".join(lines) + "\n"
+
+
+# -----------------------------
+# Metrics used across the backend
+# -----------------------------
+STAGE_SECONDS = Histogram(
+    "admittree_stage_seconds",
+    "Time spent in each stage of a request (catalogue fetch, profile normalization, scoring, ...).",
+    ["stage"],
+)
+REQUEST_SECONDS = Histogram(
+    "admittree_request_seconds",
+    "HTTP request latency by endpoint.",
+    ["endpoint", "method", "status"],
+)
+MONGO_ROUNDTRIPS = Counter(
+    "admittree_mongo_roundtrips_total",
+    "Queries sent to MongoDB.",
+    ["operation"],
+)
+AGENT_SECONDS = Histogram(
+    "admittree_agent_seconds",
+    "Chatbot agent call latency (including retries).",
+    ["outcome"],
+)
+CHAT_REPLIES = Counter(
+    "admittree_chat_replies_total",
+    "Chat replies by where the answer came from.",
+    ["source"],
+)
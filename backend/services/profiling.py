@@ -0,0 +1,189 @@
+"""
+Opt-in request profiling for slow student profiles and chat messages.
+
+On demand: send `X-Profile: cprofile` (or `sample`) with
+`X-Profile-Token: <PROFILE_ADMIN_TOKEN>` (or the `profile` / `profile_token`
+query params) and that one request is profiled. The result is saved to
+PROFILE_DIR (.pstats for cProfile, collapsed stacks for the sampler) and
+its file name is returned in the `X-Profile-File` response header.
+
+Continuous: with PROFILE_SAMPLE_RATE > 0, that fraction of requests is run
+under the stack sampler and kept in a rolling in-memory buffer of the last
+PROFILE_BUFFER_SIZE requests, readable as merged collapsed stacks (the
+input format of flamegraph.pl / speedscope).
+"""
+
+import cProfile
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from functools import wraps
+from pathlib import Path
+from flask import make_response, request
+
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")    # empty disables on-demand profiling
+PROFILE_DIR = os.getenv("PROFILE_DIR", str(Path(__file__).parent.parent / ".profiles"))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))  # fraction of requests, 0 = off
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.001"))  # seconds between samples
+PROFILE_BUFFER_SIZE = int(os.getenv("PROFILE_BUFFER_SIZE", "200"))  # sampled requests kept
+
+PROFILE_MODES = ("cprofile", "sample")
+
+# cProfile can only run one profiler at a time per process, so concurrent
+# on-demand requests fall back to the sampler
+_cprofile_lock = threading.Lock()
+
+# (endpoint, collapsed stack counts) of recently sampled requests
+_rolling = deque(maxlen=PROFILE_BUFFER_SIZE)
+_rolling_lock = threading.Lock()
+
+
+class StackSampler:
+    """
+    Samples one thread's Python stack every `interval` seconds from a helper
+    thread and counts each distinct stack. Much cheaper than cProfile, since
+    the profiled code runs untouched between samples. The helper needs the
+    GIL to look, so during pure-Python stretches samples land at most every
+    sys.getswitchinterval() (5 ms); very fast requests are better seen in
+    the rolling aggregate or with cProfile.
+    Stacks are recorded below the `root` function's frame, if given.
+    """
+
+    def __init__(self, thread_id, interval=PROFILE_SAMPLE_INTERVAL, root=None):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.root_code = root.__code__ if root is not None else None
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="profile-sampler")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None and frame.f_code is not self.root_code:
+                code = frame.f_code
+                names.append(f"{Path(code.co_filename).name}:{code.co_qualname}")
+                frame = frame.f_back
+            # Skip the sample taken while the request thread was stopping us
+            if names and frame is not None and names[-1] != _SAMPLER_EXIT:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+_SAMPLER_EXIT = f"{Path(__file__).name}:{StackSampler.__exit__.__qualname__}"
+
+
+def collapsed(stacks):
+    """Stack counts as collapsed-stack text: one "frame;frame;frame count" line per stack."""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def token_ok(token):
+    return bool(PROFILE_ADMIN_TOKEN) and hmac.compare_digest(str(token or ""), PROFILE_ADMIN_TOKEN)
+
+
+def _requested_mode():
+    """The on-demand mode this request asks for (None if it doesn't); raises PermissionError on a bad token."""
+    mode = request.headers.get("X-Profile") or request.args.get("profile")
+    if not mode:
+        return None
+    token = request.headers.get("X-Profile-Token") or request.args.get("profile_token")
+    if not token_ok(token):
+        raise PermissionError("Profiling needs a valid admin token")
+    return mode if mode in PROFILE_MODES else "cprofile"
+
+
+def _profile_path(endpoint, suffix):
+    Path(PROFILE_DIR).mkdir(parents=True, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return Path(PROFILE_DIR) / f"{stamp}-{endpoint}-{uuid.uuid4().hex[:8]}{suffix}"
+
+
+def _run_cprofile(endpoint, view, args, kwargs):
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        response = make_response(view(*args, **kwargs))
+    finally:
+        profiler.disable()
+    path = _profile_path(endpoint, ".pstats")
+    profiler.dump_stats(path)
+    return response, path
+
+
+def _run_sampled(endpoint, view, args, kwargs):
+    with StackSampler(threading.get_ident(), root=_run_sampled) as sampler:
+        response = make_response(view(*args, **kwargs))
+    return response, sampler.stacks
+
+
+def profiled(endpoint):
+    """
+    Decorator for Flask views: profiles the request when asked to (admin
+    token) or when picked by PROFILE_SAMPLE_RATE. Returns the view unchanged
+    when neither is configured.
+    """
+    def decorate(view):
+        if not PROFILE_ADMIN_TOKEN and PROFILE_SAMPLE_RATE <= 0:
+            return view
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                mode = _requested_mode()
+            except PermissionError as e:
+                return make_response({"error": str(e)}, 403)
+
+            # 1. On demand: one request, saved to PROFILE_DIR
+            if mode == "cprofile" and _cprofile_lock.acquire(blocking=False):
+                try:
+                    response, path = _run_cprofile(endpoint, view, args, kwargs)
+                finally:
+                    _cprofile_lock.release()
+                response.headers["X-Profile-File"] = path.name
+                return response
+            if mode is not None:
+                response, stacks = _run_sampled(endpoint, view, args, kwargs)
+                path = _profile_path(endpoint, ".collapsed")
+                path.write_text(collapsed(stacks))
+                response.headers["X-Profile-File"] = path.name
+                return response
+
+            # 2. Continuous: a sample of traffic into the rolling buffer
+            if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+                response, stacks = _run_sampled(endpoint, view, args, kwargs)
+                with _rolling_lock:
+                    _rolling.append((endpoint, stacks))
+                return response
+
+            return view(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def rolling_profile(endpoint=None):
+    """
+    Merged collapsed stacks of the sampled requests in the rolling buffer
+    (optionally only one endpoint's). Returns (request count, text).
+    """
+    with _rolling_lock:
+        entries = [stacks for name, stacks in _rolling if endpoint is None or name == endpoint]
+    merged = Counter()
+    for stacks in entries:
+        merged.update(stacks)
+    return len(entries), collapsed(merged)
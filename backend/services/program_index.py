@@ -0,0 +1,215 @@
+"""
+Compiled program index - flattens one catalogue snapshot into NumPy columns
+so a student can be scored against every program with a few array operations.
+Built once per snapshot version and shared by every request.
+"""
+
+import copy
+import threading
+import numpy as np
+from services.database import get_catalogue_snapshot
+from services.interest_matching import build_interest_matcher
+from services.requirements import RequirementIndex
+
+# Top-level keys of the mega-document that are not universities
+META_KEYS = {"_id", "apply_deadline"}
+DEFAULT_AVERAGE_RANGE = [80, 85]
+
+
+def normalize_term(term):
+    """Canonical form of an interest term: lowercase, single-spaced."""
+    return " ".join(str(term).lower().split())
+
+
+def program_interests(details):
+    """
+    A program's interest terms, normalized. The scraped catalogue uses
+    `interests`, the mock DB `interest_fields`; some programs have neither.
+    """
+    terms = details.get('interests') or details.get('interest_fields') or []
+    if isinstance(terms, str):
+        terms = [terms]
+    return {t for t in map(normalize_term, terms) if t}
+
+
+class ProgramIndex:
+    """
+    Columnar view of every program in a snapshot.
+    Row i of each array describes the same program:
+      - university_ids[i] / program_names[i]: which program it is
+      - min_avg[i], max_avg[i]: recommended_average range
+      - requirement_groups[i]: its compiled required_courses group in
+        `requirements` (see services/requirements.py)
+    Interest terms are interned into interest_vocab (term -> id), with an
+    inverted index from term id to the programs listing it: the postings of
+    term t are interest_postings[interest_offsets[t]:interest_offsets[t + 1]],
+    ascending program ids of the full index. interest_matcher holds the
+    fuzzy-matching tables for the vocabulary (None with INTEREST_MATCHING=exact).
+    Plus min_avg_order / sorted_min_avg: programs sorted by min_avg, so the
+    ones a given average reaches are a binary search away (full index only).
+    Sub-indexes from slice()/take() share the vocabularies and postings, with
+    `rows` holding their programs' ids in the full index (None for the full index).
+    """
+
+    def __init__(self, data, version=None):
+        self.version = version
+        self.universities = []
+        self.program_names = []
+        self.interest_vocab = {}
+        self.rows = None
+
+        university_ids = []
+        min_avg = []
+        max_avg = []
+        interest_rows = []
+        requirement_lists = []
+
+        for uni_name, uni_data in data.items():
+            if uni_name in META_KEYS or not isinstance(uni_data, dict):
+                continue
+            uni_id = len(self.universities)
+            self.universities.append(uni_name)
+
+            programs = uni_data.get('programs') or {}
+            for prog_name, details in programs.items():
+                university_ids.append(uni_id)
+                self.program_names.append(prog_name)
+
+                avg_range = details.get('recommended_average', DEFAULT_AVERAGE_RANGE)
+                min_avg.append(avg_range[0])
+                max_avg.append(avg_range[1] if len(avg_range) > 1 else avg_range[0])
+
+                interest_rows.append([
+                    self.interest_vocab.setdefault(t, len(self.interest_vocab))
+                    for t in sorted(program_interests(details))
+                ])
+                requirement_lists.append(details.get('required_courses', []))
+
+        n = len(self.program_names)
+        self.university_ids = np.array(university_ids, dtype=np.int32)
+        self.min_avg = np.array(min_avg, dtype=np.float64)
+        self.max_avg = np.array(max_avg, dtype=np.float64)
+        self.min_avg_order = np.argsort(self.min_avg, kind='stable')
+        self.sorted_min_avg = self.min_avg[self.min_avg_order]
+
+        # Inverted index: (term, program) pairs grouped by term, programs ascending
+        term_ids = np.fromiter((t for terms in interest_rows for t in terms), dtype=np.int32)
+        program_ids = np.repeat(np.arange(n, dtype=np.int32), [len(terms) for terms in interest_rows])
+        order = np.argsort(term_ids, kind='stable')
+        self.interest_postings = program_ids[order]
+        self.interest_offsets = np.zeros(len(self.interest_vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(self.interest_vocab)), out=self.interest_offsets[1:])
+        self.interest_matcher = build_interest_matcher(self.interest_vocab)
+
+        self.requirements = RequirementIndex(requirement_lists)
+        self.requirement_groups = self.requirements.program_groups
+        self.course_vocab = self.requirements.course_vocab
+
+    def __len__(self):
+        return len(self.program_names)
+
+    def _subset(self, rows, program_names):
+        part = copy.copy(self)
+        part.program_names = program_names
+        part.university_ids = self.university_ids[rows]
+        part.min_avg = self.min_avg[rows]
+        part.max_avg = self.max_avg[rows]
+        part.rows = (np.arange(len(self)) if self.rows is None else self.rows)[rows]
+        part.requirement_groups = self.requirement_groups[rows]
+        # The min_avg ordering describes the full index only
+        part.min_avg_order = part.sorted_min_avg = None
+        return part
+
+    def slice(self, start, stop):
+        """
+        View of programs [start, stop) sharing this index's vocabularies.
+        Arrays are numpy views, so this is cheap.
+        """
+        return self._subset(slice(start, stop), self.program_names[start:stop])
+
+    def take(self, ids):
+        """Copy of just the programs `ids` (ascending), sharing this index's vocabularies."""
+        ids = np.asarray(ids, dtype=np.intp)
+        return self._subset(ids, [self.program_names[i] for i in ids])
+
+    def min_avg_at_most(self, limit):
+        """
+        Ids of the programs whose min_avg is <= limit, in catalogue order.
+        One binary search over the sorted min_avg column, then only the
+        matching programs are touched.
+        """
+        end = np.searchsorted(self.sorted_min_avg, limit, side='right')
+        return np.sort(self.min_avg_order[:end])
+
+    def university_name(self, i):
+        return self.universities[self.university_ids[i]]
+
+    def match_interests(self, terms):
+        """
+        Per (normalized) student term that matches anything, the vocabulary
+        (ids, credits) it earns: the exact term only, or the fuzzy matches
+        with INTEREST_MATCHING=fuzzy.
+        """
+        if self.interest_matcher is not None:
+            matches = [self.interest_matcher.match(t) for t in terms]
+            return [m for m in matches if len(m[0])]
+        return [
+            (np.array([self.interest_vocab[t]], dtype=np.int32), np.ones(1))
+            for t in terms if t in self.interest_vocab
+        ]
+
+    def _programs_listing(self, term_id):
+        """Programs (positions in this index) listing a term, from its postings list."""
+        hits = self.interest_postings[self.interest_offsets[term_id]:self.interest_offsets[term_id + 1]]
+        if self.rows is not None:
+            # Full-index ids -> positions in this sub-index, dropping programs outside it
+            pos = np.searchsorted(self.rows, hits)
+            inside = self.rows[np.minimum(pos, len(self.rows) - 1)] == hits
+            hits = pos[inside]
+        return hits
+
+    def interest_overlap(self, matches_per_student):
+        """
+        (students, programs) interest credit: for each student term, the best
+        credit among the terms a program lists (so at most 1), summed over
+        the student's terms. Built from postings lists, so only programs
+        sharing a matched term with the student are touched.
+        matches_per_student: per student, match_interests() output.
+        """
+        overlap = np.zeros((len(matches_per_student), len(self)))
+        if not len(self):
+            return overlap
+        for s, matches in enumerate(matches_per_student):
+            for term_ids, credits in matches:
+                if len(term_ids) == 1:
+                    # One term: its postings have no repeats
+                    overlap[s, self._programs_listing(term_ids[0])] += credits[0]
+                    continue
+                best = np.zeros(len(self))
+                for term_id, credit in zip(term_ids, credits):
+                    hits = self._programs_listing(term_id)
+                    best[hits] = np.maximum(best[hits], credit)
+                overlap[s] += best
+        return overlap
+
+
+_index: ProgramIndex | None = None
+_index_lock = threading.Lock()
+
+
+def get_program_index():
+    """
+    Returns the ProgramIndex for the current catalogue snapshot,
+    rebuilding it only when the snapshot version changes.
+    """
+    global _index
+
+    snapshot = get_catalogue_snapshot()
+    index = _index
+    if index is not None and index.version == snapshot.version:
+        return index
+
+    with _index_lock:
+        if _index is None or _index.version != snapshot.version:
+            _index = ProgramIndex(snapshot.data, snapshot.version)
+        return _index
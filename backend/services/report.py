@@ -0,0 +1,172 @@
+"""
+Personalized PDF reports: a student's top program matches with the steps to
+apply and career outcomes for each, rendered with the same styles as the
+catalogue PDF (pdfmaker.py).
+"""
+
+import os
+import tempfile
+import threading
+from xml.sax.saxutils import escape
+from pypdf import PdfWriter
+from reportlab.platypus import Paragraph, Spacer
+
+from pdfmaker import get_styles, render_story
+
+REPORT_TOP_K = int(os.getenv("REPORT_TOP_K", "5"))
+# Reports bigger than this spill from memory to a temp file while streaming
+REPORT_SPOOL_BYTES = int(os.getenv("REPORT_SPOOL_BYTES", str(2 * 1024 * 1024)))
+REPORT_CHUNK_BYTES = 64 * 1024
+
+
+class SectionCache:
+    """
+    Per-snapshot cache of the (style, markup) lines for university and program
+    sections. Building the markup is shared across students and requests;
+    Paragraphs are made fresh per render since platypus mutates them.
+    """
+
+    def __init__(self):
+        self.version = None
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, version, key, build):
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self.version = version
+            lines = self._entries.get(key)
+        if lines is None:
+            lines = build()
+            with self._lock:
+                if version == self.version:
+                    self._entries[key] = lines
+        return lines
+
+
+_sections = SectionCache()
+
+
+def _bullets(title, items):
+    lines = [("normal", f"<b>{title}</b>")] if items else []
+    return lines + [("bullet", f"• {item}") for item in items]
+
+
+def _program_lines(prog_name, uni_name, details, coop):
+    avg = details.get("recommended_average", "N/A")
+    if isinstance(avg, list):
+        avg_str = f"{avg[0]}% - {avg[1]}%" if len(avg) > 1 else f"{avg[0]}%"
+    else:
+        avg_str = str(avg)
+
+    lines = [
+        ("prog_header", f"{prog_name.strip()} - {uni_name}"),
+        ("normal", f"<b>Recommended Average:</b> {avg_str}"),
+    ]
+    if coop:
+        lines.append(("normal", f"<b>Co-op Available:</b> {', '.join(coop)}"))
+    reqs = details.get("required_courses", [])
+    if reqs:
+        lines.append(("normal", f"<b>Required Courses:</b> {', '.join(reqs)}"))
+    lines += _bullets("Top 3 Career Outcomes:", details.get("outcomes", []))
+    return tuple(lines)
+
+
+def _steps_lines(uni_name, uni_data, apply_deadline):
+    lines = [("step_header", f"Steps to Apply: {uni_name}")]
+    if apply_deadline:
+        lines.append(("normal", f"<b>Application Deadline:</b> {apply_deadline}"))
+    lines += [("bullet", step) for step in uni_data.get("steps", [])]
+    return tuple(lines)
+
+
+def _materialize(lines):
+    styles = get_styles()
+    return [Paragraph(text, styles[style]) for style, text in lines]
+
+
+def student_story(name, profile, rankings, catalogue, version):
+    """
+    Flowables for one student's report section. Everything that comes from
+    the request is escaped before it goes into Paragraph markup (reportlab
+    would otherwise act on tags like <img src=...>).
+    """
+    styles = get_styles()
+    apply_deadline = catalogue.get("apply_deadline")
+
+    interests = ", ".join(escape(str(i)) for i in profile.get("major_interests") or [])
+    title = f"Program Matches for {escape(str(name))}" if name else "Your Program Matches"
+    story = [
+        Paragraph(title, styles["title"]),
+        Paragraph(
+            f"<b>Grade:</b> {escape(str(profile.get('grade_level')))} &nbsp; "
+            f"<b>Average:</b> {escape(str(profile.get('average')))}% &nbsp; "
+            f"<b>Interests:</b> {interests or 'none listed'}",
+            styles["normal"],
+        ),
+        Spacer(1, 15),
+    ]
+
+    steps_shown = set()
+    for place, result in enumerate(rankings, start=1):
+        uni_name, prog_name = result["university"], result["program"]
+        uni_data = catalogue.get(uni_name) or {}
+        details = (uni_data.get("programs") or {}).get(prog_name, {})
+
+        story.append(Paragraph(f"#{place} &nbsp; Match score {result['score']}", styles["normal"]))
+        story += _materialize(_sections.get(
+            version, ("program", uni_name, prog_name),
+            lambda: _program_lines(prog_name, uni_name, details, uni_data.get("co-op"))
+        ))
+
+        # Steps are per university, so only list them the first time
+        if uni_data.get("steps"):
+            if uni_name in steps_shown:
+                story.append(Paragraph(f"<i>Steps to apply to {uni_name} are listed above.</i>", styles["normal"]))
+            else:
+                steps_shown.add(uni_name)
+                story.append(Spacer(1, 5))
+                story += _materialize(_sections.get(
+                    version, ("steps", uni_name),
+                    lambda: _steps_lines(uni_name, uni_data, apply_deadline)
+                ))
+        story.append(Spacer(1, 10))
+
+    return story
+
+
+def render_report(students, catalogue, version):
+    """
+    Renders [(name, profile, rankings), ...] to a PDF and returns a file
+    object positioned at the start. Each student is rendered as its own
+    section and the sections are merged, so only one student's story is in
+    memory at a time; output above REPORT_SPOOL_BYTES spills to disk.
+    """
+    output = tempfile.SpooledTemporaryFile(max_size=REPORT_SPOOL_BYTES)
+
+    if len(students) == 1:
+        output.write(render_story(student_story(*students[0], catalogue, version)))
+    else:
+        writer = PdfWriter()
+        for student in students:
+            section = tempfile.SpooledTemporaryFile(max_size=REPORT_SPOOL_BYTES)
+            section.write(render_story(student_story(*student, catalogue, version)))
+            section.seek(0)
+            writer.append(section)
+        writer.write(output)
+
+    output.seek(0)
+    return output
+
+
+def iter_file_chunks(f, chunk_size=REPORT_CHUNK_BYTES):
+    """Yields a file's bytes in chunks, closing it when done (or abandoned)."""
+    try:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        f.close()
@@ -0,0 +1,205 @@
+"""
+Course-requirement compiler.
+
+Catalogue `required_courses` entries come in a few shapes:
+  "MHF4U"                                            one specific course
+  "ENG4U / EAE4U", "One of: MHF4U, SBI4U, ICS4U"     any one of a set
+  "Two of: SBI4U, SCH4U, SPH4U, SES4U, ICS4U or TEJ4M"  k of a set
+  "One Science"                                      one of the 4U sciences
+  "One U/M", "One additional 4U/M course"            any other 4U/4M course
+They are parsed once per snapshot into rules over a course vocabulary, with
+every course set stored as a bitmask. Programs with identical requirement
+lists share one compiled group, so checking a student is a few integer
+operations per group, gathered out to every program.
+"""
+
+import re
+import threading
+import warnings
+from functools import lru_cache
+from typing import NamedTuple
+import numpy as np
+
+COURSE_CODE = re.compile(r"\b[A-Z]{3}[1-4][UMCEO]\b")
+# Grade 12 university / university-college courses, the ones wildcard slots accept
+UM_COURSE = re.compile(r"^[A-Z]{3}4[UM]$")
+COUNT_WORDS = {"ONE": 1, "TWO": 2, "THREE": 3, "FOUR": 4, "FIVE": 5}
+SCIENCE_COURSES = ("SBI4U", "SCH4U", "SES4U", "SPH4U")
+
+# Unrecognized requirement entries already warned about in this process
+_reported_unknown = set()
+_reported_lock = threading.Lock()
+
+
+class Rule(NamedTuple):
+    """
+    One parsed requirement entry.
+    kind: "courses" (at least k of `codes`), "wildcard" (k more 4U/4M
+    courses of any kind) or "unknown" (not understood, never penalized).
+    """
+    kind: str
+    codes: tuple
+    k: int
+
+
+def _count(word):
+    return int(word) if word.isdigit() else COUNT_WORDS.get(word, 1)
+
+
+@lru_cache(maxsize=4096)
+def parse_requirement(entry):
+    """Parses one required_courses entry into a Rule."""
+    text = " ".join(str(entry).upper().split())
+    codes = tuple(sorted(set(COURSE_CODE.findall(text))))
+    words = text.replace(":", " ").split()
+    k = _count(words[0]) if words else 1
+
+    # "Two of: A, B or C" / "One of: A, B"
+    if len(words) > 1 and words[1] in ("OF", "FROM") and codes:
+        return Rule("courses", codes, min(k, len(codes)))
+
+    if "SCIENCE" in words:
+        return Rule("courses", SCIENCE_COURSES, k)
+
+    # "One U/M", "One 4U/M", "One more U or M course", "One additional 4U/M course"
+    if re.search(r"\b4?U\s*(/|OR)\s*4?M\b", text) and not codes:
+        return Rule("wildcard", (), k)
+
+    # "MHF4U", "ENG4U / EAE4U"
+    if codes:
+        return Rule("courses", codes, 1)
+
+    return Rule("unknown", (), 0)
+
+
+if hasattr(np, "bitwise_count"):
+    def popcount(words):
+        return np.bitwise_count(words)
+else:
+    _BYTE_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def popcount(words):
+        bytes_ = np.ascontiguousarray(words).view(np.uint8).reshape(*words.shape, 8)
+        return _BYTE_POPCOUNT[bytes_].sum(axis=-1, dtype=np.uint8)
+
+
+class TakenCourses(NamedTuple):
+    """
+    Encoded courses of a batch of students.
+    masks / um_masks: (students, words) bitmasks of the vocabulary courses
+    taken (all / only 4U-4M ones); other_um: 4U/4M courses taken that no
+    program names, which can still fill wildcard slots.
+    """
+    masks: np.ndarray
+    um_masks: np.ndarray
+    other_um: np.ndarray
+
+
+class RequirementIndex:
+    """
+    Compiled requirements for every program of a snapshot.
+      - course_vocab: course code -> bit number
+      - unknown: required_courses entries that weren't understood
+      - program_groups[i]: the requirement group of program i
+      - per group g: its "courses" rules (rule_masks, rule_k, rule_groups),
+        wildcard slot count (wildcards[g]) and the union of its named
+        courses (named_masks[g]), which wildcard slots only get when a rule
+        has more of them than it needs
+    """
+
+    def __init__(self, requirement_lists):
+        self.course_vocab = {}
+        group_ids = {}
+        group_rules = []
+        program_groups = []
+        unknown = set()
+
+        for entries in requirement_lists:
+            rules = []
+            for entry in entries or []:
+                rule = parse_requirement(entry)
+                if rule.kind == "unknown":
+                    unknown.add(str(entry))
+                    continue
+                for code in rule.codes:
+                    self.course_vocab.setdefault(code, len(self.course_vocab))
+                rules.append(rule)
+            key = tuple(sorted(rules))
+            if key not in group_ids:
+                group_ids[key] = len(group_rules)
+                group_rules.append(key)
+            program_groups.append(group_ids[key])
+
+        # Entries no rule understands, never penalized. Indexes are rebuilt
+        # for every snapshot and worker, so each is only warned about once
+        self.unknown = frozenset(unknown)
+        with _reported_lock:
+            new = sorted(self.unknown - _reported_unknown)
+            _reported_unknown.update(new)
+        for entry in new:
+            warnings.warn(f"Unrecognized course requirement '{entry}', not counted", stacklevel=2)
+
+        self.words = max(1, -(-len(self.course_vocab) // 64))
+        self.program_groups = np.array(program_groups, dtype=np.int32)
+
+        n_groups = len(group_rules)
+        course_rules = [(g, rule) for g, rules in enumerate(group_rules) for rule in rules if rule.kind == "courses"]
+        self.rule_masks = np.zeros((len(course_rules), self.words), dtype=np.uint64)
+        self.rule_k = np.array([rule.k for _, rule in course_rules], dtype=np.int32)
+        # (rules, groups) one-hot, so per-group sums are one matrix product
+        self.rule_groups = np.zeros((len(course_rules), n_groups), dtype=np.int32)
+        self.named_masks = np.zeros((n_groups, self.words), dtype=np.uint64)
+        self.wildcards = np.zeros(n_groups, dtype=np.int32)
+
+        for r, (g, rule) in enumerate(course_rules):
+            self.rule_masks[r] = self._mask(rule.codes)
+            self.rule_groups[r, g] = 1
+            self.named_masks[g] |= self.rule_masks[r]
+        for g, rules in enumerate(group_rules):
+            self.wildcards[g] = sum(rule.k for rule in rules if rule.kind == "wildcard")
+
+    @property
+    def group_count(self):
+        return len(self.wildcards)
+
+    def _mask(self, codes):
+        mask = np.zeros(self.words, dtype=np.uint64)
+        for code in codes:
+            bit = self.course_vocab.get(code)
+            if bit is not None:
+                mask[bit // 64] |= np.uint64(1) << np.uint64(bit % 64)
+        return mask
+
+    def encode(self, course_sets):
+        """Encodes each student's set of (uppercased) course codes as TakenCourses."""
+        masks = np.zeros((len(course_sets), self.words), dtype=np.uint64)
+        um_masks = np.zeros((len(course_sets), self.words), dtype=np.uint64)
+        other_um = np.zeros(len(course_sets), dtype=np.int32)
+        for s, codes in enumerate(course_sets):
+            um = [c for c in codes if UM_COURSE.match(c)]
+            masks[s] = self._mask(codes)
+            um_masks[s] = self._mask(um)
+            other_um[s] = sum(1 for c in um if c not in self.course_vocab)
+        return TakenCourses(masks, um_masks, other_um)
+
+    def missing(self, taken):
+        """
+        (students, groups) number of requirements each student is missing:
+        courses short of each "k of" rule, plus wildcard slots not covered by
+        spare 4U/4M courses. Spare courses are the ones outside the group's
+        named courses, plus named ones a rule doesn't need (the third science
+        of a "Two of" rule). A rule is assumed to use the student's non-4U/M
+        matches first, and a course two rules share counts as used by both,
+        so spares are never overcounted.
+        """
+        hits = popcount(taken.masks[:, None, :] & self.rule_masks[None, :, :]).sum(axis=2, dtype=np.int32)
+        used = np.minimum(self.rule_k, hits)
+        named = (self.rule_k - used) @ self.rule_groups
+
+        um_hits = popcount(taken.um_masks[:, None, :] & self.rule_masks[None, :, :]).sum(axis=2, dtype=np.int32)
+        um_used = np.maximum(0, used - (hits - um_hits)) @ self.rule_groups
+        um_named = popcount(taken.um_masks[:, None, :] & self.named_masks[None, :, :]).sum(axis=2, dtype=np.int32)
+        extra = popcount(taken.um_masks[:, None, :] & ~self.named_masks[None, :, :]).sum(axis=2, dtype=np.int32)
+        extra += np.maximum(0, um_named - um_used) + taken.other_um[:, None]
+        wild = np.maximum(0, self.wildcards - extra)
+        return named + wild
@@ -0,0 +1,116 @@
+"""
+Result cache for ranked recommendations.
+Keyed by a canonical hash of the normalized student profile plus the
+catalogue snapshot version, so identical submissions skip the matcher and a
+new snapshot invalidates everything automatically.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "1024"))        # 0 disables the cache
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "300"))         # seconds
+
+
+def profile_cache_key(normalized_profile, *params):
+    """
+    Stable hash of a normalized profile (courses/ECs/interests already
+    normalized by UniversityMatcher) and any extra ranking parameters.
+    Order of courses, ECs and interests doesn't matter.
+    """
+    canonical = {
+        "grade_level": normalized_profile.get("grade_level"),
+        "average": normalized_profile.get("average"),
+        "wants_coop": normalized_profile.get("wants_coop"),
+        "courses_taken": sorted(
+            json.dumps([str(code).strip().upper(), grade], default=str)
+            for code, grade in normalized_profile.get("courses_taken", [])
+        ),
+        "extra_curriculars": sorted(
+            json.dumps([str(name).strip().lower(), level], default=str)
+            for name, level in normalized_profile.get("extra_curriculars", [])
+        ),
+        "major_interests": sorted(set(normalized_profile.get("major_interests", []))),
+        "params": list(params),
+    }
+    raw = json.dumps(canonical, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Thread-safe LRU + TTL cache. Entries belong to one catalogue snapshot
+    version; seeing a different version clears the cache.
+    """
+
+    def __init__(self, max_size=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _check_version(self, version):
+        # Caller holds the lock
+        if version != self.version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.version = version
+
+    def get(self, version, key):
+        if self.max_size <= 0:
+            return None
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, version, key, value):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "version": self.version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+# Shared by every request in the process
+ranking_cache = ResultCache()
@@ -0,0 +1,416 @@
+"""
+Local retrieval over the program catalogue for the chatbot.
+Factual questions ("what's Waterloo's AIF deadline?", "what average do I need
+for McMaster mechanical?") are answered in-process from the catalogue
+snapshot with a BM25 index; only open-ended questions go to the remote agent.
+"""
+
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+
+from services.database import current_catalogue_snapshot, get_catalogue_document, get_catalogue_snapshot
+from services.chat_cache import STOPWORDS
+
+CHAT_LOCAL_ANSWERS = os.getenv("CHAT_LOCAL_ANSWERS", "true").lower() == "true"
+# Only questions this short (in words, one sentence) are treated as lookups
+CHAT_LOCAL_MAX_WORDS = int(os.getenv("CHAT_LOCAL_MAX_WORDS", "14"))
+# Lowest BM25 score (question minus the university name) the answering fact needs
+CHAT_LOCAL_MIN_SCORE = float(os.getenv("CHAT_LOCAL_MIN_SCORE", "2.0"))
+# Append the best catalogue facts to prompts that still go to the agent
+CHAT_GROUNDING = os.getenv("CHAT_GROUNDING", "false").lower() == "true"
+
+META_KEYS = {"_id", "apply_deadline"}
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Nicknames students use that can't be derived from the official name
+UNIVERSITY_ALIASES = {
+    "University of Toronto": ["uoft", "u of t"],
+    "University of Waterloo": ["uw", "uwaterloo"],
+    "McMaster University": ["mac", "mcmaster"],
+    "Queen's University": ["queens", "queen's"],
+    "Queens University": ["queens", "queen's"],
+    "University of Ottawa": ["uottawa"],
+    "Toronto Metropolitan University": ["tmu", "ryerson"],
+    "Ontario Tech University": ["uoit", "ontario tech"],
+    "Western University": ["uwo", "western"],
+}
+
+# Words in program names that don't tell programs apart
+GENERIC_PROGRAM_WORDS = {"engineering", "program", "and", "&", "of", "the", "basc", "bsc", "beng", "in"}
+
+# Question type -> (words naming it, words that only hint at it). Every
+# intent is scored, a naming word counting twice a hint; see classify_intent.
+DEADLINE_WORDS = {"deadline", "deadlines", "due", "date", "dates"}
+INTENT_WORDS = {
+    "courses": ({"prerequisite", "prerequisites", "prereq", "prereqs", "courses", "course"},
+                {"requirements", "required", "need", "take"}),
+    "average": ({"average", "averages", "cutoff", "cutoffs", "gpa", "grades", "marks"}, {"need", "get"}),
+    "outcomes": ({"career", "careers", "job", "jobs", "outcomes"}, {"become", "after"}),
+    "deadline": (DEADLINE_WORDS, {"when", "apply", "application"}),
+    "coop": ({"coop", "internship", "internships"}, set()),
+    "steps": ({"steps", "process", "supplementary", "portal"}, {"how", "apply", "application"}),
+    "interests": ({"study", "learn", "topics", "areas", "focus"}, set()),
+}
+# Lowest intent score that counts as a match: one naming word, or two hints
+INTENT_MIN_SCORE = 2
+INTENT_VOCAB = set().union(*(named | hints for named, hints in INTENT_WORDS.values()))
+PROGRAM_INTENTS = {"courses", "average", "outcomes", "interests"}
+# Fact field each intent is answered from
+INTENT_FIELDS = {"deadline": "steps", "steps": "steps", "coop": "coop"}
+
+# Words that make a question advice or comparison rather than a lookup
+OPEN_ENDED_WORDS = {
+    "better", "best", "worse", "compare", "compared", "comparison", "vs", "versus", "than",
+    "should", "worth", "recommend", "chance", "chances", "difference", "instead", "if",
+    "gap", "later", "transfer", "defer",
+}
+# Words a lookup question can contain without the answer having to cover them
+QUESTION_WORDS = {
+    "have", "has", "offer", "offers", "need", "get", "take", "much", "which", "any", "info",
+    "information", "know", "find", "out", "some", "they", "their", "university", "program",
+    "programs", "engineering", "degree", "student", "students", "high", "school", "recommended", "minimum",
+}
+
+DATE_PATTERN = re.compile(
+    r"\b(january|february|march|april|may|june|july|august|september|october|november|december|"
+    r"jan|feb|mar|apr|jun|jul|aug|sep|sept|oct|nov|dec)\b",
+    re.IGNORECASE,
+)
+
+
+def strip_markup(text):
+    """Drops the <b>...</b> style tags used in pdfmaker step text."""
+    return re.sub(r"<[^>]+>", "", str(text)).strip()
+
+
+def tokenize(text):
+    text = str(text).lower().replace("’", "'").replace("co-op", "coop").replace("co op", "coop")
+    text = re.sub(r"'s\b", "", text)
+    return re.findall(r"[a-z0-9]+", text)
+
+
+def _join(items):
+    items = [str(i).strip() for i in items if str(i).strip()]
+    if len(items) <= 1:
+        return "".join(items)
+    return ", ".join(items[:-1]) + " and " + items[-1]
+
+
+class CatalogueRetriever:
+    """
+    BM25 index over small "facts" (one per application step, per program
+    field, ...), plus the name lookups needed to answer from them.
+    """
+
+    def __init__(self, data, version=None):
+        self.version = version
+        self.apply_deadline = data.get("apply_deadline")
+        self.universities = {}
+        self.facts = []
+        self.postings = defaultdict(list)   # term -> [(fact id, term frequency)]
+        self.alias_patterns = []            # (compiled alias regex, university), longest alias first
+
+        for uni_name, uni_data in data.items():
+            if uni_name in META_KEYS or not isinstance(uni_data, dict):
+                continue
+            self.universities[uni_name] = uni_data
+            self._add_aliases(uni_name)
+
+            for step in uni_data.get("steps", []):
+                self._add_fact(uni_name, None, "steps", strip_markup(step))
+            coop = uni_data.get("co-op")
+            if coop:
+                self._add_fact(uni_name, None, "coop", f"co-op {_join(coop)}")
+
+            for prog_name, details in (uni_data.get("programs") or {}).items():
+                for field, key in (("average", "recommended_average"), ("courses", "required_courses"),
+                                   ("outcomes", "outcomes"), ("interests", "interests")):
+                    value = details.get(key)
+                    if value:
+                        text = _join(value) if isinstance(value, list) else str(value)
+                        self._add_fact(uni_name, prog_name, field, f"{prog_name} {field} {text}")
+
+        self.alias_patterns.sort(key=lambda p: -len(p[0].pattern))
+        lengths = [f["length"] for f in self.facts]
+        self.avg_length = sum(lengths) / len(lengths) if lengths else 0.0
+
+    def _add_aliases(self, uni_name):
+        lowered = uni_name.lower()
+        aliases = {lowered, lowered.replace("university of ", "").replace(" university", "").strip()}
+        aliases.update(UNIVERSITY_ALIASES.get(uni_name, []))
+        for alias in aliases:
+            if alias:
+                pattern = re.compile(r"\b" + re.escape(alias) + r"\b")
+                self.alias_patterns.append((pattern, uni_name))
+
+    def _add_fact(self, uni_name, prog_name, field, text):
+        tokens = [t for t in tokenize(f"{uni_name} {text}") if t not in STOPWORDS]
+        fact_id = len(self.facts)
+        self.facts.append({
+            "university": uni_name, "program": prog_name, "field": field,
+            "text": text, "length": len(tokens),
+        })
+        for term, tf in Counter(tokens).items():
+            self.postings[term].append((fact_id, tf))
+
+    # -----------------------------
+    # Search
+    # -----------------------------
+    def search(self, query, k=3, where=None):
+        """
+        BM25 over the facts, summing postings of the query terms only.
+        `where` optionally filters facts. Returns [(score, fact)] best first.
+        """
+        n = len(self.facts)
+        scores = defaultdict(float)
+        for term in set(t for t in tokenize(query) if t not in STOPWORDS):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for fact_id, tf in postings:
+                length = self.facts[fact_id]["length"]
+                scores[fact_id] += idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / self.avg_length))
+
+        ranked = sorted(scores.items(), key=lambda item: -item[1])
+        results = [(score, self.facts[i]) for i, score in ranked if where is None or where(self.facts[i])]
+        return results[:k]
+
+    def find_universities(self, message):
+        """
+        Universities mentioned in the message, in alias order, and the
+        message with those mentions blanked out. Longer aliases are matched
+        first so "toronto metropolitan" doesn't also count as "toronto".
+        """
+        rest = message.lower().replace("’", "'")
+        found = []
+        for pattern, uni_name in self.alias_patterns:
+            if pattern.search(rest):
+                rest = pattern.sub(" ", rest)
+                if uni_name not in found:
+                    found.append(uni_name)
+        return found, rest
+
+    def find_program(self, uni_name, tokens):
+        """Program at uni_name whose distinctive name words best overlap the question."""
+        programs = self.universities[uni_name].get("programs") or {}
+        best, best_key = None, (0, 0)
+        for prog_name in programs:
+            words = set(tokenize(prog_name)) - GENERIC_PROGRAM_WORDS
+            # Most matching words first, then the fewest unmatched ones
+            key = (len(words & tokens), -len(words - tokens))
+            if key[0] and key > best_key:
+                best, best_key = prog_name, key
+        if best is None and len(programs) == 1:
+            return next(iter(programs))
+        return best
+
+    # -----------------------------
+    # Answering
+    # -----------------------------
+    def is_lookup(self, message):
+        """A single short question with no comparison / advice words."""
+        sentences = [part for part in re.split(r"[?.!]+", message) if part.strip()]
+        words = tokenize(message)
+        return len(sentences) <= 1 and len(words) <= CHAT_LOCAL_MAX_WORDS and not OPEN_ENDED_WORDS & set(words)
+
+    @staticmethod
+    def classify_intent(tokens):
+        """
+        The question type the tokens ask about, or None when no intent
+        scores INTENT_MIN_SCORE or two intents tie for the best score.
+        """
+        scores = sorted(
+            ((2 * len(tokens & named) + len(tokens & hints), name) for name, (named, hints) in INTENT_WORDS.items()),
+            reverse=True,
+        )
+        (best, intent), (runner_up, _) = scores[0], scores[1]
+        if best < INTENT_MIN_SCORE or best == runner_up:
+            return None
+        return intent
+
+    def _facts(self, uni_name, field, prog_name=None):
+        return [f for f in self.facts if f["university"] == uni_name and f["field"] == field
+                and (prog_name is None or f["program"] == prog_name)]
+
+    def covers(self, rest, uni_name, field, prog_name=None):
+        """
+        Whether every content word of the question (university name already
+        removed) is either a question word or appears in the facts that
+        would answer it. "Is co-op mandatory" asks something the co-op fact
+        doesn't say, so it isn't answered from it.
+        """
+        known = set(QUESTION_WORDS) | INTENT_VOCAB | STOPWORDS
+        for fact in self._facts(uni_name, field, prog_name):
+            known.update(tokenize(fact["text"]))
+        return not set(tokenize(rest)) - known
+
+    def fact_score(self, query, uni_name, field, prog_name=None):
+        """Best BM25 score of the query against one university's facts of a field."""
+        hits = self.search(query, k=1, where=lambda f: f["university"] == uni_name and f["field"] == field
+                           and (prog_name is None or f["program"] == prog_name))
+        return hits[0][0] if hits else 0.0
+
+    def answer(self, message):
+        """
+        Returns a short plain-text answer when the question is a catalogue
+        lookup about exactly one university (and program, where needed) with
+        one clear intent, and the answering facts match and cover it,
+        otherwise None.
+        """
+        tokens = set(tokenize(message))
+        intent = self.classify_intent(tokens)
+        if intent is None or not self.is_lookup(message):
+            return None
+        universities, rest = self.find_universities(message)
+        if len(universities) != 1:
+            return None
+        uni_name = universities[0]
+
+        uni_data = self.universities[uni_name]
+        prog_name = None
+        if intent in PROGRAM_INTENTS:
+            prog_name = self.find_program(uni_name, tokens)
+            if prog_name is None:
+                return None
+        # The university is already settled, so score what the rest of the question asks
+        field = INTENT_FIELDS.get(intent, intent)
+        if self.fact_score(rest, uni_name, field, prog_name) < CHAT_LOCAL_MIN_SCORE:
+            return None
+        if not self.covers(rest, uni_name, field, prog_name):
+            return None
+
+        if prog_name is not None:
+            details = uni_data["programs"][prog_name]
+            return self._answer_program(intent, uni_name, prog_name.strip(), details)
+
+        if intent == "coop":
+            coop = set(uni_data.get("co-op") or [])
+            if not coop:
+                return None
+            if coop >= {"yes", "no"}:
+                return f"{uni_name} offers both co-op and regular (non co-op) streams."
+            if "yes" in coop:
+                return f"{uni_name} offers co-op."
+            return f"{uni_name} does not offer co-op."
+
+        steps = [strip_markup(s) for s in uni_data.get("steps", [])]
+        if intent == "deadline":
+            # Prefer the step the question is about (e.g. "AIF"), if any
+            hits = self.search(message, k=1, where=lambda f: f["university"] == uni_name
+                               and f["field"] == "steps" and DATE_PATTERN.search(f["text"]))
+            specific = tokens - set(tokenize(uni_name)) - DEADLINE_WORDS - STOPWORDS - {"when", "apply", "application"}
+            if hits and specific & set(tokenize(hits[0][1]["text"])):
+                return f"{uni_name}: {hits[0][1]['text']}"
+            dated = [s for s in steps if DATE_PATTERN.search(s)]
+            if dated:
+                return f"Key dates for {uni_name}: " + " ".join(dated[:3])
+            if self.apply_deadline:
+                return f"The OUAC application deadline for {uni_name} is {self.apply_deadline}."
+            return None
+
+        if intent == "steps" and steps:
+            return f"Steps to apply to {uni_name}: " + " ".join(steps[:5])
+        return None
+
+    @staticmethod
+    def _answer_program(intent, uni_name, prog_name, details):
+        if intent == "average":
+            avg = details.get("recommended_average")
+            if not avg:
+                return None
+            avg_str = f"{avg[0]}% - {avg[1]}%" if isinstance(avg, list) and len(avg) > 1 else f"{avg[0] if isinstance(avg, list) else avg}%"
+            return f"{prog_name} at {uni_name} has a recommended average of {avg_str}."
+        if intent == "courses":
+            reqs = details.get("required_courses")
+            if not reqs:
+                return None
+            return f"{prog_name} at {uni_name} requires {_join(reqs)}."
+        if intent == "outcomes":
+            outcomes = details.get("outcomes")
+            if not outcomes:
+                return None
+            return f"Common careers after {prog_name} at {uni_name} include {_join(outcomes)}."
+        interests = details.get("interests") or details.get("interest_fields")
+        if not interests:
+            return None
+        return f"{prog_name} at {uni_name} focuses on {_join(interests[:6])}."
+
+    def grounding(self, message, k=3):
+        """A few relevant catalogue facts to append to an agent prompt."""
+        return [fact["text"] if fact["program"] is None else f"{fact['university']}: {fact['text']}"
+                for _, fact in self.search(message, k=k)]
+
+
+_retriever: CatalogueRetriever | None = None
+_retriever_lock = threading.Lock()
+
+
+def get_retriever(snapshot=None, fetch=True):
+    """
+    CatalogueRetriever for a snapshot (default: the current one), rebuilt
+    when the version changes. With fetch=False it returns None rather than
+    fetching a partial snapshot's full document.
+    """
+    global _retriever
+
+    snapshot = snapshot or get_catalogue_snapshot()
+    retriever = _retriever
+    if retriever is not None and retriever.version == snapshot.version:
+        return retriever
+
+    with _retriever_lock:
+        if _retriever is None or _retriever.version != snapshot.version:
+            data = get_catalogue_document(snapshot, fetch=fetch)
+            if data is None:
+                return None
+            _retriever = CatalogueRetriever(data, snapshot.version)
+        return _retriever
+
+
+def _loaded_retriever():
+    """
+    Retriever for the catalogue already in memory, or None. The chat path
+    never waits on MongoDB: before the first load it goes to the agent.
+    """
+    snapshot = current_catalogue_snapshot()
+    if snapshot is None:
+        return None
+    return get_retriever(snapshot, fetch=False)
+
+
+def answer_locally(user_message):
+    """
+    Catalogue answer for factual questions, or None to fall back to the agent.
+    Never raises or loads the catalogue: without one in memory the agent
+    handles it.
+    """
+    if not CHAT_LOCAL_ANSWERS:
+        return None
+    try:
+        retriever = _loaded_retriever()
+        return retriever.answer(user_message) if retriever is not None else None
+    except Exception as e:
+        print(f"Local retrieval failed, falling back to agent: {e}")
+        return None
+
+
+def ground_message(user_message):
+    """Appends relevant catalogue facts to a message bound for the agent (CHAT_GROUNDING)."""
+    if not CHAT_GROUNDING:
+        return user_message
+    try:
+        retriever = _loaded_retriever()
+        facts = retriever.grounding(user_message) if retriever is not None else []
+    except Exception as e:
+        print(f"Local retrieval failed, sending message without grounding: {e}")
+        return user_message
+    if not facts:
+        return user_message
+    return user_message + "\n\nRelevant catalogue facts: " + " | ".join(facts)
@@ -0,0 +1,89 @@
+"""
+Population statistics for Z-score normalization.
+Lets the matcher standardize against a shared mean/std (per catalogue snapshot)
+instead of the current student's own scores, so results can be emitted one
+program at a time and compared across requests.
+"""
+
+import math
+import os
+import threading
+import numpy as np
+
+# Cap on how many raw scores the running stats "remember". Past this, older
+# observations are down-weighted so the stats follow recent traffic.
+POPULATION_STATS_WINDOW = int(os.getenv("POPULATION_STATS_WINDOW", "200000"))
+
+
+class RunningStats:
+    """
+    Welford running mean/variance. Whole batches are merged with Chan's
+    parallel update, so adding a request's scores is O(programs) numpy work.
+    """
+
+    def __init__(self, window=POPULATION_STATS_WINDOW):
+        self.window = window
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        # (mean, std) of the reference seed alone; fixed for the snapshot's lifetime
+        self.seed_stats = (0.0, 0.0)
+        self._lock = threading.Lock()
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if values.size == 0:
+            return
+        n_b = values.size
+        mean_b = float(values.mean())
+        m2_b = float(((values - mean_b) ** 2).sum())
+
+        with self._lock:
+            # Forget old observations proportionally once the window is full
+            if self.window and self.n + n_b > self.window and self.n > 0:
+                keep = max(self.window - n_b, 0) / self.n
+                self.n *= keep
+                self.m2 *= keep
+
+            n = self.n + n_b
+            delta = mean_b - self.mean
+            self.mean += delta * n_b / n
+            self.m2 += m2_b + delta * delta * self.n * n_b / n
+            self.n = n
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / self.n) if self.n > 0 else 0.0
+
+    def snapshot(self):
+        """Consistent (mean, std) pair."""
+        with self._lock:
+            return self.mean, (math.sqrt(self.m2 / self.n) if self.n > 0 else 0.0)
+
+
+_stats: dict[str, RunningStats] = {}
+_stats_lock = threading.Lock()
+
+
+def get_population_stats(version, seed):
+    """
+    Returns the RunningStats for a catalogue snapshot version, creating it
+    from seed() (an iterable of reference raw score arrays) the first time.
+    Stats for older versions are dropped.
+    """
+    stats = _stats.get(version)
+    if stats is not None:
+        return stats
+
+    with _stats_lock:
+        stats = _stats.get(version)
+        if stats is None:
+            # Merge every seed chunk at full weight, then start forgetting
+            stats = RunningStats(window=0)
+            for chunk in seed():
+                stats.update(chunk)
+            stats.window = POPULATION_STATS_WINDOW
+            stats.seed_stats = stats.snapshot()
+            _stats.clear()
+            _stats[version] = stats
+        return stats
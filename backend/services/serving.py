@@ -0,0 +1,84 @@
+"""
+Master-process side of the production server (see gunicorn.conf.py).
+The catalogue snapshot and scoring index are loaded once in the gunicorn
+master before workers fork, so every worker starts warm and shares that
+memory copy-on-write. When the catalogue changes, the master loads the new
+version and gracefully replaces the workers (SIGHUP).
+"""
+
+import gc
+import math
+import os
+import signal
+import threading
+import time
+
+from services import database
+
+# How often (seconds) the master checks for a new catalogue version; 0 = never
+CATALOGUE_RELOAD_SECONDS = float(os.getenv("CATALOGUE_RELOAD_SECONDS", "60"))
+
+# Held while the master (re)loads the catalogue. Forks wait for it, so a
+# worker never starts from a half-built index or a lock taken mid-update.
+_reload_lock = threading.Lock()
+os.register_at_fork(
+    before=_reload_lock.acquire,
+    after_in_parent=_reload_lock.release,
+    after_in_child=_reload_lock.release,
+)
+
+
+def _warm(snapshot=None):
+    from app import warmup
+
+    with _reload_lock:
+        if snapshot is not None:
+            database.install_catalogue_snapshot(snapshot)
+        snapshot = warmup()
+        # MongoClient sockets can't be shared with forked workers
+        database.close_connection()
+    # Keep the garbage collector from touching (and so copying) the
+    # preloaded objects in every worker
+    gc.freeze()
+    return snapshot.version
+
+
+def _watch_catalogue(master_pid, version):
+    while True:
+        time.sleep(CATALOGUE_RELOAD_SECONDS)
+        try:
+            # Network work happens unlocked, so forks never wait on MongoDB;
+            # the lock only covers installing and indexing the new version
+            snapshot = database.fetch_newer_snapshot(version)
+            if snapshot is None:
+                continue
+            if snapshot.partial:
+                database.get_catalogue_document(snapshot)
+            _warm(snapshot)
+        except Exception as e:
+            # Workers keep serving the version they have; try again next time
+            print(f"Catalogue reload check failed, keeping {version}: {e}")
+            continue
+
+        print(f"Catalogue changed: {version} -> {snapshot.version}, reloading workers...")
+        version = snapshot.version
+        os.kill(master_pid, signal.SIGHUP)
+
+
+def start_master(server):
+    """
+    Called once the master is ready and before workers are spawned: warms
+    the caches and, if CATALOGUE_RELOAD_SECONDS is set, starts watching for
+    catalogue changes.
+    """
+    if CATALOGUE_RELOAD_SECONDS > 0:
+        # The master watches for changes, so workers (and the master's own
+        # get_catalogue_snapshot calls) never refresh by themselves
+        database.CATALOGUE_REFRESH_SECONDS = math.inf
+
+    version = _warm()
+
+    if CATALOGUE_RELOAD_SECONDS > 0:
+        threading.Thread(
+            target=_watch_catalogue, args=(server.pid, version), daemon=True, name="catalogue-watch"
+        ).start()
@@ -0,0 +1,41 @@
+"""
+Shared fixtures. The catalogue is installed as the in-process snapshot,
+so MongoDB is never contacted.
+"""
+
+import copy
+
+import pytest
+
+from benchmarks.run_benchmarks import install_catalogue
+from benchmarks.synthetic import load_base, make_catalogue
+
+
+@pytest.fixture
+def catalogue():
+    data = make_catalogue(load_base("pdfmaker"), 1)
+    install_catalogue(data)
+    return data
+
+
+@pytest.fixture
+def client(catalogue):
+    from app import app
+    return app.test_client()
+
+
+@pytest.fixture
+def profile():
+    def make(**overrides):
+        base = {
+            "name": "Test Student",
+            "grade_level": 12,
+            "average": 90,
+            "wants_coop": True,
+            "extra_curriculars": ["robotics club"],
+            "major_interests": ["programming", "robotics"],
+            "courses_taken": ["ENG4U", "MHF4U", "MCV4U", "SCH4U", "SPH4U"],
+        }
+        base.update(overrides)
+        return copy.deepcopy(base)
+    return make
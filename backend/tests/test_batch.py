@@ -0,0 +1,33 @@
+import json
+
+
+def _lines(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_bad_rows_do_not_abort_the_stream(client, profile):
+    profiles = [
+        profile(),
+        profile(average="bad"),
+        profile(grade_level="twelve"),
+        {"average": 80},
+        profile(average="87.5", grade_level="11"),
+    ]
+    response = client.post("/api/recommend/batch?top_k=3", json={"profiles": profiles})
+    assert response.status_code == 200
+
+    lines = _lines(response)
+    # One line per student, in input order
+    assert [line["index"] for line in lines] == [0, 1, 2, 3, 4]
+    assert lines[0]["success"] and len(lines[0]["rankings"]) == 3
+    assert lines[1]["error"] == "Invalid field values"
+    assert "average" in lines[1]["invalid"]
+    assert "grade_level" in lines[2]["invalid"]
+    assert lines[3]["error"] == "Missing required fields"
+    assert lines[4]["success"] and len(lines[4]["rankings"]) == 3
+
+
+def test_non_finite_average_is_rejected(client, profile):
+    response = client.post("/api/recommend/batch", json={"profiles": [profile(average="nan")]})
+    (line,) = _lines(response)
+    assert line == {"index": 0, "error": "Invalid field values", "invalid": {"average": "must be a number"}}
@@ -0,0 +1,61 @@
+import io
+import time
+
+import pytest
+from pypdf import PdfReader
+
+from services import database
+from services.database import CatalogueSnapshot, get_catalogue_document, rows_to_document
+from services.result_cache import ranking_cache
+
+SCORING_FIELDS = ("recommended_average", "required_courses", "interests", "interest_fields")
+
+
+def _rows(catalogue):
+    """What fetch_program_rows would yield for this catalogue."""
+    for uni_name, uni in catalogue.items():
+        if not isinstance(uni, dict) or "programs" not in uni:
+            continue
+        for prog_name, details in uni["programs"].items():
+            row = {"version": catalogue["_id"], "university": uni_name, "program": prog_name}
+            row.update((k, details[k]) for k in SCORING_FIELDS if k in details)
+            yield row
+
+
+@pytest.fixture
+def rows_snapshot(catalogue, monkeypatch):
+    """Installs `catalogue` the way CATALOGUE_FETCH=rows would load it."""
+    fetched = []
+
+    def fetch_university_data(doc_id=None):
+        assert doc_id == catalogue["_id"]
+        fetched.append(doc_id)
+        return catalogue
+
+    monkeypatch.setattr(database, "fetch_university_data", fetch_university_data)
+    snapshot = CatalogueSnapshot(f"{catalogue['_id']}-rows", rows_to_document(_rows(catalogue)),
+                                 time.time(), partial=True)
+    database.install_catalogue_snapshot(snapshot)
+    ranking_cache.clear()
+    yield snapshot, fetched
+    database.clear_catalogue_cache()
+
+
+def test_partial_snapshot_fetches_full_document_once(catalogue, rows_snapshot):
+    snapshot, fetched = rows_snapshot
+    assert all("steps" not in uni for k, uni in snapshot.data.items() if isinstance(uni, dict))
+    assert get_catalogue_document(snapshot) is catalogue
+    assert get_catalogue_document() is catalogue
+    assert fetched == [catalogue["_id"]]
+
+
+def test_full_snapshot_is_its_own_document(catalogue):
+    assert get_catalogue_document() is catalogue
+
+
+def test_report_under_rows_fetch_keeps_steps_and_outcomes(client, profile, catalogue, rows_snapshot):
+    response = client.post("/api/recommend/report?top_k=1", json=profile())
+    assert response.status_code == 200
+    text = " ".join(PdfReader(io.BytesIO(response.get_data())).pages[0].extract_text().split())
+    assert "Top 3 Career Outcomes:" in text
+    assert "Steps to Apply:" in text
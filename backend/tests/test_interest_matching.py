@@ -0,0 +1,25 @@
+import pytest
+
+from services import interest_matching
+from services.interest_matching import build_interest_matcher
+
+VOCAB = {"programming": 0, "robotics": 1, "artificial intelligence": 2}
+
+
+def test_exact_matching_is_the_default():
+    assert interest_matching.INTEREST_MATCHING == "exact"
+    assert build_interest_matcher(VOCAB) is None
+
+
+def test_fuzzy_matching_is_opt_in(monkeypatch):
+    monkeypatch.setattr(interest_matching, "INTEREST_MATCHING", "fuzzy")
+    matcher = build_interest_matcher(VOCAB)
+    ids, credits = matcher.match("coding")
+    assert list(ids) == [VOCAB["programming"]]
+    assert list(credits) == [1.0]
+
+
+def test_unknown_mode_names_the_valid_ones(monkeypatch):
+    monkeypatch.setattr(interest_matching, "INTEREST_MATCHING", "fuzy")
+    with pytest.raises(ValueError, match="exact, fuzzy"):
+        build_interest_matcher(VOCAB)
@@ -0,0 +1,74 @@
+import sqlite3
+import subprocess
+import sys
+import time
+
+import pytest
+
+from services import jobs
+from services.jobs import JobQueue, MemoryJobStore, SqliteJobStore, _new_job
+from services.matcher import UniversityMatcher
+
+
+@pytest.fixture
+def queue(catalogue, tmp_path):
+    queue = JobQueue(MemoryJobStore(), workers=2, chunk_size=4, result_dir=tmp_path)
+    yield queue
+    if queue._pool is not None:
+        queue._pool.shutdown()
+        queue._dispatcher.shutdown()
+
+
+def _wait(queue, job_id, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} still {job['status']}")
+
+
+def test_rank_batch_sends_the_catalogue_once(queue, profile, tmp_path, monkeypatch):
+    written = []
+    save = jobs.save_catalogue_file
+    monkeypatch.setattr(jobs, "save_catalogue_file", lambda doc, path, **kw: written.append(path) or save(doc, path, **kw))
+
+    profiles = [profile(average=70 + i) for i in range(10)]
+    job = _wait(queue, queue.submit("rank_batch", {"profiles": profiles, "top_k": 3})["id"])
+
+    assert job["status"] == "done", job["error"]
+    expected = list(UniversityMatcher.rank_many([profile(average=70 + i) for i in range(10)], top_k=3))
+    assert job["result"]["rankings"] == expected
+    # Three chunks, one catalogue file, removed once the job is done
+    assert len(written) == 1
+    assert not list(tmp_path.glob("catalogue-*"))
+
+
+def _dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_jobs_of_dead_processes_are_failed(tmp_path):
+    store = SqliteJobStore(tmp_path / "jobs.sqlite3")
+    orphan = {**_new_job("rank_batch"), "status": "running", "owner_pid": _dead_pid()}
+    live = {**_new_job("rank_batch"), "status": "running"}
+    store.create(orphan)
+    store.create(live)
+
+    queue = JobQueue(store, result_dir=tmp_path)
+    assert store.get(orphan["id"])["status"] == "failed"
+    assert queue.get(orphan["id"])["error"]
+    assert queue.get(live["id"])["status"] == "running"
+
+
+def test_old_job_tables_get_owner_pid(tmp_path):
+    path = tmp_path / "jobs.sqlite3"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE jobs (id TEXT PRIMARY KEY, kind TEXT, status TEXT, done INTEGER, total INTEGER, "
+                     "created_at REAL, started_at REAL, finished_at REAL, error TEXT, result TEXT, result_path TEXT)")
+        conn.execute("INSERT INTO jobs (id, kind, status) VALUES ('old', 'rank_batch', 'running')")
+    queue = JobQueue(SqliteJobStore(path), result_dir=tmp_path)
+    assert queue.get("old")["status"] == "failed"
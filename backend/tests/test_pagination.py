@@ -0,0 +1,24 @@
+import pytest
+
+from services.matcher import decode_cursor, encode_cursor
+
+
+def test_pages_follow_the_cursor(client, profile):
+    first = client.post("/api/recommend?top_k=5", json=profile()).get_json()
+    second = client.post(f"/api/recommend?top_k=5&cursor={first['next_cursor']}", json=profile()).get_json()
+    assert second["success"] and len(second["rankings"]) == 5
+    seen = {(r["university"], r["program"]) for r in first["rankings"]}
+    assert not seen & {(r["university"], r["program"]) for r in second["rankings"]}
+
+
+def test_negative_offset_is_rejected():
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor("v1", -5))
+
+
+@pytest.mark.parametrize("offset", [-5, 10_000])
+def test_out_of_range_cursor_is_a_400(client, catalogue, profile, offset):
+    cursor = encode_cursor(str(catalogue["_id"]), offset)
+    response = client.post(f"/api/recommend?top_k=5&cursor={cursor}", json=profile())
+    assert response.status_code == 400
+    assert "Invalid cursor" in response.get_json()["error"]
@@ -0,0 +1,23 @@
+import copy
+
+from benchmarks.synthetic import load_base
+from pdfmaker import build_pdf, catalogue_sections, section_key
+
+
+def test_section_cache_is_reused_and_pruned(tmp_path):
+    catalogue = copy.deepcopy(load_base("pdfmaker"))
+    cache = tmp_path / "cache"
+
+    first = build_pdf(tmp_path / "a.pdf", catalogue, cache, workers=1)
+    assert first["rendered"] == first["sections"]
+    again = build_pdf(tmp_path / "b.pdf", catalogue, cache, workers=1)
+    assert again["rendered"] == 0
+
+    # A changed university re-renders, and its old section leaves the cache
+    uni_name = next(name for name, _, _, _ in catalogue_sections(catalogue))
+    catalogue[uni_name]["steps"] = ["1. Apply early."]
+    changed = build_pdf(tmp_path / "c.pdf", catalogue, cache, workers=1)
+    assert changed["rendered"] == 1
+    keys = {section_key(section) for section in catalogue_sections(catalogue)}
+    assert {f.stem for f in cache.glob("*.pdf")} == keys
+    assert not list(cache.glob("*.tmp"))
@@ -0,0 +1,38 @@
+import io
+
+import pytest
+from pypdf import PdfReader
+
+
+def _pdf_text(response):
+    text = " ".join(page.extract_text() for page in PdfReader(io.BytesIO(response.get_data())).pages)
+    # Long titles wrap, so compare without line breaks
+    return " ".join(text.split())
+
+
+@pytest.mark.parametrize("name", ["<b>x", "a</para>", "<img src='/etc/passwd'/>", "Tom & Jerry"])
+def test_names_are_rendered_literally(client, profile, name):
+    response = client.post("/api/recommend/report?top_k=2", json=profile(name=name))
+    assert response.status_code == 200
+    assert response.mimetype == "application/pdf"
+    assert name in _pdf_text(response)
+
+
+def test_class_report_escapes_interests(client, profile):
+    profiles = [
+        profile(name="A", major_interests=["robotics</para>", "<font size=99>ai"]),
+        profile(name="<img src='https://example.com/x.png'/>"),
+    ]
+    response = client.post("/api/recommend/report?top_k=1", json={"profiles": profiles})
+    assert response.status_code == 200
+    text = _pdf_text(response)
+    assert "robotics</para>" in text
+    assert "<img src='https://example.com/x.png'/>" in text
+
+
+@pytest.mark.parametrize("overrides, field", [({"average": "abc"}, "average"), ({"grade_level": None}, "grade_level")])
+def test_bad_numbers_are_a_400(client, profile, overrides, field):
+    response = client.post("/api/recommend/report", json={"profiles": [profile(), profile(**overrides)]})
+    assert response.status_code == 400
+    body = response.get_json()
+    assert body["index"] == 1 and field in body["invalid"]
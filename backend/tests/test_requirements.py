@@ -0,0 +1,78 @@
+import warnings
+
+import pytest
+
+from services.requirements import RequirementIndex, Rule, parse_requirement
+
+TWO_OF = "Two of: SBI4U, SCH4U, SPH4U, SES4U, ICS4U or TEJ4M"
+ENGINEERING = ["ENG4U", "MHF4U", "MCV4U", TWO_OF, "One U/M"]
+
+# (required_courses, courses taken, requirements missing)
+CASES = [
+    (["MHF4U"], set(), 1),
+    (["MHF4U"], {"MHF4U"}, 0),
+    (["ENG4U / EAE4U"], {"EAE4U"}, 0),
+    (["ENG4U / EAE4U"], {"ENG3U"}, 1),
+    (["One of: MHF4U, SBI4U, ICS4U"], {"ICS4U"}, 0),
+    (["One of: MHF4U, SBI4U, ICS4U"], {"SCH4U"}, 1),
+    ([TWO_OF], {"SBI4U"}, 1),
+    ([TWO_OF], {"SBI4U", "TEJ4M"}, 0),
+    (["One Science"], {"SES4U"}, 0),
+    (["One Science"], {"ICS4U"}, 1),
+    (["One U/M"], set(), 1),
+    (["One U/M"], {"HSB4U"}, 0),
+    (["One U/M"], {"ENG3U"}, 1),
+    (["One 4U/M"], {"TEJ4M"}, 0),
+    (["One additional 4U/M course"], {"CHY4U"}, 0),
+    (["Portfolio review"], set(), 0),
+    # A course a rule names can't also fill a wildcard slot...
+    (["MHF4U", "One U/M"], {"MHF4U"}, 1),
+    (["MHF4U", "One U/M"], {"MHF4U", "HSB4U"}, 0),
+    # ...unless the rule has more of them than it needs
+    (ENGINEERING, {"ENG4U", "MHF4U", "MCV4U", "SBI4U", "SCH4U", "SPH4U"}, 0),
+    (ENGINEERING, {"ENG4U", "MHF4U", "MCV4U", "SBI4U", "SCH4U"}, 1),
+    (ENGINEERING, {"ENG4U", "MHF4U", "MCV4U", "SBI4U"}, 2),
+    (ENGINEERING, {"ENG4U", "MHF4U", "MCV4U", "SBI4U", "SCH4U", "HSB4U"}, 0),
+    # A course two rules share is spent by both, never spare
+    (["MHF4U", "One of: MHF4U, SBI4U", "One U/M"], {"MHF4U", "SBI4U"}, 1),
+    # Grade 11 matches are used before 4U/4M ones
+    (["One of: SBI3U, SBI4U", "One U/M"], {"SBI3U", "SBI4U"}, 0),
+]
+
+
+@pytest.mark.parametrize("entry, rule", [
+    ("MHF4U", Rule("courses", ("MHF4U",), 1)),
+    ("ENG4U / EAE4U", Rule("courses", ("EAE4U", "ENG4U"), 1)),
+    ("One of: MHF4U, SBI4U", Rule("courses", ("MHF4U", "SBI4U"), 1)),
+    (TWO_OF, Rule("courses", ("ICS4U", "SBI4U", "SCH4U", "SES4U", "SPH4U", "TEJ4M"), 2)),
+    ("One Science", Rule("courses", ("SBI4U", "SCH4U", "SES4U", "SPH4U"), 1)),
+    ("One U/M", Rule("wildcard", (), 1)),
+    ("One 4U/M", Rule("wildcard", (), 1)),
+    ("One additional 4U/M course", Rule("wildcard", (), 1)),
+    ("Portfolio review", Rule("unknown", (), 0)),
+])
+def test_parse_requirement(entry, rule):
+    assert parse_requirement(entry) == rule
+
+
+@pytest.mark.parametrize("required, taken, expected", CASES)
+def test_missing(required, taken, expected):
+    index = RequirementIndex([required])
+    assert index.missing(index.encode([taken]))[0, 0] == expected
+
+
+def test_missing_with_a_shared_vocabulary():
+    # Courses other groups name are now in the vocabulary, so they count as spares by bitmask
+    index = RequirementIndex([required for required, _, _ in CASES])
+    missing = index.missing(index.encode([taken for _, taken, _ in CASES]))
+    for n, (_, _, expected) in enumerate(CASES):
+        assert missing[n, index.program_groups[n]] == expected, CASES[n]
+
+
+def test_unknown_entries_are_exposed_and_warned_once():
+    with pytest.warns(UserWarning, match="Audition tape"):
+        index = RequirementIndex([["MHF4U", "Audition tape (unindexed)"]])
+    assert index.unknown == {"Audition tape (unindexed)"}
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        RequirementIndex([["Audition tape (unindexed)"]])
@@ -0,0 +1,85 @@
+import time
+
+import pytest
+
+from benchmarks.synthetic import load_base
+from services import database
+from services.retrieval import CatalogueRetriever, answer_locally, tokenize
+
+
+@pytest.fixture(scope="module")
+def retriever():
+    return CatalogueRetriever(load_base("pdfmaker"), "test")
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("What's Waterloo's AIF deadline?", "University of Waterloo: "),
+    ("What average do I need for McMaster mechanical?", "Mechanical Engineering at McMaster University has a recommended average"),
+    ("What courses are required for UofT computer engineering?", "Computer Engineering at University of Toronto requires"),
+    ("Does TMU offer co-op?", "Toronto Metropolitan University offers co-op."),
+    ("How do I apply to Carleton?", "Steps to apply to Carleton University: "),
+    ("What is the application deadline for Waterloo?", "Key dates for University of Waterloo: "),
+    ("What jobs can I get with a Western mechanical engineering degree?", "Common careers after Mechanical"),
+    # "average" names the intent, "required" only hints at courses
+    ("What average is required for McMaster mechanical?", "Mechanical Engineering at McMaster University has a recommended average"),
+])
+def test_lookups_are_answered_locally(retriever, question, expected):
+    assert retriever.answer(question).startswith(expected)
+
+
+@pytest.mark.parametrize("question", [
+    "Is Waterloo better than UofT? When should I decide?",
+    "How does Waterloo co-op compare to McMaster co-op?",
+    "Can I take a gap year and apply to Western later?",
+    "Should I apply to Queen's or Western for engineering?",
+    "What's the average for Waterloo?",
+    # "when" alone isn't a deadline question
+    "When does Waterloo release admission decisions?",
+    # The co-op fact says whether co-op exists, not whether it's mandatory
+    "Is co-op mandatory at Waterloo?",
+])
+def test_open_ended_questions_go_to_the_agent(retriever, question):
+    assert retriever.answer(question) is None
+
+
+def test_longer_alias_wins(retriever):
+    universities, _ = retriever.find_universities("Toronto Metropolitan aerospace average?")
+    assert universities == ["Toronto Metropolitan University"]
+
+
+@pytest.mark.parametrize("question, intent", [
+    ("What average is required for McMaster mechanical?", "average"),
+    ("What courses are required for UofT?", "courses"),
+    ("How do I apply to Carleton?", "steps"),
+    ("What is the application deadline for Waterloo?", "deadline"),
+    ("When does Waterloo release admission decisions?", None),
+    ("Tell me about Western", None),
+])
+def test_classify_intent(question, intent):
+    assert CatalogueRetriever.classify_intent(set(tokenize(question))) == intent
+
+
+def test_chat_never_loads_the_catalogue(monkeypatch):
+    def load():
+        raise AssertionError("the chat path must not load the catalogue")
+
+    monkeypatch.setattr(database, "_load_snapshot", load)
+    database.clear_catalogue_cache()
+    assert answer_locally("What's Waterloo's AIF deadline?") is None
+
+
+def test_chat_answers_from_the_installed_catalogue(catalogue):
+    assert answer_locally("What's Waterloo's AIF deadline?").startswith("University of Waterloo: ")
+
+
+def test_chat_skips_an_unfetched_full_document(catalogue, monkeypatch):
+    def fetch(doc_id=None):
+        raise AssertionError("the chat path must not fetch the full document")
+
+    monkeypatch.setattr(database, "fetch_university_data", fetch)
+    snapshot = database.CatalogueSnapshot("partial-test", catalogue, time.time(), partial=True)
+    database.install_catalogue_snapshot(snapshot)
+    try:
+        assert answer_locally("What's Waterloo's AIF deadline?") is None
+    finally:
+        database.clear_catalogue_cache()
@@ -0,0 +1,30 @@
+import numpy as np
+
+from services import matcher, score_stats
+from services.matcher import UniversityMatcher
+from services.program_index import get_program_index
+from services.score_stats import RunningStats, get_population_stats
+
+
+def test_running_stats_merges_batches():
+    values = np.random.default_rng(0).normal(3.0, 2.0, 10_000)
+    stats = RunningStats(window=0)
+    for chunk in np.array_split(values, 7):
+        stats.update(chunk)
+    mean, std = stats.snapshot()
+    assert np.isclose(mean, values.mean()) and np.isclose(std, values.std())
+
+
+def test_reference_cohort_is_scored_in_chunks(catalogue, monkeypatch):
+    index = get_program_index()
+    monkeypatch.setattr(matcher, "REFERENCE_CHUNK_CELLS", len(index) * 10)
+    chunks = list(UniversityMatcher._reference_raw_scores(index))
+    assert len(chunks) > 1
+    assert all(chunk.size <= len(index) * 10 for chunk in chunks)
+
+    score_stats._stats.clear()
+    stats = get_population_stats(index.version, lambda: iter(chunks))
+    dense = np.concatenate([chunk.ravel() for chunk in chunks])
+    assert np.allclose(stats.seed_stats, (dense.mean(), dense.std()))
+    # The window only applies to later updates, never to the seed itself
+    assert stats.n == dense.size and stats.window == score_stats.POPULATION_STATS_WINDOW
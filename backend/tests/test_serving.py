@@ -0,0 +1,37 @@
+import time
+
+import pytest
+
+from services import database, serving
+
+
+class StopWatching(Exception):
+    pass
+
+
+def test_catalogue_reload_fetches_without_the_fork_lock(catalogue, monkeypatch):
+    new = database.CatalogueSnapshot("v2", catalogue, time.time())
+    seen = {}
+
+    def fetch_newer_snapshot(version):
+        seen["locked_during_fetch"] = serving._reload_lock.locked()
+        return new
+
+    sleeps = []
+
+    def sleep(seconds):
+        # One reload check, then stop the loop
+        sleeps.append(seconds)
+        if len(sleeps) > 1:
+            raise StopWatching
+
+    monkeypatch.setattr(serving.time, "sleep", sleep)
+    monkeypatch.setattr(database, "fetch_newer_snapshot", fetch_newer_snapshot)
+    monkeypatch.setattr(serving.gc, "freeze", lambda: None)
+    monkeypatch.setattr(serving.os, "kill", lambda pid, sig: seen.setdefault("signal", sig))
+
+    with pytest.raises(StopWatching):
+        serving._watch_catalogue(12345, "v1")
+    assert seen["locked_during_fetch"] is False
+    assert database.current_catalogue_snapshot().version == "v2"
+    assert seen["signal"] == serving.signal.SIGHUP
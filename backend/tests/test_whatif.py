@@ -0,0 +1,41 @@
+import pytest
+
+
+def _whatif(client, profile, deltas):
+    return client.post("/api/recommend/whatif", json={"profile": profile, "deltas": deltas, "top_k": 3})
+
+
+def test_prices_each_delta(client, profile):
+    response = _whatif(client, profile(), [{"average_delta": "3"}, {"add_courses": "ICS4U"},
+                                           {"remove_courses": [["MHF4U", 90]]}])
+    assert response.status_code == 200
+    body = response.get_json()
+    assert len(body["base"]) == 3
+    assert [len(s["rankings"]) for s in body["scenarios"]] == [3, 3, 3]
+
+
+@pytest.mark.parametrize("overrides, field", [
+    ({"average": None}, "average"),
+    ({"average": "nan"}, "average"),
+    ({"grade_level": [12]}, "grade_level"),
+    ({"courses_taken": [[5, 90]]}, "courses_taken"),
+    ({"courses_taken": 5}, "courses_taken"),
+])
+def test_bad_profile_is_a_json_400(client, profile, overrides, field):
+    response = _whatif(client, profile(**overrides), [{"average_delta": 3}])
+    assert response.status_code == 400
+    assert field in response.get_json()["invalid"]
+
+
+@pytest.mark.parametrize("delta, field", [
+    ({"average": None}, "average"),
+    ({"average_delta": "inf"}, "average_delta"),
+    ({"grade_level": {}}, "grade_level"),
+    ({"add_courses": [["SCH4U", 90], 5]}, "add_courses"),
+    ({"remove_courses": 5}, "remove_courses"),
+])
+def test_bad_delta_is_a_json_400(client, profile, delta, field):
+    response = _whatif(client, profile(), [{"average_delta": 3}, delta])
+    assert response.status_code == 400
+    body = response.get_json()
+    assert body["delta"] == 1 and field in body["invalid"]
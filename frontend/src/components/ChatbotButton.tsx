@@ -53,21 +53,53 @@ export function ChatbotButton() {
         ? "https://your-digital-ocean-app-name.ondigitalocean.app" 
         : "http://localhost:5001";
 
-      const response = await fetch(`${API_URL}/api/chat`, {
+      const response = await fetch(`${API_URL}/api/chat/stream`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ message: userText }),
       });
 
-      const data = await response.json();
+      if (!response.ok || !response.body) {
+        const data = await response.json();
+        throw new Error(data.reply || `Chat request failed (${response.status})`);
+      }
 
-      const botMessage: Message = {
-        id: (Date.now() + 1).toString(),
-        content: data.reply || "Sorry, I didn't catch that.",
-        role: 'assistant',
-        timestamp: new Date(),
+      // Show the reply as it streams in (server-sent events: `data: {"delta": "..."}`)
+      const botId = (Date.now() + 1).toString();
+      setMessages(prev => [...prev, { id: botId, content: '', role: 'assistant', timestamp: new Date() }]);
+      setIsLoading(false);
+
+      const appendToReply = (text: string) => {
+        setMessages(prev => prev.map(m => (m.id === botId ? { ...m, content: m.content + text } : m)));
       };
-      setMessages(prev => [...prev, botMessage]);
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let received = false;
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        const events = buffer.split('\n\n');
+        buffer = events.pop() ?? '';
+        for (const event of events) {
+          if (event.startsWith('event: done')) continue;
+          const dataLine = event.split('\n').find(line => line.startsWith('data: '));
+          if (!dataLine) continue;
+          const { delta } = JSON.parse(dataLine.slice('data: '.length));
+          if (delta) {
+            received = true;
+            appendToReply(delta);
+          }
+        }
+      }
+
+      if (!received) {
+        appendToReply("Sorry, I didn't catch that.");
+      }
 
     } catch (error) {
       console.error("Chat error:", error);